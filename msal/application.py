@@ -2,26 +2,29 @@ import functools
 import json
 import time
 try:  # Python 2
-    from urlparse import urljoin
+    from urlparse import urljoin, urlparse
 except:  # Python 3
-    from urllib.parse import urljoin
+    from urllib.parse import urljoin, urlparse
 import logging
+import re
 import sys
 import warnings
-from threading import Lock
+from threading import Lock, Thread
+from collections import OrderedDict
 import os
 
 from .oauth2cli import Client, JwtAssertionCreator
 from .oauth2cli.oidc import decode_part
 from .authority import Authority, WORLD_WIDE
-from .mex import send_request as mex_send_request
-from .wstrust_request import send_request as wst_send_request
-from .wstrust_response import *
 from .token_cache import TokenCache, _get_username
 import msal.telemetry
-from .region import _detect_region
-from .throttled_http_client import ThrottledHttpClient
-from .cloudshell import _is_running_in_cloud_shell
+from .deadline import _start_deadline, DeadlineExceededError
+from .background import _BackgroundCall
+from .single_flight import _SingleFlight
+# Modules needed only by some flows, such as federated username password (mex,
+# wstrust_*, with xml parsers), Cloud Shell (cloudshell) or region detection
+# (region), are imported on first use, to keep "import msal" fast.
+# So are the throttling stack, requests, PyJWT and cryptography.
 
 
 # The __init__.py will import this. Not the other way around.
@@ -29,6 +32,7 @@ __version__ = "1.22.0"  # When releasing, also check and bump our dependencies's
 
 logger = logging.getLogger(__name__)
 _AUTHORITY_TYPE_CLOUDSHELL = "CLOUDSHELL"
+_VALID_TENANT = re.compile(r"^[A-Za-z0-9._-]+$")  # A GUID or a domain name
 
 def extract_certs(public_cert_content):
     # Parses raw public certificate file contents and returns a list of strings
@@ -65,6 +69,25 @@ def _str2bytes(raw):
         return raw
 
 
+def _is_raised_locally(error):
+    # Such errors, e.g. this app's own rate limit or deadline, say nothing of an endpoint
+    from .rate_limiter import RateLimitExceededError  # Lazy load
+    return isinstance(error, (RateLimitExceededError, DeadlineExceededError))
+
+
+def _is_retryable_error(response):
+    # Such error responses indicate a degraded endpoint, rather than a bad request
+    return isinstance(response, dict) and response.get("error") in (
+        "temporarily_unavailable", "server_error")
+
+
+def _hash_user_assertion(user_assertion):
+    # OBO tokens are cached under a digest of the assertion, not the assertion itself
+    import base64, hashlib  # Lazily, so that "import msal" stays cheap
+    return base64.urlsafe_b64encode(hashlib.sha256(
+        _str2bytes(user_assertion)).digest()).rstrip(b"=").decode("ascii")
+
+
 def _clean_up(result):
     if isinstance(result, dict):
         return {
@@ -75,6 +98,92 @@ def _clean_up(result):
     return result  # It could be None
 
 
+def _flight_key(*parts):
+    # Concurrent acquisitions with equal keys would be coalesced into one
+    return tuple(
+        frozenset(p) if isinstance(p, list)  # Scopes are unordered
+        else json.dumps(p, sort_keys=True, default=str) if isinstance(p, dict)
+        else p
+        for p in parts)
+
+
+class _Outcome(object):
+    """The final value yielded by a generator of steps. See :func:`_run_steps`."""
+    def __init__(self, value):
+        self.value = value
+
+
+def _run_steps(steps):
+    """Drive a generator which yields each http call as a zero-argument callable.
+
+    The generator receives the outcome of each call, or has its exception
+    raised at that yield, and finally yields an :class:`_Outcome`.
+    The asyncio apps share such generators, by awaiting each call instead.
+    """
+    step = next(steps)
+    while not isinstance(step, _Outcome):
+        try:
+            outcome = step()
+        except:  # The exact HTTP exception is transportation-layer dependent
+            step = steps.throw(*sys.exc_info())
+        else:
+            step = steps.send(outcome)
+    steps.close()
+    return step.value
+
+
+_INSTANCE_METADATA_URL = "https://login.microsoftonline.com/common/discovery/instance?api-version=1.1&authorization_endpoint=https://login.microsoftonline.com/common/oauth2/authorize"  # TBD: We may extend this to use self._instance_discovery endpoint
+_INSTANCE_METADATA_TTL = 24 * 3600
+_instance_metadata = {}  # Process-wide {"metadata": [...], "expires_at": ...}
+_instance_metadata_lock = Lock()
+
+
+def _get_shared_instance_metadata():
+    with _instance_metadata_lock:
+        if _instance_metadata and _instance_metadata["expires_at"] > time.time():
+            return _instance_metadata["metadata"]
+    return None
+
+
+def _share_instance_metadata(metadata):
+    with _instance_metadata_lock:
+        _instance_metadata.update(
+            metadata=metadata, expires_at=time.time() + _INSTANCE_METADATA_TTL)
+
+
+def _classify(result):
+    if result and result.get("suberror"):
+        result["classification"] = {  # Suppress these suberrors, per #57
+            "bad_token": "",
+            "token_expired": "",
+            "protection_policy_required": "",
+            "client_mismatch": "",
+            "device_authentication_failed": "",
+            }.get(result["suberror"], result["suberror"])
+    return result
+
+
+def _is_running_in_cloud_shell():
+    from .cloudshell import _is_running_in_cloud_shell  # Lazy load
+    return _is_running_in_cloud_shell()
+
+
+def _filter_accounts_by_username(accounts, username):
+    if username:
+        # Federated account["username"] from AAD could contain mixed case
+        lowercase_username = username.lower()
+        accounts = [a for a in accounts
+            if a["username"].lower() == lowercase_username]
+        if not accounts:
+            logger.debug((  # This would also happen when the cache is empty
+                "get_accounts(username='{}') finds no account. "
+                "If tokens were acquired without 'profile' scope, "
+                "they would contain no username for filtering. "
+                "Consider calling get_accounts(username=None) instead."
+                ).format(username))
+    return accounts
+
+
 def _preferred_browser():
     """Register Edge and return a name suitable for subsequent webbrowser.get(...)
     when appropriate. Otherwise return None.
@@ -149,6 +258,22 @@ class _ClientWithCcsRoutingInfo(Client):
             username, password, headers=headers, **kwargs)
 
 
+class _DeferredAttribute(object):
+    """An attribute which becomes available after the authority is initialized.
+
+    It is a non-data descriptor, so once the initialization has assigned
+    the real value into the instance, this descriptor will no longer be involved.
+    """
+    def __init__(self, name):
+        self._name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        instance._initialize_deferred_authority()
+        return instance.__dict__[self._name]
+
+
 class ClientApplication(object):
     ACQUIRE_TOKEN_SILENT_ID = "84"
     ACQUIRE_TOKEN_BY_REFRESH_TOKEN = "85"
@@ -162,6 +287,15 @@ class ClientApplication(object):
     REMOVE_ACCOUNT_ID = "903"
 
     ATTEMPT_REGION_DISCOVERY = True  # "TryAutoDetect"
+    _client_class = _ClientWithCcsRoutingInfo
+    _throttled_http_client_class = None  # None means ThrottledHttpClient
+    _max_tenant_clients = 1000  # How many tenants' clients would be kept
+
+    # They are assigned by _initialize_authority(), which could be deferred
+    authority = _DeferredAttribute("authority")
+    client = _DeferredAttribute("client")
+    _regional_client = _DeferredAttribute("_regional_client")
+    _enable_broker = _DeferredAttribute("_enable_broker")
 
     def __init__(
             self, client_id,
@@ -179,6 +313,19 @@ class ClientApplication(object):
             http_cache=None,
             instance_discovery=None,
             allow_broker=None,
+            http_cache_capacity=None,
+            http_cache_capacity_in_bytes=None,
+            rate_limiter=None,
+            retry_policy=None,
+            circuit_breaker=None,
+            use_stdlib_http_client=None,
+            prewarm_connections=None,
+            hedging_policy=None,
+            lazy_authority_discovery=None,
+            region_detection_timeout=None,
+            region_detector=None,
+            discovery_cache=None,
+            refresh_in_background=None,
             ):
         """Create an instance of application.
 
@@ -269,6 +416,14 @@ class ClientApplication(object):
             If you are providing your own http_client,
             it will be your http_client's duty to decide whether to perform retry.
 
+            If you need a larger connection pool (for example, when using
+            one app from many threads), or you want multiple apps
+            to share one pooled transport, you can use
+            :class:`msal.pooled_http_client.PooledHttpClient`.
+
+            If you want to avoid importing ``requests`` altogether,
+            see ``use_stdlib_http_client``.
+
         :param verify: (optional)
             It will be passed to the
             `verify parameter in the underlying requests library
@@ -350,10 +505,14 @@ class ClientApplication(object):
                 ``app = ConfidentialClientApplication(..., azure_region=azure_region)``.
 
                 Alternatively, you can configure a short timeout,
-                or provide a custom http_client which has a short timeout.
+                or provide a custom http_client which has a short timeout,
+                or a short ``region_detection_timeout``.
                 That way, the latency would be under your control,
                 but still less performant than opting out of region feature.
 
+            Region detection runs concurrently with authority discovery,
+            so it adds latency only when it is the slower one.
+
             New in version 1.12.0.
 
         :param list[str] exclude_scopes: (optional)
@@ -413,8 +572,152 @@ class ClientApplication(object):
             Content inside ``http_cache`` will contain no tokens nor
             Personally Identifiable Information (PII). Encryption is unnecessary.
 
+            Content inside ``http_cache`` are compact snapshots of http responses,
+            rather than the http response objects themselves,
+            so they are also cheap to be persisted by ``pickle`` or ``shelve``.
+
             New in version 1.16.0.
 
+        :param int http_cache_capacity:
+            The maximal amount of entries to be kept in ``http_cache``.
+            When exceeded, entries expiring soonest will be evicted.
+            Defaults to 1024.
+
+            New in version 1.23.0.
+
+        :param int http_cache_capacity_in_bytes:
+            The approximate maximal amount of bytes to be kept in ``http_cache``.
+            When exceeded, entries expiring soonest will be evicted.
+            Defaults to None, which means there is no such limit.
+
+            New in version 1.23.0.
+
+        :param rate_limiter:
+            A :class:`msal.rate_limiter.RateLimiter` instance,
+            which will smooth this app's outbound token requests locally,
+            per token endpoint and client_id,
+            so that bursty workloads would less likely be throttled by AAD.
+            The same instance can be shared among multiple apps.
+            Defaults to None, which means no client-side rate limiting.
+
+            New in version 1.23.0.
+
+        :param retry_policy:
+            A :class:`msal.retry_policy.RetryPolicy` instance,
+            which will retry discovery requests and token requests of
+            idempotent grants (client credentials, refresh token and OBO)
+            when they encounter connection errors, HTTP 429 or HTTP 5xx,
+            with exponential backoff and jitter, honoring Retry-After.
+            Defaults to None, which means MSAL itself will not retry.
+            (The default requests session still retries once on connection error.)
+
+            New in version 1.23.0.
+
+        :param circuit_breaker:
+            A :class:`msal.circuit_breaker.CircuitBreaker` instance.
+            It is only meaningful when ``azure_region`` is also in use.
+            It tracks the error rate and latency of the regional token endpoint.
+            When that endpoint is degraded, ``acquire_token_for_client()``
+            will be routed to the central endpoint,
+            until the regional endpoint passes a half-open probe.
+            A regional request failing with an exception
+            will also be retried once against the central endpoint.
+            Defaults to None, which means requests always use the regional endpoint.
+
+            New in version 1.23.0.
+
+        :param boolean use_stdlib_http_client:
+            If True, and you do not provide an ``http_client``,
+            MSAL will use a :class:`msal.stdlib_http_client.StdlibHttpClient`
+            configured by your ``verify``, ``proxies`` and ``timeout``,
+            rather than a ``requests`` session.
+            It relies on the standard library only, which shortens the start-up
+            time of short-lived processes such as CLI tools or serverless functions.
+            Defaults to None, which means to use a ``requests`` session.
+
+            New in version 1.23.0.
+
+        :param prewarm_connections:
+            If True, once the authority is resolved, MSAL will open connections
+            to the central (and, if any, regional) token endpoints in background,
+            so that the first token request would not pay for the DNS lookup,
+            TCP and TLS handshakes. An int means how many connections to open
+            per endpoint, when your ``http_client`` supports ``warm_up()``,
+            such as :class:`msal.pooled_http_client.PooledHttpClient`
+            or :class:`msal.stdlib_http_client.StdlibHttpClient`.
+            Other http clients, including the default ``requests`` session,
+            would not be warmed up.
+            Defaults to None, which means no pre-warming.
+
+            New in version 1.23.0.
+
+        :param hedging_policy:
+            A :class:`msal.hedging.HedgingPolicy` instance.
+            It is only meaningful when ``azure_region`` is also in use.
+            When a regional request of ``acquire_token_for_client()``
+            is slower than usual, the same request will also be sent to
+            the central endpoint, and the first successful response wins.
+            Only the winning response will be saved into the token cache.
+            When a ``circuit_breaker`` is also in use, an open circuit
+            still routes requests to the central endpoint only.
+            Defaults to None, which means no hedging.
+
+            New in version 1.23.0.
+
+        :param boolean lazy_authority_discovery:
+            If True, the constructor will return without any network io.
+            The authority discovery (and region detection, if any) will happen
+            on the first call which needs them, exactly once even when
+            multiple threads make their first calls concurrently.
+            This helps apps creating many application objects on demand.
+            Note that an invalid authority would then be reported
+            by that first call, rather than by this constructor.
+            Defaults to None, which means discovery happens in this constructor.
+
+            New in version 1.23.0.
+
+        :param float region_detection_timeout:
+            The seconds to wait for region detection,
+            after authority discovery has completed.
+            When it expires, this app proceeds as if no region were detected,
+            i.e. it would use the central endpoint.
+            Defaults to None, which means waiting until region detection completes.
+
+            New in version 1.23.0.
+
+        :param region_detector:
+            A :class:`msal.region.RegionDetector` instance,
+            which probes the Azure Instance Metadata Service with a short timeout,
+            optionally in background, and optionally caches the outcome in a file.
+            Either way, a detected region, or the lack of one,
+            is reused by all apps in the current process.
+            Defaults to None, which means probing via this app's http client.
+
+            New in version 1.23.0.
+
+        :param discovery_cache:
+            A :class:`msal.discovery_cache.DiscoveryCache` instance,
+            which persists authority discovery results,
+            including the instance metadata (i.e. authority aliases),
+            in a local file,
+            and optionally loads pre-seeded ones,
+            so that a short-lived process can skip the discovery round trips.
+            Defaults to None, which means the results are only shared
+            within the current process.
+
+            New in version 1.23.0.
+
+        :param boolean refresh_in_background:
+            If True, :func:`~acquire_token_silent` will return an access token
+            which AAD suggested to be refreshed but which is not yet expired
+            right away, and refresh it on a background thread.
+            There will be at most one such refresh
+            per account, authority and scopes at any time.
+            Defaults to None, which means such a token will be refreshed
+            before a token is returned.
+
+            New in version 1.23.0.
+
         :param boolean instance_discovery:
             Historically, MSAL would connect to a central endpoint located at
             ``https://login.microsoftonline.com`` to acquire some metadata,
@@ -490,6 +793,7 @@ class ClientApplication(object):
         self.client_claims = client_claims
         self._client_capabilities = client_capabilities
         self._instance_discovery = instance_discovery
+        self._discovery_cache = discovery_cache
 
         if exclude_scopes and not isinstance(exclude_scopes, list):
             raise ValueError(
@@ -503,6 +807,10 @@ class ClientApplication(object):
 
         if http_client:
             self.http_client = http_client
+        elif use_stdlib_http_client:
+            from .stdlib_http_client import StdlibHttpClient
+            self.http_client = StdlibHttpClient(
+                verify=verify, proxies=proxies, timeout=timeout)
         else:
             import requests  # Lazy load
 
@@ -519,14 +827,61 @@ class ClientApplication(object):
             a = requests.adapters.HTTPAdapter(max_retries=1)
             self.http_client.mount("http://", a)
             self.http_client.mount("https://", a)
-        self.http_client = ThrottledHttpClient(
+        self._request_timeout = None if http_client else timeout  # Only when known
+        from .throttled_http_client import ThrottledHttpClient  # Lazy load
+        self.http_client = (self._throttled_http_client_class or ThrottledHttpClient)(
             self.http_client,
             {} if http_cache is None else http_cache,  # Default to an in-memory dict
+            capacity=http_cache_capacity,
+            capacity_in_bytes=http_cache_capacity_in_bytes,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
             )
 
         self.app_name = app_name
         self.app_version = app_version
 
+        self.token_cache = token_cache or TokenCache()
+        self._region_configured = azure_region
+        self._region_detected = None
+        self._region_detection = None  # An ongoing detection, if any
+        self._region_detection_timeout = region_detection_timeout
+        self._region_detector = region_detector
+        self._region_pending = False  # Whether a region may be detected later
+        self._region_in_use = None  # The region resolved for this app, if any
+        self._jwt_assertion_creator = (None, None)
+        self._tenant_clients = OrderedDict()  # {tenant: (authority, client, regional_client, region)}
+        self._tenant_clients_lock = Lock()
+        self._alias_authorities = {}  # {alias: Authority}, used by silent path
+        self._refresh_clients = {}  # {token_endpoint: client}, used by silent path
+        self._circuit_breaker = circuit_breaker
+        self._refresh_in_background = refresh_in_background
+        self._background_refreshes = {}  # {cache key: _BackgroundCall}
+        self._background_refreshes_lock = Lock()
+        self._single_flight = _SingleFlight()
+        self.authority_groups = None
+        self._aliases = {}  # {instance: [its other aliases]}
+        self._telemetry_buffer = {}
+        self._telemetry_lock = Lock()
+        self._prewarm_connections = prewarm_connections
+        self._hedging_policy = hedging_policy
+        self._deferred_authority_lock = Lock()
+        self._deferred_authority = (
+            authority, validate_authority, azure_region, allow_broker)
+        if not lazy_authority_discovery:
+            self._initialize_deferred_authority()
+
+    def _initialize_deferred_authority(self):
+        with self._deferred_authority_lock:  # Single flight
+            if self._deferred_authority:
+                self._initialize_authority(*self._deferred_authority)
+                self._deferred_authority = None  # Only when it succeeded
+
+    def _initialize_authority(
+            self, authority, validate_authority, azure_region, allow_broker):
+        if self._region_configured is not None and not self._region_detected:
+            self._region_detection = _BackgroundCall(  # Concurrent with discovery
+                self._probe_region)
         # Here the self.authority will not be the same type as authority in input
         try:
             authority_to_use = authority or "https://{}/common/".format(WORLD_WIDE)
@@ -535,6 +890,7 @@ class ClientApplication(object):
                 self.http_client,
                 validate_authority=validate_authority,
                 instance_discovery=self._instance_discovery,
+                discovery_cache=self._discovery_cache,
                 )
         except ValueError:  # Those are explicit authority validation errors
             raise
@@ -546,6 +902,7 @@ class ClientApplication(object):
                     authority_to_use,
                     self.http_client,
                     instance_discovery=False,
+                    discovery_cache=self._discovery_cache,
                     )
             else:
                 raise
@@ -566,14 +923,25 @@ class ClientApplication(object):
                     "We will fallback to non-broker.")
         logger.debug("Broker enabled? %s", self._enable_broker)
 
-        self.token_cache = token_cache or TokenCache()
-        self._region_configured = azure_region
-        self._region_detected = None
         self.client, self._regional_client = self._build_client(
-            client_credential, self.authority)
-        self.authority_groups = None
-        self._telemetry_buffer = {}
-        self._telemetry_lock = Lock()
+            self.client_credential, self.authority)
+        if self._prewarm_connections:
+            self._warm_up_token_endpoints_in_background()
+
+    def _warm_up_token_endpoints_in_background(self):
+        urls = [client.configuration["token_endpoint"]
+            for client in (self.client, self._regional_client) if client]
+        connections = (1 if self._prewarm_connections is True
+            else int(self._prewarm_connections))
+        def warm_up():
+            for url in urls:
+                try:
+                    self.http_client.warm_up(url, connections=connections)
+                except Exception:  # It is merely an optimization
+                    logger.debug("Unable to warm up %s", url, exc_info=True)
+        thread = Thread(target=warm_up, name="msal-warm-up")
+        thread.daemon = True  # Never block the interpreter from exiting
+        thread.start()
 
     def _decorate_scope(
             self, scopes,
@@ -600,9 +968,33 @@ class ClientApplication(object):
             self._telemetry_buffer, self._telemetry_lock, api_id,
             correlation_id=correlation_id, refresh_reason=refresh_reason)
 
+    def _probe_region(self, wait=None):
+        from .region import _detect_region  # Lazy load
+        if self._region_configured is None:
+            return _detect_region()  # Only checks the environment variable
+        return _detect_region(self.http_client, self._region_detector, wait=wait)
+
+    def _use_regional_client_once_region_is_detected(self):
+        from .region import _settled_region, _MISSING  # Lazy load
+        region = _settled_region()
+        if region is _MISSING:
+            return  # Still detecting. Check again next time.
+        self._region_pending = False  # Settled, with or without a region
+        if region:
+            logger.debug("Region %s is detected. Switching to it.", region)
+            self._region_detected = region
+            _, self._regional_client = self._build_client(
+                self.client_credential, self.authority)
+
     def _get_regional_authority(self, central_authority):
-        self._region_detected = self._region_detected or _detect_region(
-            self.http_client if self._region_configured is not None else None)
+        if self._region_detection:  # Started by _initialize_authority()
+            detection, self._region_detection = self._region_detection, None
+            self._region_detected = self._region_detected or detection.result(
+                timeout=self._region_detection_timeout)
+            if not self._region_detected:
+                logger.debug("Region detection unavailable or timed out")
+        else:
+            self._region_detected = self._region_detected or self._probe_region()
         if (self._region_configured != self.ATTEMPT_REGION_DISCOVERY
                 and self._region_configured != self._region_detected):
             logger.warning('Region configured ({}) != region detected ({})'.format(
@@ -612,6 +1004,12 @@ class ClientApplication(object):
             if self._region_configured == self.ATTEMPT_REGION_DISCOVERY
             else self._region_configured)  # It will retain the None i.e. opted out
         logger.debug('Region to be used: {}'.format(repr(region_to_use)))
+        self._region_pending = (not region_to_use
+            and self._region_configured == self.ATTEMPT_REGION_DISCOVERY)
+        self._region_in_use = region_to_use
+        return self._build_regional_authority(central_authority, region_to_use)
+
+    def _build_regional_authority(self, central_authority, region_to_use):
         if region_to_use:
             regional_host = ("{}.login.microsoft.com".format(region_to_use)
                 if central_authority.instance in (
@@ -627,10 +1025,85 @@ class ClientApplication(object):
                 "https://{}/{}".format(regional_host, central_authority.tenant),
                 self.http_client,
                 instance_discovery=False,
+                discovery_cache=self._discovery_cache,
                 )
         return None
 
-    def _build_client(self, client_credential, authority, skip_regional_client=False):
+    def _get_jwt_assertion_creator(self, client_credential):
+        # The creator, and its private key, is shared by all clients of this app
+        credential, creator = self._jwt_assertion_creator
+        if credential is client_credential:
+            return creator
+        headers = {}
+        if 'public_certificate' in client_credential:
+            headers["x5c"] = extract_certs(client_credential['public_certificate'])
+        if not client_credential.get("passphrase"):
+            unencrypted_private_key = client_credential['private_key']
+        else:
+            from cryptography.hazmat.primitives import serialization
+            from cryptography.hazmat.backends import default_backend
+            unencrypted_private_key = serialization.load_pem_private_key(
+                _str2bytes(client_credential["private_key"]),
+                _str2bytes(client_credential["passphrase"]),
+                backend=default_backend(),  # It was a required param until 2020
+                )
+        creator = JwtAssertionCreator(
+            unencrypted_private_key, algorithm="RS256",
+            sha1_thumbprint=client_credential.get("thumbprint"), headers=headers)
+        self._jwt_assertion_creator = (client_credential, creator)
+        return creator
+
+    def _get_clients_of_tenant(self, tenant, deadline=None):
+        # Returns (authority, central_client, regional_client) of the given tenant,
+        # which are built on first use, and kept in a LRU cache.
+        # They use the region of this app, rather than detecting one per tenant.
+        region = self._region_in_use
+        with self._tenant_clients_lock:
+            clients = self._tenant_clients.get(tenant)
+            if clients:
+                self._tenant_clients[tenant] = self._tenant_clients.pop(tenant)
+                if clients[3] == region:
+                    return clients[:3]
+        if clients:  # Built before a region was detected, so we rebuild them
+            authority = clients[0]
+        else:
+            if not _VALID_TENANT.match(tenant):
+                raise ValueError("Invalid tenant: {}".format(repr(tenant)))
+            if self.authority.is_adfs or self.authority._is_b2c:
+                raise ValueError("Tenant override is not supported by ADFS or B2C")
+            authority = Authority(  # The instance has already been validated
+                "https://{}/{}".format(self.authority.instance, tenant),
+                self.http_client,
+                instance_discovery=False,
+                deadline=deadline,
+                discovery_cache=self._discovery_cache,
+                )
+        regional_authority = self._build_regional_authority(authority, region)
+        clients = (authority, ) + self._build_client(
+            self.client_credential, authority,
+            skip_regional_client=not regional_authority,
+            regional_authority=regional_authority,
+            ) + (region, )
+        with self._tenant_clients_lock:  # A concurrent duplicate would be harmless
+            self._tenant_clients[tenant] = clients
+            while len(self._tenant_clients) > self._max_tenant_clients:
+                self._tenant_clients.popitem(last=False)
+        return clients[:3]
+
+    def _get_refresh_client(self, authority):
+        # Clients are reused, so that a refresh costs nothing but an http call
+        if authority is self.authority:
+            return self.client
+        client = self._refresh_clients.get(authority.token_endpoint)
+        if not client:
+            client, _ = self._build_client(
+                self.client_credential, authority, skip_regional_client=True)
+            self._refresh_clients[authority.token_endpoint] = client
+        return client
+
+    def _build_client(
+            self, client_credential, authority, skip_regional_client=False,
+            regional_authority=None):
         client_assertion = None
         client_assertion_type = None
         default_headers = {
@@ -652,22 +1125,7 @@ class ClientApplication(object):
             if 'client_assertion' in client_credential:
                 client_assertion = client_credential['client_assertion']
             else:
-                headers = {}
-                if 'public_certificate' in client_credential:
-                    headers["x5c"] = extract_certs(client_credential['public_certificate'])
-                if not client_credential.get("passphrase"):
-                    unencrypted_private_key = client_credential['private_key']
-                else:
-                    from cryptography.hazmat.primitives import serialization
-                    from cryptography.hazmat.backends import default_backend
-                    unencrypted_private_key = serialization.load_pem_private_key(
-                        _str2bytes(client_credential["private_key"]),
-                        _str2bytes(client_credential["passphrase"]),
-                        backend=default_backend(),  # It was a required param until 2020
-                        )
-                assertion = JwtAssertionCreator(
-                    unencrypted_private_key, algorithm="RS256",
-                    sha1_thumbprint=client_credential.get("thumbprint"), headers=headers)
+                assertion = self._get_jwt_assertion_creator(client_credential)
                 client_assertion = assertion.create_regenerative_assertion(
                     audience=authority.token_endpoint, issuer=self.client_id,
                     additional_claims=self.client_claims or {})
@@ -680,7 +1138,7 @@ class ClientApplication(object):
                 authority.device_authorization_endpoint or
                 urljoin(authority.token_endpoint, "devicecode"),
             }
-        central_client = _ClientWithCcsRoutingInfo(
+        central_client = self._client_class(
             central_configuration,
             self.client_id,
             http_client=self.http_client,
@@ -696,7 +1154,8 @@ class ClientApplication(object):
         regional_client = None
         if (client_credential  # Currently regional endpoint only serves some CCA flows
                 and not skip_regional_client):
-            regional_authority = self._get_regional_authority(authority)
+            regional_authority = (  # Given, or else resolved for this app
+                regional_authority or self._get_regional_authority(authority))
             if regional_authority:
                 regional_configuration = {
                     "authorization_endpoint": regional_authority.authorization_endpoint,
@@ -705,7 +1164,7 @@ class ClientApplication(object):
                         regional_authority.device_authorization_endpoint or
                         urljoin(regional_authority.token_endpoint, "devicecode"),
                     }
-                regional_client = _ClientWithCcsRoutingInfo(
+                regional_client = self._client_class(
                     regional_configuration,
                     self.client_id,
                     http_client=self.http_client,
@@ -881,6 +1340,7 @@ class ClientApplication(object):
             authority,
             self.http_client,
             instance_discovery=self._instance_discovery,
+            discovery_cache=self._discovery_cache,
             ) if authority else self.authority
 
         client = _ClientWithCcsRoutingInfo(
@@ -931,6 +1391,10 @@ class ClientApplication(object):
             So the developer need to specify a scope so that we can restrict the
             token to be issued for the corresponding audience.
 
+        :param float timeout:
+            Optional. The longest seconds this call may take.
+            See the same parameter in :func:`~acquire_token_silent_with_error`.
+
         :return:
             * A dict containing "access_token" and/or "id_token", among others,
               depends on what scope was used.
@@ -953,6 +1417,7 @@ class ClientApplication(object):
                     return redirect(url_for("index"))
         """
         self._validate_ssh_cert_input_data(kwargs.get("data", {}))
+        _start_deadline(kwargs, self._request_timeout)
         telemetry_context = self._build_telemetry_context(
             self.ACQUIRE_TOKEN_BY_AUTHORIZATION_CODE_ID)
         response =_clean_up(self.client.obtain_token_by_auth_code_flow(
@@ -1010,6 +1475,10 @@ class ClientApplication(object):
             returned from the UserInfo Endpoint and/or in the ID Token and/or Access Token.
             It is a string of a JSON object which contains lists of claims being requested from these locations.
 
+        :param float timeout:
+            Optional. The longest seconds this call may take.
+            See the same parameter in :func:`~acquire_token_silent_with_error`.
+
         :return: A dict representing the json response from AAD:
 
             - A successful response would contain "access_token" key,
@@ -1022,6 +1491,7 @@ class ClientApplication(object):
         # really empty.
         assert isinstance(scopes, list), "Invalid parameter type"
         self._validate_ssh_cert_input_data(kwargs.get("data", {}))
+        _start_deadline(kwargs, self._request_timeout)
         warnings.warn(
             "Change your acquire_token_by_authorization_code() "
             "to acquire_token_by_auth_code_flow()", DeprecationWarning)
@@ -1056,34 +1526,38 @@ class ClientApplication(object):
         """
         accounts = self._find_msal_accounts(environment=self.authority.instance)
         if not accounts:  # Now try other aliases of this authority instance
-            for alias in self._get_authority_aliases(self.authority.instance):
-                accounts = self._find_msal_accounts(environment=alias)
-                if accounts:
-                    break
-        if username:
-            # Federated account["username"] from AAD could contain mixed case
-            lowercase_username = username.lower()
-            accounts = [a for a in accounts
-                if a["username"].lower() == lowercase_username]
-            if not accounts:
-                logger.debug((  # This would also happen when the cache is empty
-                    "get_accounts(username='{}') finds no account. "
-                    "If tokens were acquired without 'profile' scope, "
-                    "they would contain no username for filtering. "
-                    "Consider calling get_accounts(username=None) instead."
-                    ).format(username))
+            accounts = self._find_msal_accounts(
+                environment=self._get_authority_aliases(self.authority.instance))
         # Does not further filter by existing RTs here. It probably won't matter.
         # Because in most cases Accounts and RTs co-exist.
         # Even in the rare case when an RT is revoked and then removed,
         # acquire_token_silent() would then yield no result,
         # apps would fall back to other acquire methods. This is the standard pattern.
-        return accounts
+        return _filter_accounts_by_username(accounts, username)
 
     def _find_msal_accounts(self, environment):
+        # The environment can also be a list of aliases, in which case
+        # the accounts of the first alias having any would be returned.
+        environments = environment if isinstance(environment, list) else [environment]
+        if not environments:
+            return []
         interested_authority_types = [
             TokenCache.AuthorityType.ADFS, TokenCache.AuthorityType.MSSTS]
         if _is_running_in_cloud_shell():
             interested_authority_types.append(_AUTHORITY_TYPE_CLOUDSHELL)
+        accounts = [a for a in self.token_cache.find(  # One pass for all aliases
+                TokenCache.CredentialType.ACCOUNT,
+                query={"environment": set(environments)})
+            if a["authority_type"] in interested_authority_types]
+        for environment in environments:
+            grouped_accounts = self._group_accounts(
+                a for a in accounts if a["environment"] == environment)
+            if grouped_accounts:
+                return grouped_accounts
+        return []
+
+    @staticmethod
+    def _group_accounts(accounts):
         grouped_accounts = {
             a.get("home_account_id"):  # Grouped by home tenant's id
                 {  # These are minimal amount of non-tenant-specific account info
@@ -1096,21 +1570,30 @@ class ClientApplication(object):
                     "local_account_id": a.get("local_account_id"),  # Tenant-specific
                     "realm": a.get("realm"),  # Tenant-specific
                 }
-            for a in self.token_cache.find(
-                TokenCache.CredentialType.ACCOUNT,
-                query={"environment": environment})
-            if a["authority_type"] in interested_authority_types
+            for a in accounts
             }
         return list(grouped_accounts.values())
 
-    def _get_instance_metadata(self):  # This exists so it can be mocked in unit test
-        resp = self.http_client.get(
-            "https://login.microsoftonline.com/common/discovery/instance?api-version=1.1&authorization_endpoint=https://login.microsoftonline.com/common/oauth2/authorize",  # TBD: We may extend this to use self._instance_discovery endpoint
-            headers={'Accept': 'application/json'})
-        resp.raise_for_status()
-        return json.loads(resp.text)['metadata']
-
-    def _get_authority_aliases(self, instance):
+    def _get_instance_metadata(self, **kwargs):  # This exists so it can be mocked in unit test
+        metadata = _get_shared_instance_metadata()
+        if metadata is None and self._discovery_cache:
+            metadata = self._discovery_cache.get_instance_metadata(
+                _INSTANCE_METADATA_URL)
+            if metadata is not None:
+                _share_instance_metadata(metadata)
+        if metadata is None:
+            resp = self.http_client.get(
+                _INSTANCE_METADATA_URL, headers={'Accept': 'application/json'},
+                **kwargs)
+            resp.raise_for_status()
+            metadata = json.loads(resp.text)['metadata']
+            _share_instance_metadata(metadata)
+            if self._discovery_cache:
+                self._discovery_cache.set_instance_metadata(
+                    _INSTANCE_METADATA_URL, metadata)
+        return metadata
+
+    def _get_authority_aliases(self, instance, **kwargs):
         if self._instance_discovery is False:
             return []
         if self.authority._is_known_to_developer:
@@ -1118,12 +1601,18 @@ class ClientApplication(object):
             # which may not reach the central endpoint, so we skip it.
             return []
         if not self.authority_groups:
-            self.authority_groups = [
-                set(group['aliases']) for group in self._get_instance_metadata()]
-        for group in self.authority_groups:
-            if instance in group:
-                return [alias for alias in group if alias != instance]
-        return []
+            self._set_authority_groups(self._get_instance_metadata(**kwargs))
+        return self._find_aliases_in_authority_groups(instance)
+
+    def _set_authority_groups(self, instance_metadata):
+        groups = [set(group['aliases']) for group in instance_metadata]
+        self._aliases = {
+            instance: [alias for alias in group if alias != instance]
+            for group in groups for instance in group}
+        self.authority_groups = groups
+
+    def _find_aliases_in_authority_groups(self, instance):
+        return self._aliases.get(instance, [])
 
     def remove_account(self, account):
         """Sign me out and forget me from token cache"""
@@ -1215,6 +1704,10 @@ class ClientApplication(object):
             returned from the UserInfo Endpoint and/or in the ID Token and/or Access Token.
             It is a string of a JSON object which contains lists of claims being requested from these locations.
 
+        :param float timeout:
+            Optional. The longest seconds this call may take.
+            See the same parameter in :func:`~acquire_token_silent_with_error`.
+
         :return:
             - A dict containing no "error" key,
               and typically contains an "access_token" key,
@@ -1258,6 +1751,18 @@ class ClientApplication(object):
             in the form of a claims_challenge directive in the www-authenticate header to be
             returned from the UserInfo Endpoint and/or in the ID Token and/or Access Token.
             It is a string of a JSON object which contains lists of claims being requested from these locations.
+        :param float timeout:
+            Optional. The longest seconds this call may take, in total,
+            across the instance metadata lookup, the refresh token attempts
+            and their retries. Each http request will have its timeout
+            shrunk to the remaining time. When the time runs out,
+            :class:`msal.deadline.DeadlineExceededError`
+            (or a timeout error of the http client) will be raised,
+            unless a still-valid access token from cache could be returned instead.
+            Defaults to None, meaning each http request has its own timeout only.
+            New in version 1.23.0. Since then, the ``timeout`` of every
+            ``acquire_token_*()`` method means such an overall budget.
+            Previously, some of them passed it to each http request as-is.
         :return:
             - A dict containing no "error" key,
               and typically contains an "access_token" key,
@@ -1267,6 +1772,7 @@ class ClientApplication(object):
         """
         assert isinstance(scopes, list), "Invalid parameter type"
         self._validate_ssh_cert_input_data(kwargs.get("data", {}))
+        deadline = _start_deadline(kwargs, self._request_timeout)
         correlation_id = msal.telemetry._get_new_correlation_id()
         if authority:
             warnings.warn("We haven't decided how/if this method will accept authority parameter")
@@ -1283,20 +1789,28 @@ class ClientApplication(object):
         if result and "error" not in result:
             return result
         final_result = result
-        for alias in self._get_authority_aliases(self.authority.instance):
-            if not self.token_cache.find(
-                    self.token_cache.CredentialType.REFRESH_TOKEN,
-                    # target=scopes,  # MUST NOT filter by scopes, because:
-                        # 1. AAD RTs are scope-independent;
-                        # 2. therefore target is optional per schema;
-                    query={"environment": alias}):
+        aliases = self._get_authority_aliases(
+            self.authority.instance,
+            **({"deadline": deadline} if deadline else {}))
+        aliases_having_rt = set(rt["environment"] for rt in self.token_cache.find(
+            self.token_cache.CredentialType.REFRESH_TOKEN,
+            # target=scopes,  # MUST NOT filter by scopes, because:
+                # 1. AAD RTs are scope-independent;
+                # 2. therefore target is optional per schema;
+            query={"environment": set(aliases)})) if aliases else set()
+        for alias in aliases:
+            if alias not in aliases_having_rt:
                 # Skip heavy weight logic when RT for this alias doesn't exist
                 continue
-            the_authority = Authority(
-                "https://" + alias + "/" + self.authority.tenant,
-                self.http_client,
-                instance_discovery=False,
-                )
+            the_authority = self._alias_authorities.get(alias)
+            if not the_authority:
+                the_authority = self._alias_authorities[alias] = Authority(
+                    "https://" + alias + "/" + self.authority.tenant,
+                    self.http_client,
+                    instance_discovery=False,
+                    deadline=deadline,
+                    discovery_cache=self._discovery_cache,
+                    )
             result = self._acquire_token_silent_from_cache_and_possibly_refresh_it(
                 scopes, account, the_authority, force_refresh=force_refresh,
                 claims_challenge=claims_challenge,
@@ -1306,15 +1820,7 @@ class ClientApplication(object):
                 if "error" not in result:
                     return result
                 final_result = result
-        if final_result and final_result.get("suberror"):
-            final_result["classification"] = {  # Suppress these suberrors, per #57
-                "bad_token": "",
-                "token_expired": "",
-                "protection_policy_required": "",
-                "client_mismatch": "",
-                "device_authentication_failed": "",
-                }.get(final_result["suberror"], final_result["suberror"])
-        return final_result
+        return _classify(final_result)
 
     def _acquire_token_silent_from_cache_and_possibly_refresh_it(
             self,
@@ -1327,37 +1833,19 @@ class ClientApplication(object):
             **kwargs):
         access_token_from_cache = None
         if not (force_refresh or claims_challenge):  # Bypass AT when desired or using claims
-            query={
-                    "client_id": self.client_id,
-                    "environment": authority.instance,
-                    "realm": authority.tenant,
-                    "home_account_id": (account or {}).get("home_account_id"),
-                    }
-            key_id = kwargs.get("data", {}).get("key_id")
-            if key_id:  # Some token types (SSH-certs, POP) are bound to a key
-                query["key_id"] = key_id
-            matches = self.token_cache.find(
-                self.token_cache.CredentialType.ACCESS_TOKEN,
-                target=scopes,
-                query=query)
-            now = time.time()
-            refresh_reason = msal.telemetry.AT_ABSENT
-            for entry in matches:
-                expires_in = int(entry["expires_on"]) - now
-                if expires_in < 5*60:  # Then consider it expired
-                    refresh_reason = msal.telemetry.AT_EXPIRED
-                    continue  # Removal is not necessary, it will be overwritten
-                logger.debug("Cache hit an AT")
-                access_token_from_cache = {  # Mimic a real response
-                    "access_token": entry["secret"],
-                    "token_type": entry.get("token_type", "Bearer"),
-                    "expires_in": int(expires_in),  # OAuth2 specs defines it as int
-                    }
-                if "refresh_on" in entry and int(entry["refresh_on"]) < now:  # aging
-                    refresh_reason = msal.telemetry.AT_AGING
-                    break  # With a fallback in hand, we break here to go refresh
+            access_token_from_cache, refresh_reason = self._find_access_token_in_cache(
+                scopes, account, authority, **kwargs)
+            if access_token_from_cache and not refresh_reason:
                 self._build_telemetry_context(-1).hit_an_access_token()
                 return access_token_from_cache  # It is still good as new
+            if (access_token_from_cache and self._refresh_in_background
+                    and not self._enable_broker
+                    and (account or {}).get("authority_type") != _AUTHORITY_TYPE_CLOUDSHELL):
+                self._build_telemetry_context(-1).hit_an_access_token()
+                self._refresh_in_background_once(
+                    scopes, account, authority, refresh_reason,
+                    correlation_id=correlation_id, **kwargs)
+                return access_token_from_cache  # It is still valid for a while
         else:
             refresh_reason = msal.telemetry.FORCE_REFRESH  # TODO: It could also mean claims_challenge
         assert refresh_reason, "It should have been established at this point"
@@ -1380,11 +1868,25 @@ class ClientApplication(object):
                 if response:  # The broker provided a decisive outcome, so we use it
                     return self._process_broker_response(response, scopes, data)
 
-            result = _clean_up(self._acquire_token_silent_by_finding_rt_belongs_to_me_or_my_family(
-                authority, self._decorate_scope(scopes), account,
-                refresh_reason=refresh_reason, claims_challenge=claims_challenge,
-                correlation_id=correlation_id,
-                **kwargs))
+            def refresh():
+                if not (force_refresh or claims_challenge):
+                    access_token = self._find_fresh_access_token_in_cache(
+                        scopes, account, authority, **kwargs)
+                    if access_token:  # Just refreshed by a previous flight
+                        return access_token
+                return _clean_up(
+                    self._acquire_token_silent_by_finding_rt_belongs_to_me_or_my_family(
+                        authority, self._decorate_scope(scopes), account,
+                        refresh_reason=refresh_reason, claims_challenge=claims_challenge,
+                        correlation_id=correlation_id,
+                        **kwargs))
+            result = self._single_flight.run(  # Concurrent callers share one refresh
+                _flight_key(
+                    "silent", authority.instance, authority.tenant,
+                    (account or {}).get("home_account_id"),
+                    scopes, claims_challenge, kwargs.get("data")),
+                refresh,
+                deadline=kwargs.get("deadline"))
             if (result and "error" not in result) or (not access_token_from_cache):
                 return result
         except:  # The exact HTTP exception is transportation-layer dependent
@@ -1393,6 +1895,86 @@ class ClientApplication(object):
                 raise  # We choose to bubble up the exception
         return access_token_from_cache
 
+    def _refresh_in_background_once(
+            self, scopes, account, authority, refresh_reason, **kwargs):
+        # Refreshes an aging AT on a background thread,
+        # unless a refresh of the same AT is already ongoing
+        kwargs.pop("deadline", None)  # It belongs to the caller's request
+        key = (
+            authority.instance, authority.tenant,
+            (account or {}).get("home_account_id"),
+            frozenset(scopes), kwargs.get("data", {}).get("key_id"))
+        def refresh():
+            try:
+                result = self._single_flight.run(  # Shared with foreground refreshes
+                    _flight_key(
+                        "silent", authority.instance, authority.tenant,
+                        (account or {}).get("home_account_id"),
+                        scopes, None, kwargs.get("data")),
+                    lambda: self._find_fresh_access_token_in_cache(
+                        scopes, account, authority, **kwargs
+                    ) or self._acquire_token_silent_by_finding_rt_belongs_to_me_or_my_family(
+                        authority, self._decorate_scope(scopes), account,
+                        refresh_reason=refresh_reason, **kwargs))
+                if result and "error" in result:
+                    logger.warning(
+                        "Background refresh failed: %s", result.get("error"))
+            except Exception:  # Caller has already gone with the aging AT
+                logger.warning("Background refresh failed", exc_info=True)
+            finally:
+                with self._background_refreshes_lock:
+                    self._background_refreshes.pop(key, None)
+        with self._background_refreshes_lock:  # refresh() can only finish after this
+            if key in self._background_refreshes:
+                logger.debug("A background refresh is already ongoing")
+                return
+            self._background_refreshes[key] = _BackgroundCall(refresh)
+
+    def _find_access_token_in_cache(
+            self, scopes, account, authority, user_assertion_hash=None, **kwargs):
+        # Returns (access_token_from_cache, refresh_reason).
+        # A returned AT with no refresh_reason is still good as new.
+        query={
+                "client_id": self.client_id,
+                "environment": authority.instance,
+                "realm": authority.tenant,
+                }
+        if user_assertion_hash:  # OBO tokens are found by the incoming assertion
+            query["user_assertion_hash"] = user_assertion_hash
+        else:
+            query["home_account_id"] = (account or {}).get("home_account_id")
+        key_id = kwargs.get("data", {}).get("key_id")
+        if key_id:  # Some token types (SSH-certs, POP) are bound to a key
+            query["key_id"] = key_id
+        matches = self.token_cache.find(
+            self.token_cache.CredentialType.ACCESS_TOKEN,
+            target=scopes,
+            query=query)
+        now = time.time()
+        refresh_reason = msal.telemetry.AT_ABSENT
+        for entry in matches:
+            expires_in = int(entry["expires_on"]) - now
+            if expires_in < 5*60:  # Then consider it expired
+                refresh_reason = msal.telemetry.AT_EXPIRED
+                continue  # Removal is not necessary, it will be overwritten
+            logger.debug("Cache hit an AT")
+            access_token_from_cache = {  # Mimic a real response
+                "access_token": entry["secret"],
+                "token_type": entry.get("token_type", "Bearer"),
+                "expires_in": int(expires_in),  # OAuth2 specs defines it as int
+                }
+            if "refresh_on" in entry and int(entry["refresh_on"]) < now:  # aging
+                # With a fallback in hand, caller would go refresh
+                return access_token_from_cache, msal.telemetry.AT_AGING
+            return access_token_from_cache, None
+        return None, refresh_reason
+
+    def _find_fresh_access_token_in_cache(self, scopes, account, authority, **kwargs):
+        # Returns an AT needing no refresh, such as one obtained by a concurrent flight
+        access_token, refresh_reason = self._find_access_token_in_cache(
+            scopes, account, authority, **kwargs)
+        return None if refresh_reason else access_token
+
     def _process_broker_response(self, response, scopes, data):
         if "error" not in response:
             self.token_cache.add(dict(
@@ -1407,11 +1989,20 @@ class ClientApplication(object):
 
     def _acquire_token_silent_by_finding_rt_belongs_to_me_or_my_family(
             self, authority, scopes, account, **kwargs):
+        return _run_steps(self._refreshing_by_rt_belongs_to_me_or_my_family(
+            authority, scopes, account, **kwargs))
+
+    def _refreshing_by_rt_belongs_to_me_or_my_family(
+            self, authority, scopes, account,
+            refresh_reason=None, correlation_id=None, claims_challenge=None,
+            **kwargs):
+        # A generator of steps, shared by the asyncio apps. See _run_steps().
         query = {
             "environment": authority.instance,
             "home_account_id": (account or {}).get("home_account_id"),
             # "realm": authority.tenant,  # AAD RTs are tenant-independent
             }
+        attempts = []  # Each is (query, break_condition, whether_its_error_counts)
         app_metadata = self._get_app_metadata(authority.instance)
         if not app_metadata:  # Meaning this app is now used for the first time.
             # When/if we have a way to directly detect current app's family,
@@ -1419,29 +2010,77 @@ class ClientApplication(object):
             # For now, we try existing RTs (*). If it works, we are in that family.
             # (*) RTs of a different app/family are not supposed to be
             # shared with or accessible by us in the first place.
-            at = self._acquire_token_silent_by_finding_specific_refresh_token(
-                authority, scopes,
+            attempts.append((
                 dict(query, family_id="1"),  # A hack, we have only 1 family for now
-                rt_remover=lambda rt_item: None,  # NO-OP b/c RTs are likely not mine
-                break_condition=lambda response:  # Break loop when app not in family
+                lambda response:  # Break loop when app not in family
                     # Based on an AAD-only behavior mentioned in internal doc here
                     # https://msazure.visualstudio.com/One/_git/ESTS-Docs/pullrequest/1138595
                     "client_mismatch" in response.get("error_additional_info", []),
-                **kwargs)
-            if at and "error" not in at:
-                return at
-        last_resp = None
+                False,  # Its RTs are likely not mine, so is its error
+                ))
         if app_metadata.get("family_id"):  # Meaning this app belongs to this family
-            last_resp = at = self._acquire_token_silent_by_finding_specific_refresh_token(
-                authority, scopes, dict(query, family_id=app_metadata["family_id"]),
-                **kwargs)
-            if at and "error" not in at:
-                return at
+            attempts.append((
+                dict(query, family_id=app_metadata["family_id"]), None, True))
         # Either this app is an orphan, so we will naturally use its own RT;
         # or all attempts above have failed, so we fall back to non-foci behavior.
-        return self._acquire_token_silent_by_finding_specific_refresh_token(
-            authority, scopes, dict(query, client_id=self.client_id),
-            **kwargs) or last_resp
+        attempts.append((dict(query, client_id=self.client_id), None, True))
+
+        data = dict(
+            kwargs.pop("data", {}),
+            claims=_merge_claims_challenge_and_capabilities(
+                self._client_capabilities, claims_challenge))
+        last_resp = None
+        for rt_query, break_condition, error_counts in attempts:
+            matches = self.token_cache.find(
+                self.token_cache.CredentialType.REFRESH_TOKEN,
+                # target=scopes,  # AAD RTs are scope-independent
+                query=rt_query)
+            logger.debug("Found %d RTs matching %s", len(matches), rt_query)
+            if not matches:  # Then skip the expensive operations below
+                continue
+            client = self._get_refresh_client(authority)
+            telemetry_context = self._build_telemetry_context(
+                self.ACQUIRE_TOKEN_SILENT_ID,
+                correlation_id=correlation_id, refresh_reason=refresh_reason)
+            response = None
+            for entry in sorted(  # Since unfit RTs would not be aggressively removed,
+                                  # we start from newer RTs which are more likely fit.
+                    matches,
+                    key=lambda e: int(e.get("last_modification_time", "0")),
+                    reverse=True):
+                logger.debug("Cache attempts an RT")
+                headers = telemetry_context.generate_headers()
+                if rt_query.get("home_account_id"):  # Then use it as CCS Routing info
+                    headers["X-AnchorMailbox"] = "Oid:{}".format(  # case-insensitive value
+                        rt_query["home_account_id"].replace(".", "@"))
+                response = yield functools.partial(
+                    client.obtain_token_by_refresh_token,
+                    entry, rt_getter=lambda token_item: token_item["secret"],
+                    on_removing_rt=lambda rt_item: None,  # Disable RT removal,
+                        # because an invalid_grant could be caused by new MFA policy,
+                        # the RT could still be useful for other MFA-less scope or tenant
+                    on_obtaining_tokens=lambda event: self.token_cache.add(dict(
+                        event,
+                        environment=authority.instance,
+                        skip_account_creation=True,  # To honor a concurrent remove_account()
+                        )),
+                    scope=scopes,
+                    headers=headers,
+                    data=dict(data),
+                    **kwargs)
+                telemetry_context.update_telemetry(response)
+                if "error" not in response:
+                    yield _Outcome(response)
+                    return
+                logger.debug("Refresh failed. {error}: {error_description}".format(
+                    error=response.get("error"),
+                    error_description=response.get("error_description"),
+                    ))
+                if break_condition and break_condition(response):
+                    break
+            if error_counts:
+                last_resp = response
+        yield _Outcome(last_resp)  # The latest error (if any), or just None
 
     def _get_app_metadata(self, environment):
         apps = self.token_cache.find(  # Use find(), rather than token_cache.get(...)
@@ -1449,63 +2088,87 @@ class ClientApplication(object):
                 "environment": environment, "client_id": self.client_id})
         return apps[0] if apps else {}
 
-    def _acquire_token_silent_by_finding_specific_refresh_token(
-            self, authority, scopes, query,
-            rt_remover=None, break_condition=lambda response: False,
-            refresh_reason=None, correlation_id=None, claims_challenge=None,
-            **kwargs):
-        matches = self.token_cache.find(
-            self.token_cache.CredentialType.REFRESH_TOKEN,
-            # target=scopes,  # AAD RTs are scope-independent
-            query=query)
-        logger.debug("Found %d RTs matching %s", len(matches), query)
-
-        response = None  # A distinguishable value to mean cache is empty
-        if not matches:  # Then exit early to avoid expensive operations
-            return response
-        client, _ = self._build_client(
-            # Potentially expensive if building regional client
-            self.client_credential, authority, skip_regional_client=True)
-        telemetry_context = self._build_telemetry_context(
-            self.ACQUIRE_TOKEN_SILENT_ID,
-            correlation_id=correlation_id, refresh_reason=refresh_reason)
-        for entry in sorted(  # Since unfit RTs would not be aggressively removed,
-                              # we start from newer RTs which are more likely fit.
-                matches,
-                key=lambda e: int(e.get("last_modification_time", "0")),
-                reverse=True):
-            logger.debug("Cache attempts an RT")
-            headers = telemetry_context.generate_headers()
-            if query.get("home_account_id"):  # Then use it as CCS Routing info
-                headers["X-AnchorMailbox"] = "Oid:{}".format(  # case-insensitive value
-                    query["home_account_id"].replace(".", "@"))
-            response = client.obtain_token_by_refresh_token(
-                entry, rt_getter=lambda token_item: token_item["secret"],
-                on_removing_rt=lambda rt_item: None,  # Disable RT removal,
-                    # because an invalid_grant could be caused by new MFA policy,
-                    # the RT could still be useful for other MFA-less scope or tenant
-                on_obtaining_tokens=lambda event: self.token_cache.add(dict(
-                    event,
-                    environment=authority.instance,
-                    skip_account_creation=True,  # To honor a concurrent remove_account()
-                    )),
-                scope=scopes,
-                headers=headers,
-                data=dict(
-                    kwargs.pop("data", {}),
-                    claims=_merge_claims_challenge_and_capabilities(
-                        self._client_capabilities, claims_challenge)),
+    def _obtaining_token_on_behalf_of(
+            self, client, authority, user_assertion, scopes,
+            claims_challenge=None, force_refresh=False, **kwargs):
+        # A generator of steps for acquire_token_on_behalf_of(),
+        # shared by the asyncio apps. See _run_steps().
+        user_assertion_hash = _hash_user_assertion(user_assertion)
+        access_token_from_cache = None
+        if not (force_refresh or claims_challenge):  # Bypass cache when desired or using claims
+            access_token_from_cache, refresh_reason = self._find_access_token_in_cache(
+                scopes, None, authority, user_assertion_hash=user_assertion_hash,
                 **kwargs)
-            telemetry_context.update_telemetry(response)
-            if "error" not in response:
-                return response
-            logger.debug("Refresh failed. {error}: {error_description}".format(
-                error=response.get("error"),
-                error_description=response.get("error_description"),
-                ))
-            if break_condition(response):
-                break
-        return response  # Returns the latest error (if any), or just None
+            if access_token_from_cache and not refresh_reason:
+                self._build_telemetry_context(-1).hit_an_access_token()
+                yield _Outcome(access_token_from_cache)  # It is still good as new
+                return
+        else:
+            refresh_reason = msal.telemetry.FORCE_REFRESH
+        telemetry_context = self._build_telemetry_context(
+            self.ACQUIRE_TOKEN_ON_BEHALF_OF_ID, refresh_reason=refresh_reason)
+        on_obtaining_tokens = lambda event: self.token_cache.add(dict(
+            event,
+            environment=authority.instance,
+            user_assertion_hash=user_assertion_hash,
+            ))
+        data = dict(
+            kwargs.pop("data", {}),
+            claims=_merge_claims_challenge_and_capabilities(
+                self._client_capabilities, claims_challenge))
+        try:
+            response = None
+            matches = self.token_cache.find(
+                self.token_cache.CredentialType.REFRESH_TOKEN,
+                query={
+                    "client_id": self.client_id,
+                    "environment": authority.instance,
+                    "user_assertion_hash": user_assertion_hash,
+                    }) if refresh_reason != msal.telemetry.FORCE_REFRESH else []
+            if matches:  # An RT obtained by an earlier exchange of this assertion
+                logger.debug("Cache attempts an OBO RT")
+                response = _clean_up((yield functools.partial(
+                    client.obtain_token_by_refresh_token,
+                    matches[0],
+                    rt_getter=lambda token_item: token_item["secret"],
+                    on_obtaining_tokens=on_obtaining_tokens,
+                    scope=self._decorate_scope(scopes),
+                    headers=telemetry_context.generate_headers(),
+                    data=dict(data),
+                    **kwargs)))
+                telemetry_context.update_telemetry(response)
+            if not response or "error" in response:
+                # The implementation is NOT based on Token Exchange
+                # https://tools.ietf.org/html/draft-ietf-oauth-token-exchange-16
+                response = _clean_up((yield functools.partial(
+                    client.obtain_token_by_assertion,  # bases on assertion RFC 7521
+                    user_assertion,
+                    client.GRANT_TYPE_JWT,  # IDTs and AAD ATs are all JWTs
+                    scope=self._decorate_scope(scopes),  # Decoration is used for:
+                        # 1. Explicitly requesting an RT, without relying on AAD default
+                        #    behavior, even though it currently still issues an RT.
+                        # 2. Requesting an IDT (which would otherwise be unavailable)
+                        #    so that the calling app could use id_token_claims to implement
+                        #    their own cache mapping, which is likely needed in web apps.
+                    data=dict(data, requested_token_use="on_behalf_of"),
+                    headers=telemetry_context.generate_headers(),
+                        # TBD: Expose a login_hint (or ccs_routing_hint) param for web app
+                    on_obtaining_tokens=on_obtaining_tokens,
+                    **kwargs)))
+                telemetry_context.update_telemetry(response)
+        except GeneratorExit:  # These steps were abandoned by their driver
+            raise
+        except:  # The exact HTTP exception is transportation-layer dependent
+            if not access_token_from_cache:  # It means there is no fall back option
+                raise
+            logger.warning(
+                "Unable to refresh an aging token. Use it for now.", exc_info=True)
+            yield _Outcome(access_token_from_cache)
+            return
+        if "error" in response and access_token_from_cache:
+            yield _Outcome(access_token_from_cache)
+            return
+        yield _Outcome(response)
 
     def _validate_ssh_cert_input_data(self, data):
         if data.get("token_type") == "ssh-cert":
@@ -1540,11 +2203,16 @@ class ClientApplication(object):
             Each scope needs to be in the Microsoft identity platform (v2) format.
             See `Scopes not resources <https://docs.microsoft.com/en-us/azure/active-directory/develop/migrate-python-adal-msal#scopes-not-resources>`_.
 
+        :param float timeout:
+            Optional. The longest seconds this call may take.
+            See the same parameter in :func:`~acquire_token_silent_with_error`.
+
         :return:
             * A dict contains "error" and some other keys, when error happened.
             * A dict contains no "error" key means migration was successful.
         """
         self._validate_ssh_cert_input_data(kwargs.get("data", {}))
+        _start_deadline(kwargs, self._request_timeout)
         telemetry_context = self._build_telemetry_context(
             self.ACQUIRE_TOKEN_BY_REFRESH_TOKEN,
             refresh_reason=msal.telemetry.FORCE_REFRESH)
@@ -1575,12 +2243,18 @@ class ClientApplication(object):
             in the form of a claims_challenge directive in the www-authenticate header to be
             returned from the UserInfo Endpoint and/or in the ID Token and/or Access Token.
             It is a string of a JSON object which contains lists of claims being requested from these locations.
+        :param float timeout:
+            Optional. The longest seconds this call may take.
+            See the same parameter in :func:`~acquire_token_silent_with_error`.
+            It also bounds the user realm discovery and, for a federated
+            account, the requests to its identity provider.
 
         :return: A dict representing the json response from AAD:
 
             - A successful response would contain "access_token" key,
             - an error response would contain "error" and usually "error_description".
         """
+        deadline = _start_deadline(kwargs, self._request_timeout)
         claims = _merge_claims_challenge_and_capabilities(
                 self._client_capabilities, claims_challenge)
         if self._enable_broker:
@@ -1605,7 +2279,8 @@ class ClientApplication(object):
         data = dict(kwargs.pop("data", {}), claims=claims)
         if not self.authority.is_adfs:
             user_realm_result = self.authority.user_realm_discovery(
-                username, correlation_id=headers[msal.telemetry.CLIENT_REQUEST_ID])
+                username, correlation_id=headers[msal.telemetry.CLIENT_REQUEST_ID],
+                deadline=deadline)
             if user_realm_result.get("account_type") == "Federated":
                 response = _clean_up(self._acquire_token_by_username_password_federated(
                     user_realm_result, username, password, scopes=scopes,
@@ -1623,11 +2298,18 @@ class ClientApplication(object):
 
     def _acquire_token_by_username_password_federated(
             self, user_realm_result, username, password, scopes=None, **kwargs):
+        # Lazy load, because these xml-based modules are rarely used nowadays
+        from .mex import send_request as mex_send_request
+        from .wstrust_request import send_request as wst_send_request
+        from .wstrust_response import (
+            SAML_TOKEN_TYPE_V1, SAML_TOKEN_TYPE_V2,
+            WSS_SAML_TOKEN_PROFILE_V1_1, WSS_SAML_TOKEN_PROFILE_V2)
         wstrust_endpoint = {}
         if user_realm_result.get("federation_metadata_url"):
             wstrust_endpoint = mex_send_request(
                 user_realm_result["federation_metadata_url"],
-                self.http_client)
+                self.http_client,
+                **({"deadline": kwargs["deadline"]} if kwargs.get("deadline") else {}))
             if wstrust_endpoint is None:
                 raise ValueError("Unable to find wstrust endpoint from MEX. "
                     "This typically happens when attempting MSA accounts. "
@@ -1640,7 +2322,8 @@ class ClientApplication(object):
             wstrust_endpoint.get("address",
                 # Fallback to an AAD supplied endpoint
                 user_realm_result.get("federation_active_auth_url")),
-            wstrust_endpoint.get("action"), self.http_client)
+            wstrust_endpoint.get("action"), self.http_client,
+            **({"deadline": kwargs["deadline"]} if kwargs.get("deadline") else {}))
         if not ("token" in wstrust_result and "type" in wstrust_result):
             raise RuntimeError("Unsuccessful RSTR. %s" % wstrust_result)
         GRANT_TYPE_SAML1_1 = 'urn:ietf:params:oauth:grant-type:saml1_1-bearer'
@@ -1723,7 +2406,10 @@ class PublicClientApplication(ClientApplication):  # browser app or mobile app
 
         :param int timeout:
             This method will block the current thread.
-            This parameter specifies the timeout value in seconds.
+            This parameter specifies the timeout value in seconds,
+            in total, across waiting for the user's interaction
+            and the subsequent token request,
+            consistent with the ``timeout`` of other ``acquire_token_*()`` methods.
             Default value ``None`` means wait indefinitely.
 
         :param int port:
@@ -1814,6 +2500,9 @@ class PublicClientApplication(ClientApplication):  # browser app or mobile app
                 )
 
         on_before_launching_ui(ui="browser")
+        if timeout is not None:  # The token request will get the remaining time
+            kwargs["timeout"] = timeout
+            _start_deadline(kwargs, self._request_timeout)
         telemetry_context = self._build_telemetry_context(
             self.ACQUIRE_TOKEN_INTERACTIVE)
         response = _clean_up(self.client.obtain_token_by_browser(
@@ -1957,12 +2646,18 @@ class PublicClientApplication(ClientApplication):  # browser app or mobile app
             in the form of a claims_challenge directive in the www-authenticate header to be
             returned from the UserInfo Endpoint and/or in the ID Token and/or Access Token.
             It is a string of a JSON object which contains lists of claims being requested from these locations.
+        :param float timeout:
+            Optional. The longest seconds this call may take.
+            See the same parameter in :func:`~acquire_token_silent_with_error`.
+            It bounds the whole polling, which would otherwise last until
+            the flow expires.
 
         :return: A dict representing the json response from AAD:
 
             - A successful response would contain "access_token" key,
             - an error response would contain "error" and usually "error_description".
         """
+        _start_deadline(kwargs, self._request_timeout)
         telemetry_context = self._build_telemetry_context(
             self.ACQUIRE_TOKEN_BY_DEVICE_FLOW_ID,
             correlation_id=flow.get(self.DEVICE_FLOW_CORRELATION_ID))
@@ -1984,7 +2679,8 @@ class PublicClientApplication(ClientApplication):  # browser app or mobile app
 
 class ConfidentialClientApplication(ClientApplication):  # server-side web app
 
-    def acquire_token_for_client(self, scopes, claims_challenge=None, **kwargs):
+    def acquire_token_for_client(
+            self, scopes, claims_challenge=None, force_refresh=False, **kwargs):
         """Acquires token for the current confidential client, not for an end user.
 
         :param list[str] scopes: (Required)
@@ -1994,34 +2690,165 @@ class ConfidentialClientApplication(ClientApplication):  # server-side web app
             in the form of a claims_challenge directive in the www-authenticate header to be
             returned from the UserInfo Endpoint and/or in the ID Token and/or Access Token.
             It is a string of a JSON object which contains lists of claims being requested from these locations.
+            A claims_challenge also bypasses the token cache.
+
+        :param boolean force_refresh:
+            Optional. If True, a new token will be obtained from AAD,
+            even if there is a valid one in the token cache.
+            Defaults to False, meaning a cached token will be returned,
+            until it is about to expire, or AAD suggested a refresh of it.
+
+            New in version 1.23.0.
+
+        :param float timeout:
+            Optional. The longest seconds this call may take.
+            See the same parameter in :func:`~acquire_token_silent_with_error`.
+
+        :param str tenant:
+            Optional. The tenant, as a GUID or a domain name, to acquire token from.
+            It overrides the tenant of this app's authority, on the same cloud,
+            so that one app can serve many tenants.
+            The authorities and clients of recently used tenants are kept,
+            and they share this app's signing key and token cache.
+            Not supported by ADFS or B2C authorities.
+
+            New in version 1.23.0.
 
         :return: A dict representing the json response from AAD:
 
             - A successful response would contain "access_token" key,
             - an error response would contain "error" and usually "error_description".
         """
-        # TBD: force_refresh behavior
-        if self.authority.tenant.lower() in ["common", "organizations"]:
+        tenant = kwargs.get("tenant")
+        if (tenant or self.authority.tenant).lower() in [
+                "common", "organizations"]:
             warnings.warn(
                 "Using /common or /organizations authority "
                 "in acquire_token_for_client() is unreliable. "
                 "Please use a specific tenant instead.", DeprecationWarning)
         self._validate_ssh_cert_input_data(kwargs.get("data", {}))
+        deadline = _start_deadline(kwargs, self._request_timeout)
+        access_token_from_cache = None
+        if not (force_refresh or claims_challenge):  # Bypass AT when desired or using claims
+            authority = self._get_clients_of_tenant(
+                tenant, deadline=deadline)[0] if tenant else self.authority
+            access_token_from_cache, refresh_reason = self._find_access_token_in_cache(
+                scopes, None, authority, **kwargs)  # App-only ATs have no account
+            if access_token_from_cache and not refresh_reason:
+                self._build_telemetry_context(-1).hit_an_access_token()
+                return access_token_from_cache  # It is still good as new
+        else:
+            refresh_reason = msal.telemetry.FORCE_REFRESH
         telemetry_context = self._build_telemetry_context(
-            self.ACQUIRE_TOKEN_FOR_CLIENT_ID)
-        client = self._regional_client or self.client
-        response = _clean_up(client.obtain_token_for_client(
-            scope=scopes,  # This grant flow requires no scope decoration
-            headers=telemetry_context.generate_headers(),
-            data=dict(
-                kwargs.pop("data", {}),
-                claims=_merge_claims_challenge_and_capabilities(
-                    self._client_capabilities, claims_challenge)),
-            **kwargs))
-        telemetry_context.update_telemetry(response)
+            self.ACQUIRE_TOKEN_FOR_CLIENT_ID, refresh_reason=refresh_reason)
+        data = kwargs.pop("data", {})
+        def obtain():
+            if not (force_refresh or claims_challenge):
+                access_token = self._find_fresh_access_token_in_cache(
+                    scopes, None, authority, data=data, **kwargs)
+                if access_token:  # Just obtained by a previous flight
+                    return access_token
+            response = _clean_up(self._obtain_token_for_client(
+                scope=scopes,  # This grant flow requires no scope decoration
+                headers=telemetry_context.generate_headers(),
+                data=dict(
+                    data,
+                    claims=_merge_claims_challenge_and_capabilities(
+                        self._client_capabilities, claims_challenge)),
+                **kwargs))
+            telemetry_context.update_telemetry(response)
+            return response
+        try:
+            response = self._single_flight.run(  # Concurrent callers share one request
+                _flight_key("client", tenant, scopes, claims_challenge, data),
+                obtain, deadline=deadline)
+        except:  # The exact HTTP exception is transportation-layer dependent
+            if not access_token_from_cache:  # It means there is no fall back option
+                raise
+            logger.warning(
+                "Unable to refresh an aging token. Use it for now.", exc_info=True)
+            return access_token_from_cache
+        if "error" in response and access_token_from_cache:
+            logger.warning(
+                "Unable to refresh an aging token: %s. Use it for now.",
+                response.get("error"))
+            return access_token_from_cache
         return response
 
-    def acquire_token_on_behalf_of(self, user_assertion, scopes, claims_challenge=None, **kwargs):
+    def _obtain_token_for_client(self, tenant=None, **kwargs):
+        if self._regional_client is None and self._region_pending:
+            self._use_regional_client_once_region_is_detected()
+        if tenant:
+            _, client, regional_client = self._get_clients_of_tenant(
+                tenant, deadline=kwargs.get("deadline"))
+        else:
+            client, regional_client = self.client, self._regional_client
+        if not (regional_client and (self._circuit_breaker or self._hedging_policy)):
+            return (regional_client or client).obtain_token_for_client(**kwargs)
+        host = urlparse(regional_client.configuration["token_endpoint"]).hostname
+        if self._circuit_breaker and not self._circuit_breaker.allow(host):
+            logger.debug("Circuit for %s is open. Use central endpoint instead.", host)
+            return client.obtain_token_for_client(**kwargs)
+        if self._hedging_policy:
+            return self._obtain_token_for_client_with_hedging(
+                client, regional_client, host, **kwargs)
+        started_at = time.time()
+        try:
+            response = regional_client.obtain_token_for_client(
+                **dict(kwargs, data=dict(kwargs.get("data", {}))))
+        except Exception as e:  # The exact HTTP exception is transportation-layer dependent
+            if _is_raised_locally(e):
+                raise  # Not the endpoint's fault, and failing over would bypass it
+            self._circuit_breaker.record(host, True, time.time() - started_at)
+            logger.warning(
+                "Regional endpoint %s failed. Fall back to central endpoint.",
+                host, exc_info=True)
+            return client.obtain_token_for_client(**kwargs)
+        failed = _is_retryable_error(response)
+        self._circuit_breaker.record(host, failed, time.time() - started_at)
+        if failed:
+            logger.warning(
+                "Regional endpoint %s returned %s. Fall back to central endpoint.",
+                host, response.get("error"))
+            return client.obtain_token_for_client(**kwargs)
+        return response
+
+    def _obtain_token_for_client_with_hedging(
+            self, central_client, regional_client, host, **kwargs):
+        events = {}  # Tokens are held here, until the winner is known
+        responses = {}
+        def obtain(client):
+            started_at = time.time()
+            try:
+                response = client.obtain_token_for_client(**dict(
+                    kwargs,
+                    data=dict(kwargs.get("data", {})),  # It will be mutated
+                    on_obtaining_tokens=lambda event: events.setdefault(
+                        client, event),
+                    ))
+            except Exception as e:
+                if (client is regional_client and self._circuit_breaker
+                        and not _is_raised_locally(e)):
+                    self._circuit_breaker.record(host, True, time.time() - started_at)
+                raise
+            if client is regional_client:
+                latency = time.time() - started_at
+                self._hedging_policy.record(latency)
+                if self._circuit_breaker:
+                    self._circuit_breaker.record(
+                        host, _is_retryable_error(response), latency)
+            responses[client] = response
+            return response
+        response = self._hedging_policy.run(
+            lambda: obtain(regional_client), lambda: obtain(central_client))
+        for client in (regional_client, central_client):
+            if responses.get(client) is response and client in events:
+                client.on_obtaining_tokens(events[client])  # Only the winner's
+        return response
+
+    def acquire_token_on_behalf_of(
+            self, user_assertion, scopes, claims_challenge=None, force_refresh=False,
+            **kwargs):
         """Acquires token using on-behalf-of (OBO) flow.
 
         The current app is a middle-tier service which was called with a token
@@ -2034,6 +2861,11 @@ class ConfidentialClientApplication(ClientApplication):  # server-side web app
         See how to gain consent upfront for your middle-tier app from this article.
         https://docs.microsoft.com/en-us/azure/active-directory/develop/v2-oauth2-on-behalf-of-flow#gaining-consent-for-the-middle-tier-application
 
+        The tokens obtained are cached under a hash of the user assertion.
+        A subsequent call with the same user assertion and scopes
+        will be served by a cached access token, or by a refresh token
+        obtained from an earlier exchange, before a new exchange is attempted.
+
         :param str user_assertion: The incoming token already received by this app
         :param list[str] scopes: Scopes required by downstream API (a resource).
         :param claims_challenge:
@@ -2041,32 +2873,34 @@ class ConfidentialClientApplication(ClientApplication):  # server-side web app
             in the form of a claims_challenge directive in the www-authenticate header to be
             returned from the UserInfo Endpoint and/or in the ID Token and/or Access Token.
             It is a string of a JSON object which contains lists of claims being requested from these locations.
+            A claims_challenge also bypasses the token cache.
+
+        :param boolean force_refresh:
+            Optional. If True, the user assertion will be exchanged again,
+            even if there are usable tokens in the token cache.
+
+            New in version 1.23.0.
+
+        :param float timeout:
+            Optional. The longest seconds this call may take.
+            See the same parameter in :func:`~acquire_token_silent_with_error`.
+
+        :param str tenant:
+            Optional. The tenant to acquire token from.
+            See the same parameter in :func:`~acquire_token_for_client`.
 
         :return: A dict representing the json response from AAD:
 
             - A successful response would contain "access_token" key,
             - an error response would contain "error" and usually "error_description".
         """
-        telemetry_context = self._build_telemetry_context(
-            self.ACQUIRE_TOKEN_ON_BEHALF_OF_ID)
-        # The implementation is NOT based on Token Exchange
-        # https://tools.ietf.org/html/draft-ietf-oauth-token-exchange-16
-        response = _clean_up(self.client.obtain_token_by_assertion(  # bases on assertion RFC 7521
-            user_assertion,
-            self.client.GRANT_TYPE_JWT,  # IDTs and AAD ATs are all JWTs
-            scope=self._decorate_scope(scopes),  # Decoration is used for:
-                # 1. Explicitly requesting an RT, without relying on AAD default
-                #    behavior, even though it currently still issues an RT.
-                # 2. Requesting an IDT (which would otherwise be unavailable)
-                #    so that the calling app could use id_token_claims to implement
-                #    their own cache mapping, which is likely needed in web apps.
-            data=dict(
-                kwargs.pop("data", {}),
-                requested_token_use="on_behalf_of",
-                claims=_merge_claims_challenge_and_capabilities(
-                    self._client_capabilities, claims_challenge)),
-            headers=telemetry_context.generate_headers(),
-                # TBD: Expose a login_hint (or ccs_routing_hint) param for web app
+        deadline = _start_deadline(kwargs, self._request_timeout)
+        tenant = kwargs.pop("tenant", None)
+        if tenant:
+            authority, client, _ = self._get_clients_of_tenant(tenant, deadline=deadline)
+        else:
+            authority, client = self.authority, self.client
+        return _run_steps(self._obtaining_token_on_behalf_of(
+            client, authority, user_assertion, scopes,
+            claims_challenge=claims_challenge, force_refresh=force_refresh,
             **kwargs))
-        telemetry_context.update_telemetry(response)
-        return response
@@ -0,0 +1,540 @@
+"""The asyncio counterparts of :class:`msal.ConfidentialClientApplication`
+and :class:`msal.PublicClientApplication`. This module requires Python 3.5+.
+
+Usage::
+
+    import httpx  # Or aiohttp, or anything conforming to AsyncHttpClient
+    from msal.application_async import AsyncConfidentialClientApplication
+
+    app = AsyncConfidentialClientApplication(
+        "client_id", client_credential="secret",
+        authority="https://login.microsoftonline.com/your_tenant",
+        http_client=httpx.AsyncClient())
+    result = await app.acquire_token_for_client(scopes=["scope1"])
+
+Constructing an app does no network io.
+The authority is discovered once, by whichever call first needs it,
+while concurrent callers wait for that same discovery.
+
+These apps read and write the same token cache schema as their sync siblings,
+so a (Serializable)TokenCache can be shared between the two.
+Token cache operations are synchronous and in-memory.
+They are always performed between two awaits,
+so an update of the cache is atomic in the view of other coroutines,
+and the cache's own lock is never held across a suspension point.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import sys
+import warnings
+
+from .application import (
+    ClientApplication, _ClientWithCcsRoutingInfo,
+    _INSTANCE_METADATA_URL, _get_shared_instance_metadata, _share_instance_metadata,
+    _classify, _clean_up, _filter_accounts_by_username,
+    _merge_claims_challenge_and_capabilities, _Outcome,
+    )
+from .authority import (
+    Authority, WORLD_WIDE,
+    _UNABLE_TO_GET_AUTHORITY_CONFIGURATION, _parse_openid_configuration,
+    )
+from .deadline import _start_deadline
+from .oauth2cli.http_async import _buffer
+from .throttled_http_client import (
+    ThrottledHttpClient, _ResponseSnapshot, _get_key, _get_expires_in)
+import msal.telemetry
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _discover_authority(
+        authority_url, http_client, validate_authority=True, instance_discovery=None,
+        deadline=None):
+    """The asyncio counterpart of Authority's constructor"""
+    authority = Authority.__new__(Authority)
+    authority._http_client = http_client
+    kwargs = {"deadline": deadline} if deadline else {}
+    (authorization_endpoint, instance_discovery_endpoint, tenant_discovery_endpoint
+        ) = authority._parse_authority_url(
+            authority_url, validate_authority, instance_discovery)
+    registry_key = (tenant_discovery_endpoint, instance_discovery_endpoint)
+    openid_config = authority._get_registered_openid_config(registry_key)
+    if openid_config:
+        authority._apply_openid_config(openid_config)
+        return authority
+    if instance_discovery_endpoint:
+        resp = await http_client.get(
+            instance_discovery_endpoint,
+            params={
+                'authorization_endpoint': authorization_endpoint,
+                'api-version': '1.0',
+                },
+            **kwargs)
+        tenant_discovery_endpoint = authority._get_tenant_discovery_endpoint(
+            json.loads(resp.text), authority_url)
+    try:
+        openid_config = _parse_openid_configuration(
+            tenant_discovery_endpoint,
+            await http_client.get(tenant_discovery_endpoint, **kwargs))
+    except ValueError:
+        raise ValueError(_UNABLE_TO_GET_AUTHORITY_CONFIGURATION.format(authority_url))
+    authority._apply_openid_config(openid_config)
+    authority._register_openid_config(registry_key, openid_config)
+    return authority
+
+
+async def _send(send, deadline=None):
+    # Sends a request and reads its response, before the deadline if any
+    async def send_and_read():
+        return await _buffer(await send())
+    if deadline is None:
+        return await send_and_read()
+    timeout = deadline.shrink()  # Raises when there is no time left
+    try:
+        return await asyncio.wait_for(send_and_read(), timeout)
+    except asyncio.TimeoutError:
+        raise deadline.error()
+
+
+class _AsyncThrottledHttpClient(ThrottledHttpClient):
+    """The asyncio counterpart of ThrottledHttpClient.
+
+    It returns responses whose body have already been read,
+    so that they can be consumed by the (synchronous) response parsers.
+    A ``deadline`` of a request is enforced by cancelling it,
+    since the ``timeout`` of each asyncio http client has its own format.
+    """
+    def __init__(self, http_client, http_cache, rate_limiter=None, retry_policy=None,
+            **kwargs):
+        if rate_limiter or retry_policy:  # Both of them would block the event loop
+            raise ValueError(
+                "rate_limiter and retry_policy are not supported in asyncio apps")
+        super(_AsyncThrottledHttpClient, self).__init__(
+            http_client, http_cache, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        deadline = kwargs.pop("deadline", None)
+        key = _get_key(args, kwargs)
+        snapshot = self._expiring_mapping.get(key)
+        if snapshot is not None:
+            return snapshot
+        response = await _send(
+            lambda: self._http_client.get(*args, **kwargs), deadline)
+        expires_in = _get_expires_in(response)
+        if expires_in:  # Only a response going into the cache is snapshotted
+            self._expiring_mapping.set(
+                key, _ResponseSnapshot.of(response), expires_in)
+        return response
+
+    async def post(self, *args, **kwargs):
+        deadline = kwargs.pop("deadline", None)
+        key, body_hash, response = self._probe(args, kwargs)
+        if response is not None:
+            return response
+        response = await _send(
+            lambda: self._http_client.post(*args, **kwargs), deadline)
+        return self._store(key, body_hash, response, kwargs)
+
+    async def close(self):
+        close = getattr(self._http_client, "aclose", None) or self._http_client.close
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+
+
+class _AsyncClient(_ClientWithCcsRoutingInfo):
+    """Its token-obtaining methods are awaitable, but otherwise same as parent's"""
+
+    async def _obtain_token(
+            self, grant_type, params=None, data=None,
+            also_save_rt=False, on_obtaining_tokens=None, headers=None, **kwargs):
+        _data = dict(data or {})  # to prevent side effect
+        body, _headers = self._prepare_token_request(grant_type, _data, headers)
+        resp = self._parse_token_response(await self._http_client.post(
+            self.configuration["token_endpoint"],
+            headers=_headers, params=params, data=body,
+            **kwargs))
+        self._on_token_response(
+            grant_type, params, _data, resp,
+            also_save_rt=also_save_rt, on_obtaining_tokens=on_obtaining_tokens)
+        if "id_token" in resp:
+            resp["id_token_claims"] = self.decode_id_token(resp["id_token"])
+        return resp
+
+    async def obtain_token_for_client(self, scope=None, **kwargs):
+        data = kwargs.pop("data", {})
+        data.update(scope=scope)
+        return await self._obtain_token("client_credentials", data=data, **kwargs)
+
+    async def obtain_token_by_assertion(
+            self, assertion, grant_type, scope=None, **kwargs):
+        encoder = self.grant_assertion_encoders.get(grant_type, lambda a: a)
+        data = kwargs.pop("data", {})
+        data.update(scope=scope, assertion=encoder(assertion))
+        return await self._obtain_token(grant_type, data=data, **kwargs)
+
+    async def obtain_token_by_refresh_token(self, token_item, scope=None,
+            rt_getter=lambda token_item: token_item["refresh_token"],
+            on_removing_rt=None,
+            on_updating_rt=None,
+            **kwargs):
+        data = kwargs.pop("data", {})
+        data.update(
+            refresh_token=token_item if isinstance(token_item, str)
+                else rt_getter(token_item),
+            scope=scope)
+        resp = await self._obtain_token(
+            "refresh_token", data=data, also_save_rt=on_updating_rt is False,
+            **kwargs)
+        self._on_refresh_token_response(
+            token_item, resp,
+            on_removing_rt=on_removing_rt, on_updating_rt=on_updating_rt)
+        return resp
+
+
+async def _run_steps_async(steps):
+    # The asyncio counterpart of msal.application._run_steps()
+    step = next(steps)
+    while not isinstance(step, _Outcome):
+        try:
+            outcome = await step()
+        except Exception:  # Not a bare except, which would swallow a cancellation
+            step = steps.throw(*sys.exc_info())
+        else:
+            step = steps.send(outcome)
+    steps.close()
+    return step.value
+
+
+class _NotOffered(object):
+    """Hides an inherited sync API, which an asyncio app does not offer.
+
+    Accessing it raises AttributeError, as if the attribute were never defined.
+    """
+    def __init__(self, name):
+        self._name = name
+
+    def __get__(self, instance, owner):
+        raise AttributeError("{} does not offer {}()".format(
+            owner.__name__, self._name))
+
+
+class AsyncClientApplication(ClientApplication):
+    """The asyncio counterpart of :class:`msal.ClientApplication`.
+
+    Its constructor accepts the same parameters as its sync counterpart,
+    with the following differences:
+
+    * ``http_client`` is required. It shall conform to
+      :class:`msal.oauth2cli.http_async.AsyncHttpClient`,
+      such as an ``httpx.AsyncClient`` or an ``aiohttp.ClientSession``.
+
+    * ``azure_region``, ``allow_broker``, ``rate_limiter``, ``retry_policy``,
+      ``circuit_breaker``, ``use_stdlib_http_client``, ``prewarm_connections``,
+      ``hedging_policy``, ``region_detector``, ``discovery_cache``
+      and ``refresh_in_background`` are not supported yet.
+
+    * Authority discovery is always deferred until the first call which
+      needs it, as if ``lazy_authority_discovery=True``.
+
+    * The auth code flow and the username password flow are not offered.
+      Their methods are absent from this class, rather than inherited;
+      a web app or a legacy app shall use its sync counterpart for them.
+
+    New in version 1.23.0.
+    """
+    _client_class = _AsyncClient
+    _throttled_http_client_class = _AsyncThrottledHttpClient
+
+    initiate_auth_code_flow = _NotOffered("initiate_auth_code_flow")
+    get_authorization_request_url = _NotOffered("get_authorization_request_url")
+    acquire_token_by_auth_code_flow = _NotOffered("acquire_token_by_auth_code_flow")
+    acquire_token_by_authorization_code = _NotOffered(
+        "acquire_token_by_authorization_code")
+    acquire_token_by_username_password = _NotOffered(
+        "acquire_token_by_username_password")
+
+    def __init__(self, client_id, *args, **kwargs):
+        if not kwargs.get("http_client"):
+            raise ValueError(
+                "An asyncio http_client is required, such as httpx.AsyncClient()")
+        for name in (
+                "azure_region", "allow_broker",
+                "rate_limiter", "retry_policy", "circuit_breaker",
+                "use_stdlib_http_client", "prewarm_connections",
+                "hedging_policy", "region_detector", "discovery_cache",
+                "refresh_in_background"):
+            if kwargs.get(name):
+                raise ValueError("{} is not supported in asyncio apps yet".format(name))
+        super(AsyncClientApplication, self).__init__(client_id, *args, **kwargs)
+
+    def _initialize_authority(
+            self, authority, validate_authority, azure_region, allow_broker):
+        # Discovery is deferred to _initialize_authority_async()
+        self._authority_to_use = authority or "https://{}/common/".format(WORLD_WIDE)
+        self._validate_authority = validate_authority
+        self._authority_lock = None  # Created lazily, inside a running event loop
+        self._enable_broker = False
+        self.authority = self.client = self._regional_client = None
+
+    async def _initialize_authority_async(self, deadline=None):
+        if self.authority:  # The most common path, which needs no lock
+            return
+        if deadline is None:
+            return await self._discover_authority_once()
+        timeout = deadline.shrink()  # Raises when there is no time left
+        try:
+            # Shielded, so that other callers can still use its outcome
+            await asyncio.wait_for(
+                asyncio.shield(self._discover_authority_once()), timeout)
+        except asyncio.TimeoutError:
+            raise deadline.error()
+
+    async def _discover_authority_once(self):
+        if self._authority_lock is None:
+            self._authority_lock = asyncio.Lock()
+        async with self._authority_lock:
+            if self.authority:  # Another coroutine has just completed it
+                return
+            authority = await _discover_authority(
+                self._authority_to_use,
+                self.http_client,
+                validate_authority=self._validate_authority,
+                instance_discovery=self._instance_discovery,
+                )
+            self.client, _ = self._build_client(
+                self.client_credential, authority, skip_regional_client=True)
+            self.authority = authority  # Assigned last, to signal the completion
+
+    async def get_accounts(self, username=None):
+        """The asyncio counterpart of :func:`msal.ClientApplication.get_accounts`"""
+        await self._initialize_authority_async()
+        accounts = self._find_msal_accounts(environment=self.authority.instance)
+        if not accounts:  # Now try other aliases of this authority instance
+            accounts = self._find_msal_accounts(
+                environment=await self._get_authority_aliases_async(
+                    self.authority.instance))
+        return _filter_accounts_by_username(accounts, username)
+
+    async def _get_authority_aliases_async(self, instance, **kwargs):
+        if self._instance_discovery is False:
+            return []
+        if self.authority._is_known_to_developer:
+            # Then it is an ADFS/B2C/known_authority_hosts situation
+            # which may not reach the central endpoint, so we skip it.
+            return []
+        if not self.authority_groups:
+            metadata = _get_shared_instance_metadata()
+            if metadata is None:
+                resp = await self.http_client.get(
+                    _INSTANCE_METADATA_URL, headers={'Accept': 'application/json'},
+                    **kwargs)
+                resp.raise_for_status()
+                metadata = json.loads(resp.text)['metadata']
+                _share_instance_metadata(metadata)
+            self._set_authority_groups(metadata)
+        return self._find_aliases_in_authority_groups(instance)
+
+    async def acquire_token_silent(
+            self, scopes, account, authority=None, force_refresh=False,
+            claims_challenge=None, **kwargs):
+        """The asyncio counterpart of
+        :func:`msal.ClientApplication.acquire_token_silent`"""
+        result = await self.acquire_token_silent_with_error(
+            scopes, account, authority=authority, force_refresh=force_refresh,
+            claims_challenge=claims_challenge, **kwargs)
+        return result if result and "error" not in result else None
+
+    async def acquire_token_silent_with_error(
+            self, scopes, account, authority=None, force_refresh=False,
+            claims_challenge=None, **kwargs):
+        """The asyncio counterpart of
+        :func:`msal.ClientApplication.acquire_token_silent_with_error`"""
+        assert isinstance(scopes, list), "Invalid parameter type"
+        deadline = _start_deadline(kwargs, self._request_timeout)
+        await self._initialize_authority_async(deadline=deadline)
+        self._validate_ssh_cert_input_data(kwargs.get("data", {}))
+        correlation_id = msal.telemetry._get_new_correlation_id()
+        if authority:
+            warnings.warn("We haven't decided how/if this method will accept authority parameter")
+        result = await self._acquire_token_silent_from_cache_and_possibly_refresh_it_async(
+            scopes, account, self.authority, force_refresh=force_refresh,
+            claims_challenge=claims_challenge,
+            correlation_id=correlation_id,
+            **kwargs)
+        if result and "error" not in result:
+            return result
+        final_result = result
+        aliases = await self._get_authority_aliases_async(
+            self.authority.instance,
+            **({"deadline": deadline} if deadline else {}))
+        aliases_having_rt = set(rt["environment"] for rt in self.token_cache.find(
+            self.token_cache.CredentialType.REFRESH_TOKEN,
+            query={"environment": set(aliases)})) if aliases else set()
+        for alias in aliases:
+            if alias not in aliases_having_rt:
+                # Skip heavy weight logic when RT for this alias doesn't exist
+                continue
+            the_authority = self._alias_authorities.get(alias)
+            if not the_authority:
+                the_authority = self._alias_authorities[alias] = (
+                    await _discover_authority(
+                        "https://" + alias + "/" + self.authority.tenant,
+                        self.http_client,
+                        instance_discovery=False,
+                        deadline=deadline,
+                        ))
+            result = await self._acquire_token_silent_from_cache_and_possibly_refresh_it_async(
+                scopes, account, the_authority, force_refresh=force_refresh,
+                claims_challenge=claims_challenge,
+                correlation_id=correlation_id,
+                **kwargs)
+            if result:
+                if "error" not in result:
+                    return result
+                final_result = result
+        return _classify(final_result)
+
+    async def _acquire_token_silent_from_cache_and_possibly_refresh_it_async(
+            self, scopes, account, authority,
+            force_refresh=False, claims_challenge=None, correlation_id=None,
+            **kwargs):
+        access_token_from_cache = None
+        if not (force_refresh or claims_challenge):  # Bypass AT when desired or using claims
+            access_token_from_cache, refresh_reason = self._find_access_token_in_cache(
+                scopes, account, authority, **kwargs)
+            if access_token_from_cache and not refresh_reason:
+                self._build_telemetry_context(-1).hit_an_access_token()
+                return access_token_from_cache  # It is still good as new
+        else:
+            refresh_reason = msal.telemetry.FORCE_REFRESH
+        try:
+            result = _clean_up(
+                await self._acquire_token_silent_by_finding_rt_belongs_to_me_or_my_family_async(
+                    authority, self._decorate_scope(scopes), account,
+                    refresh_reason=refresh_reason, claims_challenge=claims_challenge,
+                    correlation_id=correlation_id,
+                    **kwargs))
+            if (result and "error" not in result) or (not access_token_from_cache):
+                return result
+        except Exception:  # Not a bare except, which would swallow a cancellation
+            # Typically network error. Potential AAD outage?
+            if not access_token_from_cache:  # It means there is no fall back option
+                raise  # We choose to bubble up the exception
+        return access_token_from_cache
+
+    async def _acquire_token_silent_by_finding_rt_belongs_to_me_or_my_family_async(
+            self, authority, scopes, account, **kwargs):
+        return await _run_steps_async(self._refreshing_by_rt_belongs_to_me_or_my_family(
+            authority, scopes, account, **kwargs))
+
+    async def acquire_token_by_refresh_token(self, refresh_token, scopes, **kwargs):
+        """The asyncio counterpart of
+        :func:`msal.ClientApplication.acquire_token_by_refresh_token`"""
+        await self._initialize_authority_async(
+            deadline=_start_deadline(kwargs, self._request_timeout))
+        self._validate_ssh_cert_input_data(kwargs.get("data", {}))
+        telemetry_context = self._build_telemetry_context(
+            self.ACQUIRE_TOKEN_BY_REFRESH_TOKEN,
+            refresh_reason=msal.telemetry.FORCE_REFRESH)
+        response = _clean_up(await self.client.obtain_token_by_refresh_token(
+            refresh_token,
+            scope=self._decorate_scope(scopes),
+            headers=telemetry_context.generate_headers(),
+            rt_getter=lambda rt: rt,
+            on_updating_rt=False,
+            on_removing_rt=lambda rt_item: None,  # No OP
+            **kwargs))
+        telemetry_context.update_telemetry(response)
+        return response
+
+    async def close(self):
+        """Close the underlying http_client"""
+        await self.http_client.close()
+
+
+class AsyncPublicClientApplication(AsyncClientApplication):
+    """The asyncio counterpart of :class:`msal.PublicClientApplication`.
+
+    Only its silent flows and :func:`acquire_token_by_refresh_token`
+    are offered, for now.
+
+    New in version 1.23.0.
+    """
+    def __init__(self, client_id, client_credential=None, **kwargs):
+        if client_credential is not None:
+            raise ValueError("Public Client should not possess credentials")
+        super(AsyncPublicClientApplication, self).__init__(
+            client_id, client_credential=None, **kwargs)
+
+
+class AsyncConfidentialClientApplication(AsyncClientApplication):
+    """The asyncio counterpart of :class:`msal.ConfidentialClientApplication`.
+
+    New in version 1.23.0.
+    """
+
+    async def acquire_token_for_client(
+            self, scopes, claims_challenge=None, force_refresh=False, **kwargs):
+        """The asyncio counterpart of
+        :func:`msal.ConfidentialClientApplication.acquire_token_for_client`"""
+        if kwargs.get("tenant"):
+            raise ValueError("tenant is not supported in asyncio apps yet")
+        await self._initialize_authority_async(
+            deadline=_start_deadline(kwargs, self._request_timeout))
+        if self.authority.tenant.lower() in ["common", "organizations"]:
+            warnings.warn(
+                "Using /common or /organizations authority "
+                "in acquire_token_for_client() is unreliable. "
+                "Please use a specific tenant instead.", DeprecationWarning)
+        self._validate_ssh_cert_input_data(kwargs.get("data", {}))
+        access_token_from_cache = None
+        if not (force_refresh or claims_challenge):  # Bypass AT when desired or using claims
+            access_token_from_cache, refresh_reason = self._find_access_token_in_cache(
+                scopes, None, self.authority, **kwargs)  # App-only ATs have no account
+            if access_token_from_cache and not refresh_reason:
+                self._build_telemetry_context(-1).hit_an_access_token()
+                return access_token_from_cache  # It is still good as new
+        else:
+            refresh_reason = msal.telemetry.FORCE_REFRESH
+        telemetry_context = self._build_telemetry_context(
+            self.ACQUIRE_TOKEN_FOR_CLIENT_ID, refresh_reason=refresh_reason)
+        try:
+            response = _clean_up(await self.client.obtain_token_for_client(
+                scope=scopes,  # This grant flow requires no scope decoration
+                headers=telemetry_context.generate_headers(),
+                data=dict(
+                    kwargs.pop("data", {}),
+                    claims=_merge_claims_challenge_and_capabilities(
+                        self._client_capabilities, claims_challenge)),
+                **kwargs))
+        except Exception:  # Not a bare except, which would swallow a cancellation
+            if not access_token_from_cache:  # It means there is no fall back option
+                raise
+            logger.warning(
+                "Unable to refresh an aging token. Use it for now.", exc_info=True)
+            return access_token_from_cache
+        telemetry_context.update_telemetry(response)
+        if "error" in response and access_token_from_cache:
+            logger.warning(
+                "Unable to refresh an aging token: %s. Use it for now.",
+                response.get("error"))
+            return access_token_from_cache
+        return response
+
+    async def acquire_token_on_behalf_of(
+            self, user_assertion, scopes, claims_challenge=None, force_refresh=False,
+            **kwargs):
+        """The asyncio counterpart of
+        :func:`msal.ConfidentialClientApplication.acquire_token_on_behalf_of`"""
+        if kwargs.get("tenant"):
+            raise ValueError("tenant is not supported in asyncio apps yet")
+        await self._initialize_authority_async(
+            deadline=_start_deadline(kwargs, self._request_timeout))
+        return await _run_steps_async(self._obtaining_token_on_behalf_of(
+            self.client, self.authority, user_assertion, scopes,
+            claims_challenge=claims_challenge, force_refresh=force_refresh,
+            **kwargs))
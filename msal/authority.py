@@ -1,9 +1,13 @@
+from collections import OrderedDict
 import json
 try:
     from urllib.parse import urlparse
 except ImportError:  # Fall back to Python 2
     from urlparse import urlparse
 import logging
+from threading import Lock
+
+from .deadline import _now
 
 
 logger = logging.getLogger(__name__)
@@ -29,6 +33,11 @@ WELL_KNOWN_B2C_HOSTS = [
     "ciamlogin.com",
     ]
 _CIAM_DOMAIN_SUFFIX = ".ciamlogin.com"
+_UNABLE_TO_GET_AUTHORITY_CONFIGURATION = (
+    "Unable to get authority configuration for {}. "
+    "Authority would typically be in a format of "
+    "https://login.microsoftonline.com/your_tenant "
+    "Also please double check your tenant name or GUID is correct.")
 
 
 class AuthorityBuilder(object):
@@ -48,14 +57,24 @@ class Authority(object):
     """This class represents an (already-validated) authority.
 
     Once constructed, it contains members named "*_endpoint" for this instance.
-    TODO: It will also cache the previously-validated authority instances.
+    The discovered metadata is also shared by all the Authority instances
+    (and therefore all the apps) of the same authority in the current process,
+    for ``_openid_config_ttl`` seconds.
+    At most ``_openid_configs_capacity`` authorities are kept,
+    the least recently used one being evicted first.
     """
     _domains_without_user_realm_discovery = set([])
+    _openid_configs = OrderedDict()  # {registry_key: (openid_config, expires_at)}
+    _openid_configs_lock = Lock()
+    _openid_config_ttl = 24 * 3600
+    _openid_configs_capacity = 1000
 
     def __init__(
             self, authority_url, http_client,
             validate_authority=True,
             instance_discovery=None,
+            deadline=None,
+            discovery_cache=None,
             ):
         """Creates an authority instance, and also validates it.
 
@@ -64,6 +83,12 @@ class Authority(object):
             instance (a.k.a. host) and tenant. We always do a tenant discovery.
             This parameter only controls whether an instance discovery will be
             performed.
+        :param deadline:
+            An optional deadline of the current token acquisition,
+            which will be carried by the discovery requests.
+        :param discovery_cache:
+            An optional :class:`msal.discovery_cache.DiscoveryCache`,
+            which will be consulted before, and updated after, the discovery.
         """
         # :param instance_discovery:
         #    By default, the known-to-Microsoft validation will use an
@@ -71,6 +96,67 @@ class Authority(object):
         #    You can customize the endpoint by providing a url as a string.
         #    Or you can turn this behavior off by passing in a False here.
         self._http_client = http_client
+        kwargs = {"deadline": deadline} if deadline else {}
+        (authorization_endpoint, instance_discovery_endpoint, tenant_discovery_endpoint
+            ) = self._parse_authority_url(
+                authority_url, validate_authority, instance_discovery)
+        # A validated authority is registered under a different key,
+        # so that an unvalidated one would never be mistaken as validated.
+        registry_key = (tenant_discovery_endpoint, instance_discovery_endpoint)
+        openid_config = self._get_registered_openid_config(registry_key)
+        if not openid_config and discovery_cache:
+            openid_config = discovery_cache.get(registry_key)
+            if openid_config:
+                self._register_openid_config(registry_key, openid_config)
+        if openid_config:
+            self._apply_openid_config(openid_config)
+            return
+        if instance_discovery_endpoint:
+            # No request is sent to an unvalidated instance, not even speculatively,
+            # so tenant discovery has to wait for the instance discovery.
+            tenant_discovery_endpoint = self._get_tenant_discovery_endpoint(
+                _instance_discovery(
+                    authorization_endpoint,
+                    self._http_client,
+                    instance_discovery_endpoint,
+                    **kwargs),
+                authority_url)
+        try:
+            openid_config = tenant_discovery(
+                tenant_discovery_endpoint,
+                self._http_client,
+                **kwargs)
+        except ValueError:
+            raise ValueError(_UNABLE_TO_GET_AUTHORITY_CONFIGURATION.format(
+                authority_url))
+        self._apply_openid_config(openid_config)
+        self._register_openid_config(registry_key, openid_config)
+        if discovery_cache:
+            discovery_cache.set(registry_key, openid_config)
+
+    @classmethod
+    def _get_registered_openid_config(cls, key):
+        with cls._openid_configs_lock:
+            openid_config, expires_at = cls._openid_configs.pop(key, (None, 0))
+            if openid_config and expires_at <= _now():
+                return None
+            if openid_config:  # Re-inserted as the most recently used one
+                cls._openid_configs[key] = (openid_config, expires_at)
+        return openid_config
+
+    @classmethod
+    def _register_openid_config(cls, key, openid_config):
+        with cls._openid_configs_lock:
+            cls._openid_configs.pop(key, None)
+            cls._openid_configs[key] = (openid_config, _now() + cls._openid_config_ttl)
+            while len(cls._openid_configs) > cls._openid_configs_capacity:
+                cls._openid_configs.popitem(last=False)  # The least recently used
+
+    def _parse_authority_url(
+            self, authority_url, validate_authority, instance_discovery):
+        # Sets the attributes known without network io, and returns a tuple of
+        # (authorization_endpoint, instance_discovery_endpoint_or_none,
+        # tenant_discovery_endpoint_to_use_when_skipping_instance_discovery)
         if isinstance(authority_url, AuthorityBuilder):
             authority_url = str(authority_url)
         authority, self.instance, tenant = canonicalize(authority_url)
@@ -87,48 +173,42 @@ class Authority(object):
                 # See https://github.com/AzureAD/microsoft-authentication-library-for-dotnet/blob/4.0.0/src/Microsoft.Identity.Client/Instance/AadInstanceDiscovery.cs#L101-L103
                 # and https://github.com/AzureAD/microsoft-authentication-library-for-dotnet/blob/4.0.0/src/Microsoft.Identity.Client/Instance/AadAuthority.cs#L19-L33
             ) if instance_discovery in (None, True) else instance_discovery
-        if instance_discovery_endpoint and not (
+        if not instance_discovery_endpoint or (
                 is_known_to_microsoft or self._is_known_to_developer):
-            payload = _instance_discovery(
-                "https://{}{}/oauth2/v2.0/authorize".format(
-                    self.instance, authority.path),
-                self._http_client,
-                instance_discovery_endpoint)
-            if payload.get("error") == "invalid_instance":
-                raise ValueError(
-                    "invalid_instance: "
-                    "The authority you provided, %s, is not whitelisted. "
-                    "If it is indeed your legit customized domain name, "
-                    "you can turn off this check by passing in "
-                    "validate_authority=False"
-                    % authority_url)
-            tenant_discovery_endpoint = payload['tenant_discovery_endpoint']
-        else:
-            tenant_discovery_endpoint = authority._replace(
+            instance_discovery_endpoint = None
+        return (
+            "https://{}{}/oauth2/v2.0/authorize".format(
+                self.instance, authority.path),
+            instance_discovery_endpoint,
+            authority._replace(
                 path="{prefix}{version}/.well-known/openid-configuration".format(
                     prefix=tenant if is_ciam and len(authority.path) <= 1  # Path-less CIAM
                         else authority.path,  # In B2C, it is "/tenant/policy"
                     version="" if self.is_adfs else "/v2.0",
                     )
-                ).geturl()  # Keeping original port and query. Query is useful for test.
-        try:
-            openid_config = tenant_discovery(
-                tenant_discovery_endpoint,
-                self._http_client)
-        except ValueError:
+                ).geturl(),  # Keeping original port and query. Query is useful for test.
+            )
+
+    def _get_tenant_discovery_endpoint(self, instance_discovery_payload, authority_url):
+        if instance_discovery_payload.get("error") == "invalid_instance":
             raise ValueError(
-                "Unable to get authority configuration for {}. "
-                "Authority would typically be in a format of "
-                "https://login.microsoftonline.com/your_tenant "
-                "Also please double check your tenant name or GUID is correct.".format(
-                authority_url))
+                "invalid_instance: "
+                "The authority you provided, %s, is not whitelisted. "
+                "If it is indeed your legit customized domain name, "
+                "you can turn off this check by passing in "
+                "validate_authority=False"
+                % authority_url)
+        return instance_discovery_payload['tenant_discovery_endpoint']
+
+    def _apply_openid_config(self, openid_config):
         logger.debug("openid_config = %s", openid_config)
         self.authorization_endpoint = openid_config['authorization_endpoint']
         self.token_endpoint = openid_config['token_endpoint']
         self.device_authorization_endpoint = openid_config.get('device_authorization_endpoint')
         _, _, self.tenant = canonicalize(self.token_endpoint)  # Usually a GUID
 
-    def user_realm_discovery(self, username, correlation_id=None, response=None):
+    def user_realm_discovery(
+            self, username, correlation_id=None, response=None, deadline=None):
         # It will typically return a dict containing "ver", "account_type",
         # "federation_protocol", "cloud_audience_urn",
         # "federation_metadata_url", "federation_active_auth_url", etc.
@@ -137,7 +217,8 @@ class Authority(object):
                 "https://{netloc}/common/userrealm/{username}?api-version=1.0".format(
                     netloc=self.instance, username=username),
                 headers={'Accept': 'application/json',
-                         'client-request-id': correlation_id},)
+                         'client-request-id': correlation_id},
+                **({"deadline": deadline} if deadline else {}))
             if resp.status_code != 404:
                 resp.raise_for_status()
                 return json.loads(resp.text)
@@ -178,6 +259,9 @@ def _instance_discovery(url, http_client, instance_discovery_endpoint, **kwargs)
 def tenant_discovery(tenant_discovery_endpoint, http_client, **kwargs):
     # Returns Openid Configuration
     resp = http_client.get(tenant_discovery_endpoint, **kwargs)
+    return _parse_openid_configuration(tenant_discovery_endpoint, resp)
+
+def _parse_openid_configuration(tenant_discovery_endpoint, resp):
     if resp.status_code == 200:
         return json.loads(resp.text)  # It could raise ValueError
     if 400 <= resp.status_code < 500:
@@ -192,4 +276,3 @@ def tenant_discovery(tenant_discovery_endpoint, http_client, **kwargs):
     resp.raise_for_status()
     raise RuntimeError(  # A fallback here, in case resp.raise_for_status() is no-op
         "Unable to complete OIDC Discovery: %d, %s" % (resp.status_code, resp.text))
-
@@ -0,0 +1,36 @@
+"""Run independent steps, such as startup discoveries, concurrently."""
+from threading import Event, Thread
+
+
+class _BackgroundCall(object):
+    """Call a function on a daemon thread, whose outcome can be waited for.
+
+    An outcome not waited for is simply discarded,
+    and an abandoned call won't block the interpreter from exiting.
+    """
+    def __init__(self, function, *args, **kwargs):
+        self._done = Event()
+        self._result = self._error = None
+        def run():
+            try:
+                self._result = function(*args, **kwargs)
+            except Exception as e:  # To be re-raised by the waiter
+                self._error = e
+            finally:
+                self._done.set()
+        thread = Thread(target=run, name="msal-{}".format(
+            getattr(function, "__name__", "background")))
+        thread.daemon = True
+        thread.start()
+
+    def result(self, timeout=None, default=None):
+        """Return the function's result, or raise its exception.
+
+        :param timeout: The seconds to wait. None means waiting until it completes.
+        :param default: The value to return when the timeout expires.
+        """
+        if not self._done.wait(timeout):
+            return default
+        if self._error is not None:
+            raise self._error
+        return self._result
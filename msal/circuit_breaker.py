@@ -0,0 +1,151 @@
+"""A per-host circuit breaker, so that MSAL can stop sending requests to
+a degraded (typically regional) token endpoint, and fall back to another one.
+"""
+from collections import deque
+from threading import Lock
+import logging
+
+from .deadline import _now
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Circuit(object):
+    def __init__(self, window_size):
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window_size)  # Each is (failed, latency)
+        self.opened_at = None
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+        self.times_opened = 0
+
+
+class CircuitBreaker(object):
+    """A thread-safe circuit breaker, keyed by host.
+
+    Usage::
+
+        from msal.circuit_breaker import CircuitBreaker
+        app = msal.ConfidentialClientApplication(
+            ..., azure_region="westus", circuit_breaker=CircuitBreaker())
+
+    A circuit is closed by default. It opens when the recent requests to a host
+    have failed (or been too slow) too often. While it is open, requests would
+    be routed elsewhere. After ``open_duration``, the circuit becomes half-open,
+    and exactly one request will be allowed to probe that host.
+    The probe's outcome decides whether the circuit closes or opens again.
+    """
+    def __init__(
+            self,
+            failure_rate_threshold=0.5,
+            minimum_requests=5,
+            window_size=20,
+            slow_call_threshold=None,
+            open_duration=30,
+            ):
+        """Create a circuit breaker.
+
+        :param float failure_rate_threshold:
+            The ratio of failed requests, among the recent ``window_size`` ones,
+            which would open the circuit.
+        :param int minimum_requests:
+            A circuit won't open until it has seen at least this many requests.
+        :param int window_size: How many recent requests will be considered.
+        :param float slow_call_threshold:
+            A request taking longer than these seconds counts as a failure.
+            Defaults to None, meaning latency alone never counts as a failure.
+        :param float open_duration:
+            How many seconds a circuit stays open before allowing a probe.
+        """
+        self._failure_rate_threshold = failure_rate_threshold
+        self._minimum_requests = minimum_requests
+        self._window_size = window_size
+        self._slow_call_threshold = slow_call_threshold
+        self._open_duration = open_duration
+        self._circuits = {}
+        self._lock = Lock()
+
+    def _get_circuit(self, host):  # Needs to be called with self._lock held
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = _Circuit(self._window_size)
+        return circuit
+
+    def allow(self, host):
+        """Return True if a request to this host shall be attempted now.
+
+        Caller shall then report its outcome via :func:`~record`.
+        """
+        with self._lock:
+            circuit = self._get_circuit(host)
+            if circuit.state == OPEN and (
+                    _now() - circuit.opened_at >= self._open_duration):
+                circuit.state = HALF_OPEN
+                circuit.probing = False
+            if circuit.state == HALF_OPEN:
+                if circuit.probing:
+                    return False  # Only one probe at a time
+                circuit.probing = True
+                return True
+            return circuit.state == CLOSED
+
+    def record(self, host, failed, latency=None):
+        """Report the outcome of a request previously allowed by :func:`~allow`"""
+        failed = bool(failed or (
+            self._slow_call_threshold is not None and latency is not None
+            and latency > self._slow_call_threshold))
+        with self._lock:
+            circuit = self._get_circuit(host)
+            circuit.requests += 1
+            circuit.failures += 1 if failed else 0
+            if circuit.state == HALF_OPEN:
+                circuit.probing = False
+                if failed:
+                    self._open(host, circuit)
+                else:
+                    logger.info("Circuit for %s is closed again", host)
+                    circuit.state = CLOSED
+                    circuit.outcomes.clear()
+                return
+            circuit.outcomes.append((failed, latency))
+            failures = sum(1 for f, _ in circuit.outcomes if f)
+            if (circuit.state == CLOSED
+                    and len(circuit.outcomes) >= self._minimum_requests
+                    and failures >= self._failure_rate_threshold * len(circuit.outcomes)):
+                self._open(host, circuit)
+
+    def _open(self, host, circuit):  # Needs to be called with self._lock held
+        logger.warning(
+            "Circuit for %s is open for %s seconds", host, self._open_duration)
+        circuit.state = OPEN
+        circuit.opened_at = _now()
+        circuit.times_opened += 1
+
+    def get_metrics(self):
+        """Return a dict of health metrics, keyed by host.
+
+        Each value is a dict containing "state", "requests", "failures",
+        "times_opened", and the "error_rate" and "average_latency" (in seconds)
+        of the recent requests.
+        """
+        with self._lock:
+            metrics = {}
+            for host, c in self._circuits.items():
+                latencies = [l for _, l in c.outcomes if l is not None]
+                metrics[host] = {
+                    "state": c.state,
+                    "requests": c.requests,
+                    "failures": c.failures,
+                    "times_opened": c.times_opened,
+                    "error_rate": sum(1 for f, _ in c.outcomes if f) / float(
+                        len(c.outcomes)) if c.outcomes else 0.0,
+                    "average_latency": sum(latencies) / len(latencies)
+                        if latencies else None,
+                    }
+            return metrics
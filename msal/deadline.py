@@ -0,0 +1,62 @@
+"""Bound the overall time spent by one token acquisition.
+
+A token acquisition may chain several http requests, such as instance
+metadata lookup, a few refresh token attempts and their retries.
+A deadline is started once per acquisition, and then travels along with
+each of those requests as a ``deadline`` keyword argument,
+so that every request only gets the time that remains.
+"""
+import time
+
+
+_now = getattr(time, "monotonic", time.time)  # Python 2 has no monotonic clock
+
+
+class DeadlineExceededError(RuntimeError):
+    """Raised when a token acquisition runs out of time before its next request"""
+
+
+class _Deadline(object):
+    def __init__(self, timeout, default_request_timeout=None):
+        self.timeout = timeout
+        self.expires_at = _now() + timeout
+        self._default_request_timeout = default_request_timeout
+
+    def remaining(self):
+        """Return the remaining seconds. It could be negative."""
+        return self.expires_at - _now()
+
+    def error(self):
+        return DeadlineExceededError(
+            "Token acquisition did not complete within {} seconds".format(
+                self.timeout))
+
+    def shrink(self, request_timeout=None):
+        """Return a request timeout no longer than the remaining seconds.
+
+        :param request_timeout:
+            The timeout this request would otherwise have, in any format
+            accepted by the ``requests`` library, i.e. None, a number,
+            or a (connect_timeout, read_timeout) tuple.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise self.error()
+        if request_timeout is None:
+            request_timeout = self._default_request_timeout
+        if isinstance(request_timeout, tuple):
+            return tuple(
+                remaining if t is None else min(t, remaining)
+                for t in request_timeout)
+        return remaining if request_timeout is None else min(
+            request_timeout, remaining)
+
+
+def _start_deadline(kwargs, default_request_timeout=None):
+    # Converts the caller's "timeout" into a "deadline", in place.
+    # A deadline already started by an outer call is kept as-is.
+    timeout = kwargs.pop("timeout", None)
+    if timeout is not None and not kwargs.get("deadline"):
+        kwargs["deadline"] = _Deadline(
+            timeout, default_request_timeout=default_request_timeout)
+    return kwargs.get("deadline")
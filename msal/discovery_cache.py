@@ -0,0 +1,141 @@
+"""Persist authority discovery results, so that short-lived processes,
+such as command-line tools, cron jobs and serverless functions,
+can skip the discovery round trips at start-up.
+"""
+import json
+import logging
+import os
+from threading import Lock
+import time
+
+from .authority import canonicalize
+
+
+logger = logging.getLogger(__name__)
+
+
+def _serialize_key(key):
+    tenant_discovery_endpoint, instance_discovery_endpoint = key
+    return " ".join(filter(None, [tenant_discovery_endpoint, instance_discovery_endpoint]))
+
+
+def _load(path):
+    # Returns the whole document, or {} if it is missing or corrupted
+    try:
+        with open(path) as f:
+            document = json.load(f)
+    except (IOError, OSError, ValueError):
+        logger.debug("Unable to load discovery cache from %s", path, exc_info=True)
+        return {}
+    return document if isinstance(document, dict) else {}
+
+
+def _section(document, name):
+    section = document.get(name)
+    return section if isinstance(section, dict) else {}
+
+
+def _is_openid_config(config):
+    try:
+        canonicalize(config["token_endpoint"])  # The way an Authority would use it
+        return bool(config["authorization_endpoint"])
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return False
+
+
+def _is_instance_metadata(metadata):
+    return isinstance(metadata, list) and all(
+        isinstance(group, dict) and isinstance(group.get("aliases"), list)
+        for group in metadata)
+
+
+class DiscoveryCache(object):
+    """A file-based cache of authority discovery results.
+
+    Usage::
+
+        from msal.discovery_cache import DiscoveryCache
+        app = msal.ConfidentialClientApplication(
+            ..., discovery_cache=DiscoveryCache("/tmp/msal_discovery.json"))
+
+    A cached OpenID configuration of a validated authority stands for both
+    the instance discovery and the tenant discovery of that authority,
+    so both round trips will be skipped.
+    The instance metadata, i.e. the aliases of each cloud,
+    which an app looks up when it reads accounts and tokens from its token cache,
+    is also cached, so that its round trip will be skipped, too.
+
+    A seed file, in the same format, can be shipped along with your app,
+    such as in a container image, so that even the first run needs no discovery.
+    Typically, it is a cache file produced during your image build.
+    Seeded entries never expire.
+
+    A corrupted file, or a corrupted entry in it, is treated as a cache miss.
+    """
+    def __init__(self, path=None, ttl=24 * 3600, seed=None):
+        """Create a discovery cache.
+
+        :param str path:
+            The cache file to read from and write to.
+            Defaults to None, meaning to rely on the ``seed`` only.
+        :param float ttl: The seconds for which a cached result will be used.
+        :param str seed:
+            The path of a read-only file containing pre-seeded results.
+        """
+        self._path = path
+        self._ttl = ttl
+        self._seeded = _load(seed) if seed else {}
+        self._lock = Lock()
+
+    def _is_fresh(self, entry):
+        discovered_at = entry.get("discovered_at") if isinstance(entry, dict) else None
+        return isinstance(discovered_at, (int, float)) and (
+            0 <= time.time() - discovered_at < self._ttl)
+
+    def _get(self, section, key, name, is_valid):
+        # Returns the valid value of a seeded or fresh entry, or None
+        seeded = _section(self._seeded, section).get(key)
+        if isinstance(seeded, dict) and is_valid(seeded.get(name)):
+            return seeded[name]
+        if not self._path:
+            return None
+        entry = _section(_load(self._path), section).get(key)
+        if self._is_fresh(entry) and is_valid(entry.get(name)):
+            return entry[name]
+        return None
+
+    def _set(self, section, key, name, value):
+        if not self._path:
+            return
+        with self._lock:
+            document = _load(self._path)
+            document = {  # Only fresh entries survive
+                s: {k: v for k, v in _section(document, s).items() if self._is_fresh(v)}
+                for s in ("openid_configs", "instance_metadata")}
+            document[section][key] = {name: value, "discovered_at": time.time()}
+            temp = "{}.{}.tmp".format(self._path, os.getpid())
+            try:
+                with open(temp, "w") as f:
+                    json.dump(document, f)
+                getattr(os, "replace", os.rename)(temp, self._path)  # Atomically
+            except (IOError, OSError):
+                logger.debug(
+                    "Unable to save discovery cache to %s", self._path, exc_info=True)
+
+    def get(self, key):
+        """Return the cached OpenID configuration of this key, or None"""
+        return self._get(
+            "openid_configs", _serialize_key(key), "openid_config", _is_openid_config)
+
+    def set(self, key, openid_config):
+        """Save the OpenID configuration of this key"""
+        self._set("openid_configs", _serialize_key(key), "openid_config", openid_config)
+
+    def get_instance_metadata(self, endpoint):
+        """Return the cached instance metadata from this endpoint, or None"""
+        return self._get(
+            "instance_metadata", endpoint, "metadata", _is_instance_metadata)
+
+    def set_instance_metadata(self, endpoint, metadata):
+        """Save the instance metadata from this endpoint"""
+        self._set("instance_metadata", endpoint, "metadata", metadata)
@@ -0,0 +1,158 @@
+"""Hedge a slow token request to the regional endpoint with the same request
+to the central endpoint, so that the tail latency of a confidential client
+is bounded by the faster of the two.
+"""
+from collections import deque
+from threading import Lock, Thread
+import math
+import logging
+try:
+    from queue import Queue
+except ImportError:  # Fall back to Python 2
+    from Queue import Queue
+
+from .deadline import _now
+
+
+logger = logging.getLogger(__name__)
+
+
+def _is_successful(outcome):
+    result, error = outcome
+    return error is None and "error" not in result
+
+
+class HedgingPolicy(object):
+    """A thread-safe policy deciding when to hedge a regional token request.
+
+    Usage::
+
+        from msal.hedging import HedgingPolicy
+        app = msal.ConfidentialClientApplication(
+            ..., azure_region="westus", hedging_policy=HedgingPolicy())
+
+    A token request is sent to the regional endpoint first.
+    If it has not answered within the recent ``percentile`` latency of
+    the regional endpoint, the same request is also sent to the central endpoint,
+    and the first successful response wins.
+    The other request is abandoned, and its response, if any, is discarded
+    without reaching the token cache.
+    A regional request which fails with a connection error
+    is hedged immediately, regardless of the latency.
+    """
+    def __init__(
+            self,
+            percentile=95,
+            initial_delay=0.5,
+            min_delay=0.05,
+            minimum_requests=10,
+            window_size=100,
+            ):
+        """Create a hedging policy.
+
+        :param float percentile:
+            A request slower than this percentile of the recent regional
+            latencies will be hedged. 95 means roughly 5% of requests would be.
+        :param float initial_delay:
+            The seconds to wait before hedging,
+            until there are ``minimum_requests`` latency samples.
+        :param float min_delay:
+            The shortest seconds to wait before hedging,
+            so that a fast and stable regional endpoint won't cause
+            most of its requests to be hedged.
+        :param int minimum_requests:
+            How many latency samples are needed before using the percentile.
+        :param int window_size: How many recent latency samples will be kept.
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile needs to be in range (0, 100]")
+        self._percentile = percentile
+        self._initial_delay = initial_delay
+        self._min_delay = min_delay
+        self._minimum_requests = minimum_requests
+        self._latencies = deque(maxlen=window_size)
+        self._requests = 0
+        self._hedged = 0
+        self._secondary_wins = 0
+        self._lock = Lock()
+
+    def get_delay(self):
+        """Return the seconds to wait for a regional response before hedging"""
+        with self._lock:
+            if len(self._latencies) < self._minimum_requests:
+                return self._initial_delay
+            latencies = sorted(self._latencies)
+        index = int(math.ceil(self._percentile / 100.0 * len(latencies))) - 1
+        return max(self._min_delay, latencies[index])
+
+    def record(self, latency):
+        """Record the latency of a regional request which has completed"""
+        with self._lock:
+            self._latencies.append(latency)
+
+    def run(self, primary, secondary):
+        """Call primary(), and also secondary() when primary() is slow or broken.
+
+        Both of them are called on daemon threads.
+        The first successful result is returned.
+        When neither succeeds, the primary's error response is preferred,
+        then the secondary's, and exceptions are raised as a last resort.
+        """
+        outcomes = Queue()
+        def call(name, function):
+            try:
+                outcomes.put((name, (function(), None)))
+            except Exception as e:  # The exact exception is transport-dependent
+                outcomes.put((name, (None, e)))
+        def start(name, function):
+            thread = Thread(target=call, args=(name, function), name="msal-hedging")
+            thread.daemon = True  # An abandoned request won't block the interpreter
+            thread.start()
+        with self._lock:
+            self._requests += 1
+        delay = self.get_delay()
+        start("primary", primary)
+        received = {}
+        try:
+            name, outcome = outcomes.get(timeout=delay)
+        except Exception:  # queue.Empty, i.e. the primary is slow
+            logger.debug("Hedging after %.3f seconds", delay)
+        else:
+            if outcome[1] is None:  # Answered in time, successful or not
+                return self._conclude(outcome)
+            logger.debug("Hedging immediately, due to %s", outcome[1])
+            received[name] = outcome
+        with self._lock:
+            self._hedged += 1
+        start("secondary", secondary)
+        while len(received) < 2:
+            name, outcome = outcomes.get()
+            if _is_successful(outcome):
+                if name == "secondary":
+                    with self._lock:
+                        self._secondary_wins += 1
+                return self._conclude(outcome)
+            received[name] = outcome
+        for name in ("primary", "secondary"):
+            if received[name][1] is None:
+                return self._conclude(received[name])
+        return self._conclude(received["primary"])
+
+    @staticmethod
+    def _conclude(outcome):
+        result, error = outcome
+        if error is not None:
+            raise error
+        return result
+
+    def get_metrics(self):
+        """Return a dict containing "requests", "hedged", "secondary_wins"
+        and the current "delay" (in seconds)."""
+        with self._lock:
+            metrics = {
+                "requests": self._requests,
+                "hedged": self._hedged,
+                "secondary_wins": self._secondary_wins,
+                }
+        metrics["delay"] = self.get_delay()
+        return metrics
@@ -12,6 +12,7 @@ class _ExpiringMapping(MutableMapping):
     _INDEX = "_index_"
 
     def __init__(self, mapping=None, capacity=None, expires_in=None, lock=None,
+        capacity_in_bytes=None, size_of=None,
         *args, **kwargs):
         """Items in this mapping can have individual shelf life,
         just like food items in your refrigerator have their different shelf life
@@ -52,10 +53,25 @@ class _ExpiringMapping(MutableMapping):
             If no lock is provided, a threading.Lock will be used.
             But you may want to supply a different lock,
             if your customized mapping is being shared differently.
+
+        :param int capacity_in_bytes:
+            How many bytes all items in this mapping will add up to,
+            as estimated by ``size_of``.
+            When exceeded, items expiring soonest will be deleted,
+            the same way as when ``capacity`` is exceeded.
+
+            The default value is None, which means there is no such limit.
+
+        :param callable size_of:
+            A callable which estimates the size of a value, in bytes.
+            It is only needed when ``capacity_in_bytes`` is in use.
+            The default implementation is ``len(repr(value))``.
         """
         super(_ExpiringMapping, self).__init__(*args, **kwargs)
         self._mapping = mapping if mapping is not None else {}
         self._capacity = capacity
+        self._capacity_in_bytes = capacity_in_bytes
+        self._size_of = size_of or (lambda value: len(repr(value)))
         self._expires_in = expires_in
         self._lock = Lock() if lock is None else lock
 
@@ -96,8 +112,12 @@ class _ExpiringMapping(MutableMapping):
             self._drop_indexed_entry(timestamps, heapq.heappushpop(sequence, entry))
         else:  # Simply add new entry. The old one would become a harmless orphan.
             heapq.heappush(sequence, entry)
-        timestamps[key] = [expires_at, now]  # It overwrites existing key, if any
+        timestamps[key] = [  # It overwrites existing key, if any
+            expires_at, now,
+            self._size_of(value) if self._capacity_in_bytes is not None else 0,
+            ]
         self._mapping[key] = value
+        self._evict_beyond_capacity_in_bytes(sequence, timestamps)
         self._mapping[self._INDEX] = sequence, timestamps
 
     def _maintenance(self, sequence, timestamps):  # O(logN)
@@ -112,11 +132,26 @@ class _ExpiringMapping(MutableMapping):
         while self._capacity is not None and len(timestamps) > self._capacity:
             self._drop_indexed_entry(timestamps, sequence[0])  # It could error out
             heapq.heappop(sequence)  # Only pop it after a successful _drop_indexed_entry()
+        self._evict_beyond_capacity_in_bytes(sequence, timestamps)
+
+    def _evict_beyond_capacity_in_bytes(self, sequence, timestamps):  # O(N)
+        """It will modify input sequence and timestamps in-place"""
+        if self._capacity_in_bytes is None:
+            return
+        total = sum(  # Entries persisted by older versions carry no size
+            t[2] for t in timestamps.values() if len(t) > 2)
+        while sequence and total > self._capacity_in_bytes:
+            expires_at, created_at, key = sequence[0]
+            timestamp = timestamps.get(key, [])
+            if timestamp[:2] == [expires_at, created_at] and len(timestamp) > 2:
+                total -= timestamp[2]
+            self._drop_indexed_entry(timestamps, sequence[0])  # It could error out
+            heapq.heappop(sequence)  # Only pop it after a successful _drop_indexed_entry()
 
     def _drop_indexed_entry(self, timestamps, entry):
         """For an entry came from index, drop it from timestamps and self._mapping"""
         expires_at, created_at, key = entry
-        if [expires_at, created_at] == timestamps.get(key):  # So it is not an orphan
+        if [expires_at, created_at] == timestamps.get(key, [])[:2]:  # Not an orphan
             self._mapping.pop(key, None)  # It could raise exception
             timestamps.pop(key, None)  # This would probably always succeed
 
@@ -131,23 +166,40 @@ class _ExpiringMapping(MutableMapping):
         with self._lock:
             self._set(key, value, self._expires_in)
 
+    def merge(self, key, function):
+        """Replace the item of this key by ``function(current_value_or_none)``,
+        atomically, so that concurrent merges of a same key won't lose updates.
+
+        The function shall return a (new_value, expires_in) tuple.
+        """
+        with self._lock:
+            try:
+                current = self._get(key)
+            except KeyError:
+                current = None
+            value, expires_in = function(current)
+            self._set(key, value, expires_in)
+
     def __getitem__(self, key):  # O(1)
         """If the item you requested already expires, KeyError will be raised."""
-        self._validate_key(key)
         with self._lock:
-            # Skip self._maintenance(), because it would need O(logN) time
-            sequence, timestamps = self._mapping.get(self._INDEX, ([], {}))
-            expires_at, created_at = timestamps[key]  # Would raise KeyError accordingly
-            now = int(time.time())
-            if not created_at <= now < expires_at:
-                self._mapping.pop(key, None)
-                timestamps.pop(key, None)
-                self._mapping[self._INDEX] = sequence, timestamps
-                raise KeyError("{} {}".format(
-                    key,
-                    "expired" if now >= expires_at else "created in the future?",
-                    ))
-            return self._mapping[key]  # O(1)
+            return self._get(key)
+
+    def _get(self, key):
+        self._validate_key(key)
+        # Skip self._maintenance(), because it would need O(logN) time
+        sequence, timestamps = self._mapping.get(self._INDEX, ([], {}))
+        expires_at, created_at = timestamps[key][:2]  # Could raise KeyError
+        now = int(time.time())
+        if not created_at <= now < expires_at:
+            self._mapping.pop(key, None)
+            timestamps.pop(key, None)
+            self._mapping[self._INDEX] = sequence, timestamps
+            raise KeyError("{} {}".format(
+                key,
+                "expired" if now >= expires_at else "created in the future?",
+                ))
+        return self._mapping[key]  # O(1)
 
     def __delitem__(self, key):  # O(1)
         """If the item you requested already expires, KeyError will be raised."""
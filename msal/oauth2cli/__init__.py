@@ -1,7 +1,17 @@
 __version__ = "0.4.0"
 
+import sys
+
 from .oidc import Client
 from .assertion import JwtAssertionCreator
 from .assertion import JwtSigner  # Obsolete. For backward compatibility.
-from .authcode import AuthCodeReceiver
 
+if sys.version_info >= (3, 7):  # Module-level __getattr__ is defined in PEP 562
+    def __getattr__(name):
+        # AuthCodeReceiver is imported on first use, because it needs http.server
+        if name == "AuthCodeReceiver":
+            from .authcode import AuthCodeReceiver
+            return AuthCodeReceiver
+        raise AttributeError("module {} has no attribute {}".format(__name__, name))
+else:
+    from .authcode import AuthCodeReceiver
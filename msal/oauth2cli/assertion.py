@@ -1,7 +1,6 @@
 import time
 import binascii
 import base64
-import uuid
 import logging
 
 
@@ -98,6 +97,7 @@ class JwtAssertionCreator(AssertionCreator):
         Key-value pairs in additional_claims will be added into payload as-is.
         """
         import jwt  # Lazy loading
+        import uuid  # Lazy loading, because it imports platform
         now = time.time()
         payload = {
             'aud': audience,
@@ -0,0 +1,48 @@
+"""This module documents the minimal asyncio http behaviors used by this package.
+
+It is the asyncio counterpart of :mod:`.http`, and requires Python 3.5+.
+Its interface is a subset of both ``httpx.AsyncClient`` and
+``aiohttp.ClientSession``, so either of them can be used as-is.
+"""
+import inspect
+
+from .http import _get_status_code
+
+
+class AsyncHttpClient(object):
+    """This describes a minimal asyncio http request interface."""
+
+    async def post(self, url, params=None, data=None, headers=None, **kwargs):
+        """HTTP post. Same as :func:`.http.HttpClient.post`, but awaitable.
+
+        It returns a :class:`.http.Response`-like object,
+        whose ``status_code`` may be named ``status``,
+        and whose ``text`` may be an awaitable or a coroutine function.
+        """
+        raise NotImplementedError("Your implementation should provide this")
+
+    async def get(self, url, params=None, headers=None, **kwargs):
+        """HTTP get. Same as :func:`.http.HttpClient.get`, but awaitable."""
+        raise NotImplementedError("Your implementation should provide this")
+
+
+class _BufferedResponse(object):
+    # A response whose body has been read, so it can be used by the sync code
+    def __init__(self, response, text):
+        self.status_code = _get_status_code(response)
+        self.headers = getattr(response, "headers", {})
+        self.text = text
+        self._response = response
+
+    def raise_for_status(self):
+        return self._response.raise_for_status()
+
+
+async def _buffer(response):
+    """Read the body of a response returned by an AsyncHttpClient"""
+    text = response.text
+    if callable(text):  # Such as aiohttp's ClientResponse.text()
+        text = text()
+    if inspect.isawaitable(text):
+        text = await text
+    return _BufferedResponse(response, text)
@@ -15,9 +15,7 @@ import sys
 import functools
 import random
 import string
-import hashlib
 
-from .authcode import AuthCodeReceiver as _AuthCodeReceiver
 
 try:
     PermissionError  # Available in Python 3
@@ -189,6 +187,15 @@ class BaseClient(object):
                         #   Mock(status_code=200, text='{}')
             **kwargs  # Relay all extra parameters to underlying requests
             ):  # Returns the json object came from the OAUTH2 response
+        _data, _headers = self._prepare_token_request(grant_type, data, headers)
+        resp = (post or self._http_client.post)(
+            self.configuration["token_endpoint"],
+            headers=_headers, params=params, data=_data,
+            **kwargs)
+        return self._parse_token_response(resp)
+
+    def _prepare_token_request(self, grant_type, data=None, headers=None):
+        # Returns the (data, headers) to be sent to the token endpoint
         _data = {'client_id': self.client_id, 'grant_type': grant_type}
 
         if self.default_body.get("client_assertion_type") and self.client_assertion:
@@ -231,12 +238,11 @@ class BaseClient(object):
 
         if "token_endpoint" not in self.configuration:
             raise ValueError("token_endpoint not found in configuration")
-        resp = (post or self._http_client.post)(
-            self.configuration["token_endpoint"],
-            headers=_headers, params=params, data=_data,
-            **kwargs)
+        return _data, _headers
+
+    def _parse_token_response(self, resp):
         if resp.status_code >= 500:
-            resp.raise_for_status()  # TODO: Will probably retry here
+            resp.raise_for_status()  # Retry, if any, is up to the http_client
         try:
             # The spec (https://tools.ietf.org/html/rfc6749#section-5.2) says
             # even an error response will be a valid json structure,
@@ -273,6 +279,7 @@ def _scope_set(scope):
 
 
 def _generate_pkce_code_verifier(length=43):
+    import hashlib  # Lazy loading, because it loads OpenSSL
     assert 43 <= length <= 128
     verifier = "".join(  # https://tools.ietf.org/html/rfc7636#section-4.1
         random.sample(string.ascii_letters + string.digits + "-._~", length))
@@ -625,8 +632,9 @@ class Client(BaseClient):  # We choose to implement all 4 grants in 1 class
             raise ValueError("redirect_uri should contain hostname")
         listen_port = (  # Conventionally, port-less uri would mean port 80
             80 if _redirect_uri.port is None else _redirect_uri.port)
+        from .authcode import AuthCodeReceiver  # Lazy load. It needs http.server
         try:
-            with _AuthCodeReceiver(port=listen_port) as receiver:
+            with AuthCodeReceiver(port=listen_port) as receiver:
                 uri = redirect_uri if _redirect_uri.port != 0 else urlunparse((
                     _redirect_uri.scheme,
                     "{}:{}".format(_redirect_uri.hostname, receiver.get_port()),
@@ -770,6 +778,14 @@ class Client(BaseClient):  # We choose to implement all 4 grants in 1 class
         _data = data.copy()  # to prevent side effect
         resp = super(Client, self)._obtain_token(
             grant_type, params, _data, *args, **kwargs)
+        self._on_token_response(
+            grant_type, params, _data, resp,
+            also_save_rt=also_save_rt, on_obtaining_tokens=on_obtaining_tokens)
+        return resp
+
+    def _on_token_response(
+            self, grant_type, params, data, resp,
+            also_save_rt=False, on_obtaining_tokens=None):
         if "error" not in resp:
             _resp = resp.copy()
             RT = "refresh_token"
@@ -784,16 +800,15 @@ class Client(BaseClient):  # We choose to implement all 4 grants in 1 class
                 # Note: The scope will generally be absent in authorization grant,
                 #       but our obtain_token_by_authorization_code(...) encourages
                 #       app developer to still explicitly provide a scope here.
-                scope = _data.get("scope")
+                scope = data.get("scope")
             (on_obtaining_tokens or self.on_obtaining_tokens)({
                 "client_id": self.client_id,
                 "scope": scope,
                 "token_endpoint": self.configuration["token_endpoint"],
                 "grant_type": grant_type,  # can be used to know an IdToken-less
                                            # response is for an app or for a user
-                "response": _resp, "params": params, "data": _data,
+                "response": _resp, "params": params, "data": data,
                 })
-        return resp
 
     def obtain_token_by_refresh_token(self, token_item, scope=None,
             rt_getter=lambda token_item: token_item["refresh_token"],
@@ -833,12 +848,18 @@ class Client(BaseClient):  # We choose to implement all 4 grants in 1 class
             scope=scope,
             also_save_rt=on_updating_rt is False,
             **kwargs)
+        self._on_refresh_token_response(
+            token_item, resp,
+            on_removing_rt=on_removing_rt, on_updating_rt=on_updating_rt)
+        return resp
+
+    def _on_refresh_token_response(
+            self, token_item, resp, on_removing_rt=None, on_updating_rt=None):
         if resp.get('error') == 'invalid_grant':
             (on_removing_rt or self.on_removing_rt)(token_item)  # Discard old RT
         RT = "refresh_token"
         if on_updating_rt is not False and RT in resp:
             (on_updating_rt or self.on_updating_rt)(token_item, resp[RT])
-        return resp
 
     def obtain_token_by_assertion(
             self, assertion, grant_type, scope=None, **kwargs):
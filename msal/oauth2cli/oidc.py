@@ -4,7 +4,6 @@ import time
 import random
 import string
 import warnings
-import hashlib
 
 from . import oauth2
 
@@ -81,6 +80,7 @@ def decode_id_token(id_token, client_id=None, issuer=None, nonce=None, now=None)
 
 def _nonce_hash(nonce):
     # https://openid.net/specs/openid-connect-core-1_0.html#NonceNotes
+    import hashlib  # Lazy loading, because it loads OpenSSL
     return hashlib.sha256(nonce.encode("ascii")).hexdigest()
 
 
@@ -0,0 +1,163 @@
+"""A requests-based http client whose connection pool is configurable,
+and which can be shared among multiple ClientApplication instances.
+"""
+import socket
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def _keep_alive_socket_options(idle_seconds):
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in (  # Not every platform defines them
+            ("TCP_KEEPIDLE", idle_seconds),  # Linux
+            ("TCP_KEEPALIVE", idle_seconds),  # macOS
+            ("TCP_KEEPINTVL", max(1, idle_seconds // 4)),
+            ):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class PooledHttpClient(object):
+    """An http client with a configurable connection pool.
+
+    By default, each ``ClientApplication`` creates its own ``requests.Session``,
+    whose pool keeps at most 10 connections per host.
+    Under high concurrency, the extra connections would be discarded
+    and then re-handshaked. This class lets you size the pool instead.
+    One instance can also be shared by multiple apps::
+
+        from msal.pooled_http_client import PooledHttpClient
+        http_client = PooledHttpClient(pool_maxsize=100, timeout=5)
+        app1 = msal.ConfidentialClientApplication(..., http_client=http_client)
+        app2 = msal.ConfidentialClientApplication(..., http_client=http_client)
+    """
+    def __init__(
+            self,
+            pool_connections=10,
+            pool_maxsize=10,
+            pool_block=False,
+            keep_alive_idle_seconds=None,
+            max_retries=1,
+            verify=True,
+            proxies=None,
+            timeout=None,
+            ):
+        """Create a pooled http client.
+
+        :param int pool_connections: How many hosts will have their pools cached.
+        :param int pool_maxsize:
+            How many connections will be kept, and reused, per host.
+        :param bool pool_block:
+            When all ``pool_maxsize`` connections of a host are in use,
+            True means a new request will wait for one of them,
+            False (default) means a new, non-reusable connection will be created.
+        :param int keep_alive_idle_seconds:
+            If provided, pooled connections will enable TCP keep-alive,
+            starting to probe after being idle for these seconds,
+            so that they are less likely to be dropped by NAT or load balancers.
+        :param int max_retries:
+            How many times a connection error will be retried.
+            It defaults to 1, same as the default session of ClientApplication.
+        :param verify: Same as the one in :class:`msal.ClientApplication`.
+        :param proxies: Same as the one in :class:`msal.ClientApplication`.
+        :param timeout: Same as the one in :class:`msal.ClientApplication`.
+        """
+        import requests  # Lazy load
+
+        pool_kwargs = {}
+        if keep_alive_idle_seconds:
+            from urllib3.connection import HTTPConnection
+            pool_kwargs["socket_options"] = (
+                HTTPConnection.default_socket_options
+                + _keep_alive_socket_options(keep_alive_idle_seconds))
+
+        class _Adapter(requests.adapters.HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs):
+                kwargs.update(pool_kwargs)
+                return super(_Adapter, self).init_poolmanager(*args, **kwargs)
+
+        self._adapter = _Adapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries,
+            )
+        self._session = requests.Session()
+        self._session.verify = verify
+        self._session.proxies = proxies or {}
+        self._session.mount("http://", self._adapter)
+        self._session.mount("https://", self._adapter)
+        self._timeout = timeout
+
+    def post(self, url, params=None, data=None, headers=None, **kwargs):
+        kwargs.setdefault("timeout", self._timeout)
+        return self._session.post(
+            url, params=params, data=data, headers=headers, **kwargs)
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        kwargs.setdefault("timeout", self._timeout)
+        return self._session.get(url, params=params, headers=headers, **kwargs)
+
+    def warm_up(self, url, connections=1):
+        """Open connections to the host of this url in advance,
+        and keep them in the pool, to be reused by subsequent requests.
+
+        It is a no-op if the installed urllib3 does not support it,
+        or if a proxy will be used for this url, because a tunnel through
+        the proxy would only be established by a real request.
+        """
+        import requests  # Lazy load
+        settings = self._session.merge_environment_settings(
+            url, {}, None, self._session.verify, None)
+        if requests.utils.select_proxy(url, settings["proxies"]):
+            logger.debug("Connections via a proxy can not be warmed up. Skip.")
+            return
+        if hasattr(self._adapter, "get_connection_with_tls_context"):  # requests 2.32+
+            pool = self._adapter.get_connection_with_tls_context(
+                requests.Request("GET", url).prepare(),
+                settings["verify"], proxies=settings["proxies"])
+        else:
+            pool = self._adapter.get_connection(url, settings["proxies"])
+            self._adapter.cert_verify(pool, url, settings["verify"], None)
+        # urllib3 has no public api to open an idle connection, so we use
+        # its private ones, which have been stable since urllib3 1.x
+        get_conn = getattr(pool, "_get_conn", None)
+        put_conn = getattr(pool, "_put_conn", None)
+        if not (callable(get_conn) and callable(put_conn)):
+            logger.debug("This urllib3 can not warm up connections. Skip.")
+            return
+        opened = [get_conn() for _ in range(connections)]
+        try:
+            for connection in opened:
+                connection.connect()  # DNS lookup, TCP and TLS handshakes
+        finally:
+            for connection in opened:
+                put_conn(connection)
+
+    def close(self):
+        self._session.close()
+
+    def get_metrics(self):
+        """Return a dict of connection pool metrics, keyed by "scheme://host:port".
+
+        Each value is a dict containing "connections_created",
+        "requests", "idle_connections" and "maxsize".
+        """
+        pools = self._adapter.poolmanager.pools
+        metrics = {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:  # It was evicted just now
+                continue
+            queue = getattr(pool, "pool", None)  # It is None after pool.close()
+            metrics["{}://{}:{}".format(pool.scheme, pool.host, pool.port)] = {
+                "connections_created": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle_connections": len([c for c in queue.queue if c])
+                    if queue is not None else 0,
+                "maxsize": queue.maxsize if queue is not None else 0,
+                }
+        return metrics
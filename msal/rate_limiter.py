@@ -0,0 +1,120 @@
+"""A client-side rate limiter, so that MSAL can smooth its outbound token requests
+locally, rather than relying on the token endpoint's HTTP 429 and Retry-After.
+"""
+from threading import Lock
+import time
+import logging
+
+from .deadline import _now
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceededError(RuntimeError):
+    """Raised when a request can not obtain its quota from a :class:`RateLimiter`"""
+
+
+class _Bucket(object):
+    def __init__(self, capacity, now):
+        self.tokens = float(capacity)  # It could temporarily go negative by reservations
+        self.updated_at = now
+        self.requests = 0
+        self.rejected = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class RateLimiter(object):
+    """A thread-safe token-bucket rate limiter, keyed by token endpoint and client_id.
+
+    Usage::
+
+        from msal.rate_limiter import RateLimiter
+        limiter = RateLimiter(rate=10, burst=20)  # It can be shared by multiple apps
+        app = msal.ConfidentialClientApplication(..., rate_limiter=limiter)
+    """
+    def __init__(self, rate, burst=None, blocking=True, max_wait=None):
+        """Create a rate limiter.
+
+        :param float rate:
+            How many requests per second, per token endpoint and client_id,
+            are allowed in the long run.
+        :param int burst:
+            How many requests can be sent back-to-back after being idle.
+            Defaults to ``max(1, rate)``.
+        :param bool blocking:
+            When there is no quota left, True (default) means a request will
+            wait in line until its quota becomes available,
+            False means a :class:`RateLimitExceededError` will be raised immediately.
+        :param float max_wait:
+            In blocking mode, the longest seconds a request would wait.
+            A request which would need to wait longer than this will have
+            :class:`RateLimitExceededError` raised immediately.
+            Defaults to None, meaning a request would wait as long as needed.
+        """
+        if not rate > 0:
+            raise ValueError("rate needs to be a positive number")
+        self._rate = float(rate)
+        self._burst = burst or max(1, rate)
+        self._blocking = blocking
+        self._max_wait = max_wait
+        self._buckets = {}
+        self._lock = Lock()
+
+    def acquire(self, key, max_wait=None):
+        """Obtain a quota for the given key, possibly waiting for it.
+
+        :param float max_wait:
+            The longest seconds this request would wait,
+            in addition to the ``max_wait`` of this rate limiter.
+
+        :return: The seconds spent waiting in line.
+        """
+        if self._max_wait is not None:
+            max_wait = self._max_wait if max_wait is None else min(
+                max_wait, self._max_wait)
+        with self._lock:
+            now = _now()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(self._burst, now)
+            bucket.tokens = min(  # Refill
+                self._burst,
+                bucket.tokens + (now - bucket.updated_at) * self._rate)
+            bucket.updated_at = now
+            wait = max(0.0, (1 - bucket.tokens) / self._rate)
+            if wait and (not self._blocking
+                    or max_wait is not None and wait > max_wait):
+                bucket.rejected += 1
+                raise RateLimitExceededError(
+                    "Rate limit exceeded for {}. Quota available in {:.3f} seconds".format(
+                        key, wait))
+            bucket.tokens -= 1  # Reserve a quota, so that waiters are served in order
+            bucket.requests += 1
+            bucket.total_wait += wait
+            bucket.max_wait = max(bucket.max_wait, wait)
+            bucket.waiting += 1 if wait else 0
+        if wait:
+            logger.debug("Rate limiter queues a request for %s seconds", wait)
+            time.sleep(wait)
+            with self._lock:
+                bucket.waiting -= 1
+        return wait
+
+    def get_metrics(self):
+        """Return a dict of metrics, keyed by token endpoint and client_id.
+
+        Each value is a dict containing "requests" (the amount admitted),
+        "rejected", "waiting" (current queue length),
+        "total_wait" and "max_wait" (in seconds).
+        """
+        with self._lock:
+            return {key: {
+                    "requests": b.requests,
+                    "rejected": b.rejected,
+                    "waiting": b.waiting,
+                    "total_wait": b.total_wait,
+                    "max_wait": b.max_wait,
+                } for key, b in self._buckets.items()}
@@ -1,18 +1,38 @@
+import json
 import os
 import logging
+import time
+from threading import Lock
+
+from .background import _BackgroundCall
+
 
 logger = logging.getLogger(__name__)
+_cache = {}  # Process-wide {"region": region_or_none, "detected_at": timestamp}
+_probe = None  # The ongoing probe, if any
+_lock = Lock()
+_MISSING = object()
 
 
-def _detect_region(http_client=None):
+def _detect_region(http_client=None, detector=None, wait=None):
     region = os.environ.get("REGION_NAME", "").replace(" ", "").lower()  # e.g. westus2
     if region:
         return region
-    if http_client:
-        return _detect_region_of_azure_vm(http_client)  # It could hang for minutes
+    if detector:
+        return detector.detect(wait=wait)
+    if http_client:  # The default detector probes via the app's http client
+        return _default_detector.detect(http_client, wait=wait)
     return None
 
 
+def _settled_region():
+    # Returns the outcome of the latest probe, or _MISSING while one is ongoing
+    with _lock:
+        if _probe is not None:
+            return _MISSING
+    return _cache.get("region")
+
+
 def _detect_region_of_azure_vm(http_client):
     url = (
         "http://169.254.169.254/metadata/instance"
@@ -41,5 +61,134 @@ def _detect_region_of_azure_vm(http_client):
             "IMDS {} unavailable. Perhaps not running in Azure VM?".format(url))
         return None
     else:
+        if resp.status_code != 200:
+            logger.info("IMDS {} returned {}".format(url, resp.status_code))
+            return None
         return resp.text.strip()
 
+
+class RegionDetector(object):
+    """Detect the region of the current Azure VM, with a cache.
+
+    Usage::
+
+        from msal.region import RegionDetector
+        app = msal.ConfidentialClientApplication(
+            ..., azure_region=True,  # Auto-detect
+            region_detector=RegionDetector(
+                cache_file="/tmp/msal_region.json", background=True))
+
+    A detected region, or the lack of one, is cached in memory
+    and shared by all apps in the current process,
+    so that an app running outside of Azure only waits for
+    the Instance Metadata Service (IMDS) once per ``negative_ttl``.
+    """
+    def __init__(
+            self,
+            timeout=2,
+            http_client=None,
+            cache_file=None,
+            ttl=3600,
+            background=False,
+            negative_ttl=None,
+            ):
+        """Create a region detector.
+
+        :param float timeout:
+            The seconds to wait for IMDS, which usually answers in milliseconds.
+        :param http_client:
+            The http client to probe IMDS with. Defaults to a dedicated
+            :class:`msal.stdlib_http_client.StdlibHttpClient`
+            with the timeout above and without proxies.
+        :param str cache_file:
+            If provided, the outcome will also be persisted in this file,
+            so that other processes on the same machine can skip the probe.
+        :param float ttl: The seconds for which an outcome will be reused.
+        :param boolean background:
+            If True, the probe runs in background without being waited for.
+            The app will use the central endpoint until the region is known.
+        :param float negative_ttl:
+            The seconds for which a lack of region will be reused.
+            Defaults to ``ttl``.
+        """
+        self._timeout = timeout
+        self._http_client = http_client
+        self._cache_file = cache_file
+        self._ttl = ttl
+        self.background = background
+        self._negative_ttl = ttl if negative_ttl is None else negative_ttl
+
+    def detect(self, http_client=None, wait=None):
+        """Return the region, or None when it is unavailable or not known yet.
+
+        :param http_client:
+            The http client to probe IMDS with, if a probe is needed.
+            Defaults to the one of this detector.
+        :param wait:
+            Whether to wait for an ongoing probe.
+            Defaults to None, which means the opposite of ``background``.
+        """
+        region = self._load()
+        if region is not _MISSING:
+            return region
+        global _probe
+        with _lock:  # There will be at most one ongoing probe per process
+            probe = _probe
+            if probe is None:
+                probe = _probe = _BackgroundCall(
+                    self._probe, http_client or self._get_http_client())
+        if wait is None:
+            wait = not self.background
+        return probe.result() if wait else None
+
+    def _get_http_client(self):
+        if self._http_client is None:
+            from .stdlib_http_client import StdlibHttpClient  # Lazy load
+            self._http_client = StdlibHttpClient(
+                proxies={},  # IMDS is a link-local address
+                timeout=self._timeout)
+        return self._http_client
+
+    def _probe(self, http_client):
+        global _probe
+        try:
+            region = _detect_region_of_azure_vm(http_client)
+            detected_at = time.time()
+            _cache.update(region=region, detected_at=detected_at)
+            if self._cache_file:
+                self._save(region, detected_at)
+            return region
+        finally:
+            with _lock:
+                _probe = None
+
+    def _is_fresh(self, region, detected_at):
+        return 0 <= time.time() - detected_at < (
+            self._ttl if region else self._negative_ttl)
+
+    def _load(self):
+        # Returns the cached region (which could be None), or _MISSING
+        cached = dict(_cache)  # A snapshot, in case another thread updates it
+        if cached and self._is_fresh(cached["region"], cached["detected_at"]):
+            return cached["region"]
+        if self._cache_file:
+            try:
+                with open(self._cache_file) as f:
+                    cached = json.load(f)
+                if self._is_fresh(cached["region"], cached["detected_at"]):
+                    _cache.update(cached)
+                    return cached["region"]
+            except (IOError, OSError, ValueError, KeyError, TypeError):
+                logger.debug("Unable to load %s", self._cache_file, exc_info=True)
+        return _MISSING
+
+    def _save(self, region, detected_at):
+        try:
+            with open(self._cache_file, "w") as f:
+                json.dump({"region": region, "detected_at": detected_at}, f)
+        except (IOError, OSError):
+            logger.debug("Unable to save %s", self._cache_file, exc_info=True)
+
+
+_default_detector = RegionDetector(
+    negative_ttl=0)  # Without an opt-in, a lack of region is not remembered
@@ -0,0 +1,116 @@
+"""Retry transient failures of token and discovery requests."""
+import random
+import time
+import logging
+
+from .deadline import _now
+
+
+logger = logging.getLogger(__name__)
+
+
+def _get_retry_after(response):
+    for k, v in getattr(  # Historically, MSAL's HttpResponse does not always have headers
+            response, "headers", {}).items():
+        if k.lower() == "retry-after":
+            try:
+                return int(v)  # AAD's retry_after uses integer format only
+            except ValueError:
+                return None
+    return None
+
+
+class RetryPolicy(object):
+    """Retry a request with exponential backoff and jitter,
+    when it encounters a connection error, an HTTP 429 or an HTTP 5xx.
+
+    Usage::
+
+        from msal.retry_policy import RetryPolicy
+        app = msal.ConfidentialClientApplication(
+            ..., retry_policy=RetryPolicy(max_attempts=3, deadline=5))
+
+    Only those token requests whose grant can safely be redeemed twice,
+    listed in ``IDEMPOTENT_GRANT_TYPES``, are retried.
+    An authorization code, for example, is single-use;
+    a retry after a lost response would only be rejected by AAD.
+
+    Retries happen underneath MSAL's http cache.
+    A request blocked by a previous 429/5xx (or its Retry-After) would be
+    answered by that cache without reaching this policy,
+    and only the final response of a retried request would be cached.
+    """
+    RETRIABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+    IDEMPOTENT_GRANT_TYPES = frozenset([
+        "client_credentials",
+        "refresh_token",
+        "urn:ietf:params:oauth:grant-type:jwt-bearer",  # Including OBO
+        ])
+
+    def __init__(
+            self, max_attempts=3, backoff_factor=0.2, max_delay=5, deadline=None):
+        """Create a retry policy.
+
+        :param int max_attempts:
+            How many attempts a request will have, including its first one.
+        :param float backoff_factor:
+            The n-th retry will wait a random amount of seconds
+            between 0 and ``backoff_factor * 2 ** (n - 1)``, i.e. "full jitter".
+        :param float max_delay:
+            The longest seconds to wait before one retry.
+            A Retry-After header longer than this will stop retrying,
+            and its response will be returned (and then cached) as-is.
+        :param float deadline:
+            The longest seconds that all attempts of a request may span.
+            A retry which can not start before the deadline will not happen.
+            Defaults to None, meaning no overall deadline.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts needs to be at least 1")
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def _compute_delay(self, attempt, response=None):
+        retry_after = _get_retry_after(response) if response is not None else None
+        if retry_after is not None:
+            return retry_after  # Honor it as-is. Jitter may lead to a premature retry
+        return random.uniform(
+            0, min(self.max_delay, self.backoff_factor * 2 ** (attempt - 1)))
+
+    def send(self, function, *args, **kwargs):
+        """Call function(*args, **kwargs), which sends an http request, with retries"""
+        return self._send(function, args, kwargs)
+
+    def _send(self, function, args, kwargs, deadline=None):
+        # A deadline, if any, is an msal.deadline._Deadline of this token acquisition
+        started_at = _now()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = function(*args, **kwargs)
+            except (IOError, OSError):  # requests' connection errors are IOError
+                if attempt >= self.max_attempts:
+                    raise
+                delay = self._compute_delay(attempt)
+                if not self._can_wait(delay, started_at, deadline):
+                    raise
+                logger.debug(
+                    "Connection error. Retry #%d in %.3f seconds", attempt, delay)
+            else:
+                if (response.status_code not in self.RETRIABLE_STATUS_CODES
+                        or attempt >= self.max_attempts):
+                    return response
+                delay = self._compute_delay(attempt, response=response)
+                if not self._can_wait(delay, started_at, deadline):
+                    return response
+                logger.debug("HTTP %d. Retry #%d in %.3f seconds",
+                    response.status_code, attempt, delay)
+            time.sleep(delay)
+
+    def _can_wait(self, delay, started_at, deadline=None):
+        return delay <= self.max_delay and (
+            self.deadline is None or _now() + delay - started_at < self.deadline
+            ) and (deadline is None or delay < deadline.remaining())
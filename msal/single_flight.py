@@ -0,0 +1,60 @@
+"""Coalesce concurrent token acquisitions of a same key into one."""
+from threading import Event, Lock
+
+
+class _Flight(object):
+    def __init__(self):
+        self.landed = Event()
+        self.result = self.error = None
+        self.out_of_time = False  # Whether the leader failed due to its own deadline
+
+
+class _SingleFlight(object):
+    """One caller of a key does the work, while others wait to share its outcome.
+
+    Only overlapping callers share an outcome.
+    A caller arriving after a flight has landed will start a new flight,
+    so the work would better begin with a cache lookup.
+    Each caller waits under its own deadline. When a leader runs out of
+    its own time, its followers do not share that error; one of them
+    takes over instead.
+    """
+    def __init__(self):
+        self._flights = {}
+        self._lock = Lock()
+
+    def run(self, key, function, deadline=None):
+        """Return function(), or the result of an ongoing call of the same key.
+
+        :param key: A hashable value identifying the work.
+        :param deadline:
+            An optional :class:`msal.deadline._Deadline` of this caller,
+            bounding its own work, or how long it would wait for an ongoing call.
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                is_leader = flight is None
+                if is_leader:
+                    flight = self._flights[key] = _Flight()
+            if is_leader:
+                try:
+                    flight.result = function()
+                    return flight.result
+                except Exception as e:
+                    flight.error = e
+                    flight.out_of_time = bool(deadline and deadline.remaining() <= 0)
+                    raise
+                finally:
+                    with self._lock:
+                        self._flights.pop(key, None)
+                    flight.landed.set()
+            if not flight.landed.wait(
+                    max(0, deadline.remaining()) if deadline else None):
+                raise deadline.error()
+            if flight.out_of_time:  # It was the leader's deadline, not ours
+                continue  # Then a follower takes over
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.result) if isinstance(  # Each caller gets its own copy
+                flight.result, dict) else flight.result
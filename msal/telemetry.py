@@ -1,4 +1,3 @@
-import uuid
 import logging
 
 
@@ -16,6 +15,7 @@ RESERVED = 5
 
 
 def _get_new_correlation_id():
+    import uuid  # Lazy loading, because it imports platform
     return str(uuid.uuid4())
 
 
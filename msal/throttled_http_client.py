@@ -1,139 +1,290 @@
 from threading import Lock
-from hashlib import sha256
+from collections import namedtuple
+import logging
+import time
 
-from .individual_cache import _IndividualCache as IndividualCache
 from .individual_cache import _ExpiringMapping as ExpiringMapping
 
 
+logger = logging.getLogger(__name__)
+
 # https://datatracker.ietf.org/doc/html/rfc8628#section-3.4
 DEVICE_AUTH_GRANT = "urn:ietf:params:oauth:grant-type:device_code"
 
+_ANY_BODY = "*"  # A throttle entry which applies to every request of an "account"
+
 
 def _hash(raw):
+    from hashlib import sha256  # Lazy loading, because it loads OpenSSL
     return sha256(repr(raw).encode("utf-8")).hexdigest()
 
 
-def _parse_http_429_5xx_retry_after(result=None, **ignored):
+def _parse_http_429_5xx_retry_after(status_code, lowercase_headers):
     """Return seconds to throttle"""
-    assert result is not None, """
-        The signature defines it with a default value None,
-        only because the its shape is already decided by the
-        IndividualCache's.__call__().
-        In actual code path, the result parameter here won't be None.
-        """
-    response = result
-    lowercase_headers = {k.lower(): v for k, v in getattr(
-        # Historically, MSAL's HttpResponse does not always have headers
-        response, "headers", {}).items()}
-    if not (response.status_code == 429 or response.status_code >= 500
+    if not (status_code == 429 or status_code >= 500
             or "retry-after" in lowercase_headers):
         return 0  # Quick exit
     default = 60  # Recommended at the end of
         # https://identitydivision.visualstudio.com/devex/_git/AuthLibrariesApiReview?version=GBdev&path=%2FService%20protection%2FIntial%20set%20of%20protection%20measures.md&_a=preview
-    retry_after = int(lowercase_headers.get("retry-after", default))
     try:
         # AAD's retry_after uses integer format only
         # https://stackoverflow.microsoft.com/questions/264931/264932
-        delay_seconds = int(retry_after)
+        delay_seconds = int(lowercase_headers.get("retry-after", default))
     except ValueError:
         delay_seconds = default
     return min(3600, delay_seconds)
 
 
-def _extract_data(kwargs, key, default=None):
-    data = kwargs.get("data", {})  # data is usually a dict, but occasionally a string
-    return data.get(key) if isinstance(data, dict) else default
+class _ResponseSnapshot(namedtuple(
+        "_ResponseSnapshot", ["status_code", "headers", "text", "error"])):
+    """A compact and immutable copy of an http response, to be kept in http_cache.
+
+    Unlike the original response object (which, in case of ``requests``,
+    holds raw content, connection references and all the headers),
+    it keeps only what MSAL needs, so it is cheap to hold and to pickle.
+    An error raised by the response is kept as its type and message only,
+    because the error may also reference the original response.
+    """
+    __slots__ = ()
+    _HEADERS_TO_KEEP = frozenset(["retry-after"])
+
+    @classmethod
+    def of(cls, response):
+        error = None
+        if response.status_code >= 400:
+            try:
+                response.raise_for_status()
+            except Exception as e:
+                error = (type(e), str(e))
+        return cls(
+            status_code=response.status_code,
+            headers={k: v for k, v in getattr(response, "headers", {}).items()
+                if k.lower() in cls._HEADERS_TO_KEEP},
+            text=response.text,
+            error=error,
+            )
+
+    def raise_for_status(self):
+        if self.error:
+            error_type, message = self.error
+            for candidate in error_type.__mro__:
+                try:  # Some, such as urllib's HTTPError, need more than a message
+                    error = candidate(message)
+                    break
+                except Exception:
+                    continue
+            error.response = self  # Like requests' HTTPError, but without raw content
+            raise error
+
+
+def _get_key(args, kwargs):
+    return "GET {} hash={} 2xx".format(
+        args[0],  # It is the url, sometimes containing inline params
+        _hash(kwargs.get("params", "")),
+        )
+
+
+def _get_expires_in(response):
+    return 3600*24 if 200 <= response.status_code < 300 else 0
+
+
+def _is_cacheable_http_400(status_code, lowercase_headers, data):
+    # Here we choose to cache exact HTTP 400 errors only (rather than 4xx)
+    # because they are the ones defined in OAuth2
+    # (https://datatracker.ietf.org/doc/html/rfc6749#section-5.2)
+    # Other 4xx errors might have different requirements e.g.
+    # "407 Proxy auth required" would need a key including http headers.
+    return (status_code == 400
+        and not(  # Exclude Device Flow whose retry is expected and regulated
+            isinstance(data, dict) and data.get("grant_type") == DEVICE_AUTH_GRANT)
+        and "retry-after" not in lowercase_headers)  # Leave it to Retry-After
+
+
+def _bounded(send, deadline):
+    # Returns a function which calls send() with a timeout shrunk by the deadline
+    if deadline is None:
+        return send
+    return lambda *args, **kwargs: send(*args, **dict(
+        kwargs, timeout=deadline.shrink(kwargs.get("timeout"))))
 
 
 class ThrottledHttpClient(object):
-    def __init__(self, http_client, http_cache):
+    def __init__(
+            self, http_client, http_cache, capacity=None, capacity_in_bytes=None,
+            rate_limiter=None, retry_policy=None):
         """Throttle the given http_client by storing and retrieving data from cache.
 
         This wrapper exists so that our patching post() and get() would prevent
         re-patching side effect when/if same http_client being reused.
+
+        Responses are kept in http_cache as compact snapshots,
+        whose total amount is bounded by ``capacity`` (defaults to 1024 entries)
+        and optionally also by ``capacity_in_bytes``.
+
+        When a :class:`msal.rate_limiter.RateLimiter` is provided,
+        token requests which are about to reach the network
+        will be admitted by it, keyed by token endpoint and client_id.
+
+        When a :class:`msal.retry_policy.RetryPolicy` is provided,
+        token requests of idempotent grants and https GETs (i.e. discoveries)
+        which reach the network will be retried by it.
+        Other requests, such as auth code redemptions or IMDS probes, will not.
+
+        A request may carry a ``deadline`` keyword argument,
+        started by one token acquisition (see :mod:`msal.deadline`).
+        It will not be passed to the http_client. Instead, every attempt
+        of that request will have its ``timeout`` shrunk to the remaining time,
+        and no attempt will start after that deadline.
         """
-        expiring_mapping = ExpiringMapping(  # It will automatically clean up
+        self._expiring_mapping = ExpiringMapping(  # It will automatically clean up
             mapping=http_cache if http_cache is not None else {},
-            capacity=1024,  # To prevent cache blowing up especially for CCA
+            capacity=capacity or 1024,  # To prevent cache blowing up especially for CCA
+            capacity_in_bytes=capacity_in_bytes,
             lock=Lock(),  # TODO: This should ideally also allow customization
             )
 
-        _post = http_client.post  # We'll patch _post, and keep original post() intact
-
-        _post = IndividualCache(
-            # Internal specs requires throttling on at least token endpoint,
-            # here we have a generic patch for POST on all endpoints.
-            mapping=expiring_mapping,
-            key_maker=lambda func, args, kwargs:
-                "POST {} client_id={} scope={} hash={} 429/5xx/Retry-After".format(
-                    args[0],  # It is the url, typically containing authority and tenant
-                    _extract_data(kwargs, "client_id"),  # Per internal specs
-                    _extract_data(kwargs, "scope"),  # Per internal specs
-                    _hash(
-                        # The followings are all approximations of the "account" concept
-                        # to support per-account throttling.
-                        # TODO: We may want to disable it for confidential client, though
-                        _extract_data(kwargs, "refresh_token",  # "account" during refresh
-                            _extract_data(kwargs, "code",  # "account" of auth code grant
-                                _extract_data(kwargs, "username")))),  # "account" of ROPC
-                    ),
-            expires_in=_parse_http_429_5xx_retry_after,
-            )(_post)
-
-        _post = IndividualCache(  # It covers the "UI required cache"
-            mapping=expiring_mapping,
-            key_maker=lambda func, args, kwargs: "POST {} hash={} 400".format(
-                args[0],  # It is the url, typically containing authority and tenant
-                _hash(
-                    # Here we use literally all parameters, even those short-lived
-                    # parameters containing timestamps (WS-Trust or POP assertion),
-                    # because they will automatically be cleaned up by ExpiringMapping.
-                    #
-                    # Furthermore, there is no need to implement
-                    # "interactive requests would reset the cache",
-                    # because acquire_token_silent()'s would be automatically unblocked
-                    # due to token cache layer operates on top of http cache layer.
-                    #
-                    # And, acquire_token_silent(..., force_refresh=True) will NOT
-                    # bypass http cache, because there is no real gain from that.
-                    # We won't bother implement it, nor do we want to encourage
-                    # acquire_token_silent(..., force_refresh=True) pattern.
-                    str(kwargs.get("params")) + str(kwargs.get("data"))),
-                ),
-            expires_in=lambda result=None, kwargs=None, **ignored:
-                60
-                if result.status_code == 400
-                    # Here we choose to cache exact HTTP 400 errors only (rather than 4xx)
-                    # because they are the ones defined in OAuth2
-                    # (https://datatracker.ietf.org/doc/html/rfc6749#section-5.2)
-                    # Other 4xx errors might have different requirements e.g.
-                    # "407 Proxy auth required" would need a key including http headers.
-                and not(  # Exclude Device Flow whose retry is expected and regulated
-                    isinstance(kwargs.get("data"), dict)
-                    and kwargs["data"].get("grant_type") == DEVICE_AUTH_GRANT
-                    )
-                and "retry-after" not in set(  # Leave it to the Retry-After decorator
-                    h.lower() for h in getattr(result, "headers", {}).keys())
-                else 0,
-            )(_post)
-
-        self.post = _post
-
-        self.get = IndividualCache(  # Typically those discovery GETs
-            mapping=expiring_mapping,
-            key_maker=lambda func, args, kwargs: "GET {} hash={} 2xx".format(
-                args[0],  # It is the url, sometimes containing inline params
-                _hash(kwargs.get("params", "")),
-                ),
-            expires_in=lambda result=None, **ignored:
-                3600*24 if 200 <= result.status_code < 300 else 0,
-            )(http_client.get)
-
         self._http_client = http_client
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+
+    def get(self, *args, **kwargs):
+        """Send a GET, unless its successful response is still in cache.
+
+        Typically those are discovery GETs.
+        Only a response going into the cache is turned into a snapshot.
+        """
+        key = _get_key(args, kwargs)
+        snapshot = self._expiring_mapping.get(key)
+        if snapshot is not None:
+            return snapshot
+        response = self._send_get(args, kwargs)
+        expires_in = _get_expires_in(response)
+        if expires_in:
+            self._expiring_mapping.set(
+                key, _ResponseSnapshot.of(response), expires_in)
+        return response
+
+    def post(self, *args, **kwargs):
+        """Send a POST, unless a similar request is currently being throttled.
+
+        Internal specs requires throttling on at least token endpoint,
+        here we have a generic throttle for POST on all endpoints.
+        Each request is fingerprinted only once, into an "account" key
+        (which locates at most one entry in the http cache)
+        and a lazily computed hash of its entire body.
+        That entry holds two kinds of throttle conditions:
+
+        * A 429/5xx/Retry-After condition blocks every request
+          of the same url, client_id, scope and account.
+        * An HTTP 400 condition (i.e. the "UI required cache") blocks only
+          those requests with exactly the same params and data.
+        """
+        key, body_hash, response = self._probe(args, kwargs)
+        if response is not None:
+            return response
+        return self._store(key, body_hash, self._send(args, kwargs), kwargs)
 
-    # The following 2 methods have been defined dynamically by __init__()
-    #def post(self, *args, **kwargs): pass
-    #def get(self, *args, **kwargs): pass
+    def _probe(self, args, kwargs):
+        # Returns (key, body_hash, throttled_response_or_none)
+        data = kwargs.get("data", {})  # data is usually a dict, but occasionally a string
+        fields = data if isinstance(data, dict) else {}
+        key = "POST {} client_id={} scope={} hash={}".format(
+            args[0],  # It is the url, typically containing authority and tenant
+            fields.get("client_id"),  # Per internal specs
+            fields.get("scope"),  # Per internal specs
+            _hash(
+                # The followings are all approximations of the "account" concept
+                # to support per-account throttling.
+                # TODO: We may want to disable it for confidential client, though
+                fields.get("refresh_token")  # "account" during refresh
+                or fields.get("code")  # "account" of auth code grant
+                or fields.get("username")),  # "account" of ROPC
+            )
+        body_hash = None
+        now = int(time.time())
+        conditions = self._expiring_mapping.get(key) or {}  # The only probe
+        if conditions:
+            body_hash = self._hash_body(kwargs)
+            for condition in (body_hash, _ANY_BODY):
+                expires_at, response = conditions.get(condition, (0, None))
+                if now < expires_at:
+                    return key, body_hash, response
+        return key, body_hash, None
+
+    def _send_get(self, args, kwargs):
+        deadline = kwargs.pop("deadline", None)
+        get = _bounded(self._http_client.get, deadline)
+        if self._retry_policy and args[0].startswith("https://"):
+            return self._retry_policy._send(get, args, kwargs, deadline=deadline)
+        return get(*args, **kwargs)
+
+    def _send(self, args, kwargs):
+        deadline = kwargs.pop("deadline", None)
+        post = _bounded(self._http_client.post, deadline)
+        data = kwargs.get("data", {})
+        if isinstance(data, dict) and data.get("grant_type"):  # A token request
+            if self._rate_limiter:
+                self._rate_limiter.acquire(
+                    (args[0], data.get("client_id")),
+                    max_wait=deadline.remaining() if deadline else None)
+            if self._retry_policy and data["grant_type"] in (
+                    self._retry_policy.IDEMPOTENT_GRANT_TYPES):
+                return self._retry_policy._send(post, args, kwargs, deadline=deadline)
+        return post(*args, **kwargs)
+
+    def _store(self, key, body_hash, response, kwargs):
+        # Remembers a throttle condition, if any, and then returns the response
+        now = int(time.time())
+        lowercase_headers = {k.lower(): v for k, v in getattr(
+            # Historically, MSAL's HttpResponse does not always have headers
+            response, "headers", {}).items()}
+        expires_in = _parse_http_429_5xx_retry_after(
+            response.status_code, lowercase_headers)
+        if expires_in:
+            condition = _ANY_BODY
+        elif _is_cacheable_http_400(
+                response.status_code, lowercase_headers, kwargs.get("data", {})):
+            # Here we use literally all parameters, even those short-lived
+            # parameters containing timestamps (WS-Trust or POP assertion),
+            # because they will automatically be cleaned up by ExpiringMapping.
+            #
+            # Furthermore, there is no need to implement
+            # "interactive requests would reset the cache",
+            # because acquire_token_silent()'s would be automatically unblocked
+            # due to token cache layer operates on top of http cache layer.
+            #
+            # And, acquire_token_silent(..., force_refresh=True) will NOT
+            # bypass http cache, because there is no real gain from that.
+            # We won't bother implement it, nor do we want to encourage
+            # acquire_token_silent(..., force_refresh=True) pattern.
+            condition = body_hash or self._hash_body(kwargs)
+            expires_in = 60
+        else:
+            return response  # The most common path, which caches nothing
+        snapshot = _ResponseSnapshot.of(response)
+        def merge(current):  # Runs under the mapping's lock, so no update is lost
+            merged = {  # A new dict, so we won't mutate what is in the mapping
+                c: entry for c, entry in (current or {}).items() if now < entry[0]}
+            merged[condition] = (now + expires_in, snapshot)
+            return merged, max(expires_at for expires_at, _ in merged.values()) - now
+        self._expiring_mapping.merge(key, merge)
+        return response
+
+    @staticmethod
+    def _hash_body(kwargs):
+        return _hash(str(kwargs.get("params")) + str(kwargs.get("data")))
+
+    def warm_up(self, url, connections=1):
+        """Open connections to the host of this url in advance, bypassing cache.
+
+        It uses the underlying http_client's warm_up(url, connections=...)
+        when available. Otherwise, it is a no-op, rather than a real request.
+        """
+        warm_up = getattr(self._http_client, "warm_up", None)
+        if warm_up:
+            warm_up(url, connections=connections)
+        else:
+            logger.debug("This http_client can not warm up connections. Skip.")
 
     def close(self):
         """MSAL won't need this. But we allow throttled_http_client.close() anyway"""
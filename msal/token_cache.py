@@ -12,6 +12,18 @@ logger = logging.getLogger(__name__)
 def is_subdict_of(small, big):
     return dict(big, **small) == big
 
+def _matches(query, entry):
+    # Similar to is_subdict_of(query, entry), but a set in query means any of them
+    for key, value in query.items():
+        if key not in entry:
+            return False
+        if isinstance(value, (set, frozenset)):
+            if entry[key] not in value:
+                return False
+        elif entry[key] != value:
+            return False
+    return True
+
 def _get_username(id_token_claims):
     return id_token_claims.get(
         "preferred_username",  # AAD
@@ -87,6 +99,15 @@ class TokenCache(object):
             }
 
     def find(self, credential_type, target=None, query=None):
+        """Return the entries of this credential type matching all the criteria.
+
+        :param list target: Scopes which shall all be present in an entry.
+        :param dict query:
+            Key-value pairs which shall all be present in an entry.
+            A value can also be a set, meaning any value in that set matches,
+            so that, for example, entries of several environments
+            can be found in one pass.
+        """
         target = target or []
         assert isinstance(target, list), "Invalid parameter type"
         target_set = set(target)
@@ -96,7 +117,7 @@ class TokenCache(object):
             # So we always do an O(n) in-memory search.
             return [entry
                 for entry in self._cache.get(credential_type, {}).values()
-                if is_subdict_of(query or {}, entry)
+                if _matches(query or {}, entry)
                 and (target_set <= set(entry.get("target", "").split())
 		    if target else True)
                 ]
@@ -187,6 +208,8 @@ class TokenCache(object):
                     }
                 if data.get("key_id"):  # It happens in SSH-cert or POP scenario
                     at["key_id"] = data.get("key_id")
+                if event.get("user_assertion_hash"):  # It happens in OBO scenario
+                    at["user_assertion_hash"] = event["user_assertion_hash"]
                 if "refresh_in" in response:
                     refresh_in = response["refresh_in"]  # It is an integer
                     at["refresh_on"] = str(now + refresh_in)  # Schema wants a string
@@ -237,6 +260,8 @@ class TokenCache(object):
                     }
                 if "foci" in response:
                     rt["family_id"] = response["foci"]
+                if event.get("user_assertion_hash"):
+                    rt["user_assertion_hash"] = event["user_assertion_hash"]
                 self.modify(self.CredentialType.REFRESH_TOKEN, rt, rt)
 
             app_metadata = {
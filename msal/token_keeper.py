@@ -0,0 +1,165 @@
+"""Keep app-only tokens fresh in background, so that reading them is cheap."""
+import heapq
+import logging
+import random
+from threading import Condition, Thread
+import time
+
+
+logger = logging.getLogger(__name__)
+_EXPIRY_BUFFER = 5 * 60  # The same as acquire_token_silent()'s
+
+
+class TokenKeeper(object):
+    """Keep the tokens of some (tenant, scopes) pairs of a confidential client
+    fresh in background, so that your request path only reads them from memory.
+
+    Usage::
+
+        from msal.token_keeper import TokenKeeper
+        app = msal.ConfidentialClientApplication(...)
+        keeper = TokenKeeper(app, [
+            (None, ["https://graph.microsoft.com/.default"]),  # App's own tenant
+            ("fabrikam.onmicrosoft.com", ["https://vault.azure.net/.default"]),
+            ])
+        keeper.start()  # Tokens are acquired once, and then kept fresh
+        ...
+        result = keeper.get(["https://graph.microsoft.com/.default"])
+        if result:  # It is None if the token is unavailable or expired
+            access_token = result["access_token"]
+        ...
+        keeper.stop()
+
+    Each token is refreshed when AAD suggested it to be refreshed,
+    or else halfway through its remaining lifetime,
+    slightly earlier by a random jitter, so that many processes
+    do not refresh at a same moment.
+    A failed refresh is retried with exponential backoff,
+    while the previous token keeps being served until it is about to expire.
+    Like :func:`~msal.ClientApplication.acquire_token_silent`,
+    a token is considered expired 5 minutes before its actual expiry.
+    """
+    def __init__(self, app, targets, jitter=0.1, min_backoff=1, max_backoff=300):
+        """Create a token keeper.
+
+        :param app: A :class:`msal.ConfidentialClientApplication` instance.
+        :param targets:
+            A list of (tenant, scopes) pairs. A tenant of None means
+            the tenant of the app's authority.
+        :param float jitter:
+            The portion of a refresh delay to be randomly cut short.
+        :param float min_backoff: The seconds to wait before the first retry.
+        :param float max_backoff: The most seconds to wait between retries.
+        """
+        self._app = app
+        self._targets = [(tenant, list(scopes)) for tenant, scopes in targets]
+        self._jitter = jitter
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._tokens = {}  # {(tenant, scopes): token}, only replaced, never mutated
+        self._failures = {}  # {(tenant, scopes): consecutive failures}
+        self._timers = []  # A heap of (due, sequence, tenant, scopes)
+        self._sequence = 0
+        self._condition = Condition()
+        self._thread = None
+        self._started = False
+        self._stopping = False
+
+    @staticmethod
+    def _key(tenant, scopes):
+        return tenant, frozenset(scopes)
+
+    def get(self, scopes, tenant=None):
+        """Return the kept token of these scopes and tenant, or None.
+
+        It is a memory read, which never waits for a token acquisition.
+        The returned dict contains "access_token", "token_type" and "expires_on".
+        """
+        token = self._tokens.get(self._key(tenant, scopes))
+        if token and token["expires_on"] - time.time() >= _EXPIRY_BUFFER:
+            return token
+        return None  # Including a token which is about to expire
+
+    def start(self):
+        """Acquire the tokens once, and then keep them fresh in background.
+
+        Calling it again has no effect.
+        """
+        with self._condition:
+            if self._started:
+                return
+            self._started = True
+        for tenant, scopes in self._targets:
+            self._acquire(tenant, scopes, force_refresh=False)
+        self._thread = Thread(target=self._run, name="msal-token-keeper")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop refreshing tokens. Tokens already kept remain readable."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _schedule(self, tenant, scopes, delay):
+        with self._condition:
+            self._sequence += 1  # So that the heap never compares scopes
+            heapq.heappush(
+                self._timers, (time.time() + delay, self._sequence, tenant, scopes))
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping and (
+                        not self._timers or self._timers[0][0] > time.time()):
+                    self._condition.wait(
+                        self._timers[0][0] - time.time() if self._timers else None)
+                if self._stopping:
+                    return
+                _, _, tenant, scopes = heapq.heappop(self._timers)
+            self._acquire(tenant, scopes, force_refresh=True)
+
+    def _acquire(self, tenant, scopes, force_refresh):
+        key = self._key(tenant, scopes)
+        try:
+            result = self._app.acquire_token_for_client(
+                scopes, tenant=tenant, force_refresh=force_refresh)
+        except Exception:  # The exact HTTP exception is transportation-layer dependent
+            logger.warning("Unable to acquire token for %s", key, exc_info=True)
+            result = None
+        now = time.time()
+        expires_on = now + int((result or {}).get("expires_in", 0))
+        if result and "access_token" in result and expires_on > now:
+            self._tokens[key] = {  # An atomic replacement, so readers need no lock
+                "access_token": result["access_token"],
+                "token_type": result.get("token_type", "Bearer"),
+                "expires_on": expires_on,
+                }
+            self._failures.pop(key, None)
+            refresh_on = self._find_refresh_on(tenant, scopes, result["access_token"])
+            delay = min(  # Refresh before it is considered expired
+                (refresh_on or now + (expires_on - now) / 2) - now,
+                expires_on - _EXPIRY_BUFFER - now)
+            self._schedule(tenant, scopes, max(  # Never a tight loop
+                self._min_backoff, delay * (1 - random.uniform(0, self._jitter))))
+        else:  # Including a token which has already expired
+            if result:
+                logger.warning("Unable to acquire token for %s: %s %s",
+                    key, result.get("error"), result.get("error_description"))
+            failures = self._failures[key] = self._failures.get(key, 0) + 1
+            backoff = min(self._max_backoff, self._min_backoff * 2 ** (failures - 1))
+            self._schedule(
+                tenant, scopes, backoff * (1 - random.uniform(0, self._jitter)))
+
+    def _find_refresh_on(self, tenant, scopes, access_token):
+        # Returns the refresh_on which AAD suggested via refresh_in, if any
+        for entry in self._app.token_cache.find(
+                self._app.token_cache.CredentialType.ACCESS_TOKEN,
+                target=scopes,
+                query={"client_id": self._app.client_id, "secret": access_token}):
+            if "refresh_on" in entry:
+                return int(entry["refresh_on"])
+        return None
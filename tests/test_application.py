@@ -1,10 +1,17 @@
 # Note: Since Aug 2019 we move all e2e tests into test_e2e.py,
 # so this test_application file contains only unit tests without dependency.
 import sys
+import threading
+try:
+    from urllib.parse import urlparse
+except ImportError:  # Fall back to Python 2
+    from urlparse import urlparse
 from msal.application import *
 from msal.application import _str2bytes
 import msal
+import msal.region
 from msal.application import _merge_claims_challenge_and_capabilities
+from msal.deadline import DeadlineExceededError
 from tests import unittest
 from tests.test_token_cache import build_id_token, build_response
 from tests.http_client import MinimalHttpClient, MinimalResponse
@@ -551,7 +558,7 @@ class TestTelemetryOnConfidentialClientApplication(unittest.TestCase):
     def test_acquire_token_for_client(self):
         at = "this is an access token"
         def mock_post(url, headers=None, *args, **kwargs):
-            self.assertEqual("4|730,0|", (headers or {}).get(CLIENT_CURRENT_TELEMETRY))
+            self.assertEqual("4|730,2|", (headers or {}).get(CLIENT_CURRENT_TELEMETRY))
             return MinimalResponse(status_code=200, text=json.dumps({"access_token": at}))
         result = self.app.acquire_token_for_client(["scope"], post=mock_post)
         self.assertEqual(at, result.get("access_token"))
@@ -559,7 +566,7 @@ class TestTelemetryOnConfidentialClientApplication(unittest.TestCase):
     def test_acquire_token_on_behalf_of(self):
         at = "this is an access token"
         def mock_post(url, headers=None, *args, **kwargs):
-            self.assertEqual("4|523,0|", (headers or {}).get(CLIENT_CURRENT_TELEMETRY))
+            self.assertEqual("4|523,2|", (headers or {}).get(CLIENT_CURRENT_TELEMETRY))
             return MinimalResponse(status_code=200, text=json.dumps({"access_token": at}))
         result = self.app.acquire_token_on_behalf_of("assertion", ["s"], post=mock_post)
         self.assertEqual(at, result.get("access_token"))
@@ -626,6 +633,145 @@ class TestClientCredentialGrant(unittest.TestCase):
             authority="https://login.microsoftonline.com/organizations")
 
 
+class TestClientCredentialGrantShallUseCacheFirst(unittest.TestCase):
+    def setUp(self):
+        self.app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient())
+        self.responses = []
+
+    def mock_post(self, url, headers=None, *args, **kwargs):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return MinimalResponse(status_code=200, text=json.dumps(response))
+
+    def test_valid_token_should_be_returned_from_cache(self):
+        self.responses = [{"access_token": "an AT", "expires_in": 3600}]
+        self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+        result = self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+        self.assertEqual("an AT", result.get("access_token"))
+        self.assertEqual([], self.responses, "Only one request was sent")
+
+    def test_force_refresh_should_bypass_cache(self):
+        self.responses = [
+            {"access_token": "old AT", "expires_in": 3600},
+            {"access_token": "new AT", "expires_in": 3600},
+            ]
+        self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+        result = self.app.acquire_token_for_client(
+            ["scope"], post=self.mock_post, force_refresh=True)
+        self.assertEqual("new AT", result.get("access_token"))
+        result = self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+        self.assertEqual("new AT", result.get("access_token"))
+
+    def test_aging_token_should_be_refreshed(self):
+        self.responses = [
+            {"access_token": "old AT", "expires_in": 3600, "refresh_in": -1},
+            {"access_token": "new AT", "expires_in": 3600},
+            ]
+        self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+        result = self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+        self.assertEqual("new AT", result.get("access_token"))
+
+    def test_aging_token_should_be_returned_when_refresh_fails(self):
+        self.responses = [
+            {"access_token": "old AT", "expires_in": 3600, "refresh_in": -1},
+            {"error": "temporarily_unavailable"},
+            IOError("Network outage"),
+            ]
+        self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+        for _ in range(2):
+            result = self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+            self.assertEqual("old AT", result.get("access_token"))
+
+    def test_token_of_another_tenant_should_not_be_returned(self):
+        self.responses = [
+            {"access_token": "AT of contoso", "expires_in": 3600},
+            {"access_token": "AT of fabrikam", "expires_in": 3600},
+            ]
+        self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+        result = self.app.acquire_token_for_client(
+            ["scope"], post=self.mock_post, tenant="fabrikam")
+        self.assertEqual("AT of fabrikam", result.get("access_token"))
+        result = self.app.acquire_token_for_client(
+            ["scope"], post=self.mock_post, tenant="fabrikam")
+        self.assertEqual("AT of fabrikam", result.get("access_token"))
+
+
+class TestOnBehalfOfShallUseCacheFirst(unittest.TestCase):
+    def setUp(self):
+        self.app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient())
+        self.responses = []
+        self.grant_types = []
+
+    def mock_post(self, url, headers=None, data=None, *args, **kwargs):
+        self.grant_types.append(data.get("grant_type"))
+        return MinimalResponse(
+            status_code=200, text=json.dumps(self.responses.pop(0)))
+
+    def obo(self, user_assertion, **kwargs):
+        return self.app.acquire_token_on_behalf_of(
+            user_assertion, ["s"], post=self.mock_post, **kwargs)
+
+    def test_same_assertion_should_be_served_from_cache(self):
+        self.responses = [
+            build_response(uid="uid", utid="utid", access_token="AT 1",
+                refresh_token="RT 1", scope="s"),
+            build_response(uid="uid", utid="utid", access_token="AT 2",
+                refresh_token="RT 2", scope="s"),
+            build_response(uid="uid", utid="utid", access_token="AT 2",
+                refresh_token="RT 2", scope="s"),
+            ]
+        self.assertEqual("AT 1", self.obo("assertion 1").get("access_token"))
+        self.assertEqual("AT 1", self.obo("assertion 1").get("access_token"))
+        self.assertEqual(1, len(self.grant_types), "Cache hit needs no request")
+        self.assertEqual("AT 2", self.obo("assertion 2").get("access_token"))
+        self.assertEqual("AT 2", self.obo(
+            "assertion 2", force_refresh=True).get("access_token"))
+        self.assertEqual(
+            [Client.GRANT_TYPE_JWT] * 3, self.grant_types,
+            "force_refresh exchanges the assertion again")
+
+    def test_expired_at_should_be_refreshed_by_obo_rt(self):
+        self.responses = [
+            build_response(uid="uid", utid="utid", access_token="expired AT",
+                expires_in=-1, refresh_token="OBO RT", scope="s"),
+            build_response(uid="uid", utid="utid", access_token="new AT",
+                refresh_token="new RT", scope="s"),
+            ]
+        self.obo("assertion")
+        self.assertEqual("new AT", self.obo("assertion").get("access_token"))
+        self.assertEqual(
+            [Client.GRANT_TYPE_JWT, "refresh_token"], self.grant_types)
+        self.assertEqual("new AT", self.obo("assertion").get("access_token"))
+        self.assertEqual(2, len(self.grant_types))
+
+    def test_failed_obo_rt_should_fall_back_to_assertion(self):
+        self.responses = [
+            build_response(uid="uid", utid="utid", access_token="expired AT",
+                expires_in=-1, refresh_token="OBO RT", scope="s"),
+            {"error": "invalid_grant"},
+            build_response(uid="uid", utid="utid", access_token="new AT",
+                refresh_token="new RT", scope="s"),
+            ]
+        self.obo("assertion")
+        self.assertEqual("new AT", self.obo("assertion").get("access_token"))
+        self.assertEqual(
+            [Client.GRANT_TYPE_JWT, "refresh_token", Client.GRANT_TYPE_JWT],
+            self.grant_types)
+
+    def test_assertion_should_not_be_stored_in_cache(self):
+        self.responses = [build_response(
+            uid="uid", utid="utid", access_token="AT", refresh_token="RT", scope="s")]
+        self.obo("a secret assertion")
+        self.assertNotIn("a secret assertion", json.dumps(self.app.token_cache._cache))
+
+
 class TestScopeDecoration(unittest.TestCase):
     def _test_client_id_should_be_a_valid_scope(self, client_id, other_scopes):
         # B2C needs this https://learn.microsoft.com/en-us/azure/active-directory-b2c/access-tokens#openid-connect-scopes
@@ -640,3 +786,477 @@ class TestScopeDecoration(unittest.TestCase):
         self._test_client_id_should_be_a_valid_scope("client_id", [])
         self._test_client_id_should_be_a_valid_scope("client_id", ["foo"])
 
+
+
+class OidcHttpClient(object):
+    """It serves OIDC discovery of any authority offline"""
+    def get(self, url, params=None, headers=None, **kwargs):
+        parsed = urlparse(url)
+        endpoint = "https://{}/{}/oauth2/v2.0/".format(
+            parsed.hostname, parsed.path.split("/")[1])
+        return MinimalResponse(status_code=200, text=json.dumps({
+            "authorization_endpoint": endpoint + "authorize",
+            "token_endpoint": endpoint + "token",
+            }))
+
+    def post(self, url, params=None, data=None, headers=None, **kwargs):
+        raise RuntimeError("Tests shall provide their own post=...")
+
+    def close(self):
+        pass
+
+
+class TestClientCredentialGrantWithCircuitBreaker(unittest.TestCase):
+
+    def test_degraded_regional_endpoint_should_fail_over_to_central(self):
+        from msal.circuit_breaker import CircuitBreaker
+        breaker = CircuitBreaker(minimum_requests=1, open_duration=60)
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(),
+            azure_region="westus", circuit_breaker=breaker)
+        hosts = []
+        def mock_post(url, **kwargs):
+            hosts.append(urlparse(url).hostname)
+            if hosts[-1] == "westus.login.microsoft.com":
+                raise IOError("Regional endpoint is degraded")
+            return MinimalResponse(
+                status_code=200, text=json.dumps({"access_token": "an AT"}))
+        result = app.acquire_token_for_client(["scope"], post=mock_post)
+        self.assertEqual("an AT", result.get("access_token"))
+        self.assertEqual(
+            ["westus.login.microsoft.com", "login.microsoftonline.com"], hosts)
+        app.acquire_token_for_client(["scope"], post=mock_post, force_refresh=True)
+        self.assertEqual(
+            "login.microsoftonline.com", hosts[-1], "Open circuit routes to central")
+        self.assertEqual(3, len(hosts))
+        self.assertEqual(
+            "open", breaker.get_metrics()["westus.login.microsoft.com"]["state"])
+
+    def test_retryable_error_response_should_count_as_a_failure(self):
+        from msal.circuit_breaker import CircuitBreaker
+        breaker = CircuitBreaker(minimum_requests=1, open_duration=60)
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(),
+            azure_region="westus", circuit_breaker=breaker)
+        hosts = []
+        def mock_post(url, **kwargs):
+            hosts.append(urlparse(url).hostname)
+            if hosts[-1] == "westus.login.microsoft.com":
+                return MinimalResponse(status_code=429, text=json.dumps({
+                    "error": "temporarily_unavailable"}))
+            return MinimalResponse(
+                status_code=200, text=json.dumps({"access_token": "an AT"}))
+        result = app.acquire_token_for_client(["scope"], post=mock_post)
+        self.assertEqual("an AT", result.get("access_token"))
+        self.assertEqual(
+            ["westus.login.microsoft.com", "login.microsoftonline.com"], hosts)
+        self.assertEqual(
+            "open", breaker.get_metrics()["westus.login.microsoft.com"]["state"])
+
+    def test_locally_raised_error_should_not_count_as_a_failure(self):
+        from msal.circuit_breaker import CircuitBreaker
+        from msal.rate_limiter import RateLimiter, RateLimitExceededError
+        breaker = CircuitBreaker(minimum_requests=1, open_duration=60)
+        hosts = []
+        class TokenHttpClient(OidcHttpClient):
+            def post(self, url, **kwargs):
+                hosts.append(urlparse(url).hostname)
+                return MinimalResponse(
+                    status_code=200, text=json.dumps({"access_token": "an AT"}))
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=TokenHttpClient(),
+            azure_region="westus", circuit_breaker=breaker,
+            rate_limiter=RateLimiter(rate=0.1, burst=1, blocking=False))
+        app.acquire_token_for_client(["scope"])
+        with self.assertRaises(RateLimitExceededError):
+            app.acquire_token_for_client(["scope"], force_refresh=True)
+        self.assertEqual(["westus.login.microsoft.com"], hosts, "No fail-over")
+        self.assertEqual(
+            "closed", breaker.get_metrics()["westus.login.microsoft.com"]["state"])
+
+    def test_non_retryable_error_response_should_not_count_as_a_failure(self):
+        from msal.circuit_breaker import CircuitBreaker
+        breaker = CircuitBreaker(minimum_requests=1, open_duration=60)
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(),
+            azure_region="westus", circuit_breaker=breaker)
+        result = app.acquire_token_for_client(
+            ["scope"], post=lambda url, **kwargs: MinimalResponse(
+                status_code=400, text=json.dumps({"error": "invalid_client"})))
+        self.assertEqual("invalid_client", result.get("error"))
+        self.assertEqual(
+            "closed", breaker.get_metrics()["westus.login.microsoft.com"]["state"])
+
+
+class TestConnectionPrewarming(unittest.TestCase):
+
+    def test_central_and_regional_token_endpoints_should_be_warmed_up(self):
+        import threading
+        warmed_up = []
+        done = threading.Event()
+        class WarmableHttpClient(OidcHttpClient):
+            def warm_up(self, url, connections=1):
+                warmed_up.append((urlparse(url).hostname, connections))
+                if len(warmed_up) == 2:
+                    done.set()
+        ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=WarmableHttpClient(),
+            azure_region="westus", prewarm_connections=2)
+        self.assertTrue(done.wait(5), "Warm-up shall happen in background")
+        self.assertEqual([
+            ("login.microsoftonline.com", 2),
+            ("westus.login.microsoft.com", 2),
+            ], warmed_up)
+
+
+class TestLazyAuthorityDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        Authority._openid_configs.clear()  # So that discovery will be observable
+
+    def test_discovery_shall_happen_once_on_first_use(self):
+        import threading
+        discoveries = []
+        class CountingHttpClient(OidcHttpClient):
+            def get(self, url, **kwargs):
+                discoveries.append(url)
+                time.sleep(0.1)  # So that concurrent callers would overlap
+                return super(CountingHttpClient, self).get(url, **kwargs)
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=CountingHttpClient(), lazy_authority_discovery=True)
+        self.assertEqual([], discoveries, "Constructor shall not do any io")
+        def mock_post(url, **kwargs):
+            return MinimalResponse(status_code=200, text=json.dumps({
+                "access_token": "an AT", "expires_in": 3600}))
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            app.acquire_token_for_client(["scope"], post=mock_post)))
+            for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(["an AT"] * 5, [r.get("access_token") for r in results])
+        self.assertEqual(1, len(discoveries))
+
+    def test_failed_discovery_shall_be_raised_and_retried_on_next_use(self):
+        class FlakyHttpClient(OidcHttpClient):
+            calls = 0
+            def get(self, url, **kwargs):
+                self.calls += 1
+                if self.calls == 1:
+                    raise IOError("Network is unreachable")
+                return super(FlakyHttpClient, self).get(url, **kwargs)
+        app = ClientApplication(
+            "client_id", authority="https://login.microsoftonline.com/contoso",
+            http_client=FlakyHttpClient(), lazy_authority_discovery=True)
+        with self.assertRaises(IOError):
+            app.get_authorization_request_url(["scope"])
+        self.assertTrue(app.get_authorization_request_url(["scope"]).startswith(
+            "https://login.microsoftonline.com/contoso/oauth2/v2.0/authorize?"))
+
+
+class TestRegionDetectionDuringAuthorityDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        msal.region._cache.clear()  # Detections are cached process-wide
+        msal.region._probe = None
+
+    def _build_http_client(self, imds_latency):
+        class SlowHttpClient(OidcHttpClient):
+            def get(self, url, **kwargs):
+                if urlparse(url).hostname == "169.254.169.254":
+                    time.sleep(imds_latency)
+                    return MinimalResponse(status_code=200, text="westus")
+                time.sleep(0.3)
+                return super(SlowHttpClient, self).get(url, **kwargs)
+        return SlowHttpClient()
+
+    def _build_app(self, http_client, **kwargs):
+        return ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=http_client,
+            azure_region=ClientApplication.ATTEMPT_REGION_DISCOVERY, **kwargs)
+
+    @unittest.skipIf(os.getenv("REGION_NAME"), "Region would not be detected via IMDS")
+    def test_region_detection_should_overlap_authority_discovery(self):
+        started_at = time.time()
+        app = self._build_app(self._build_http_client(imds_latency=0.3))
+        self.assertLess(  # It would be 0.9 if the 3 discoveries were sequential
+            time.time() - started_at, 0.85)
+        self.assertEqual(
+            "https://westus.login.microsoft.com/contoso/oauth2/v2.0/token",
+            app._regional_client.configuration["token_endpoint"])
+
+    @unittest.skipIf(os.getenv("REGION_NAME"), "Region would not be detected via IMDS")
+    def test_slow_region_detection_should_fall_back_to_central(self):
+        started_at = time.time()
+        app = self._build_app(
+            self._build_http_client(imds_latency=2), region_detection_timeout=0.1)
+        self.assertLess(time.time() - started_at, 1)
+        self.assertIsNone(app._regional_client)
+
+
+class TestTenantOverride(unittest.TestCase):
+
+    def setUp(self):
+        self.urls = []
+        self.cache = msal.SerializableTokenCache()
+        self.app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(), token_cache=self.cache)
+
+    def mock_post(self, url, data=None, **kwargs):
+        self.urls.append(url)
+        return MinimalResponse(status_code=200, text=json.dumps({
+            "access_token": "AT for " + url.split("/")[3], "expires_in": 3600}))
+
+    def test_acquire_token_for_client_should_use_given_tenant(self):
+        result = self.app.acquire_token_for_client(
+            ["scope"], tenant="fabrikam", post=self.mock_post)
+        self.assertEqual("AT for fabrikam", result.get("access_token"))
+        result = self.app.acquire_token_for_client(["scope"], post=self.mock_post)
+        self.assertEqual("AT for contoso", result.get("access_token"))
+        self.assertEqual(
+            set(["contoso", "fabrikam"]),
+            set(at["realm"] for at in self.cache.find(
+                self.cache.CredentialType.ACCESS_TOKEN)))
+
+    def test_acquire_token_on_behalf_of_should_use_given_tenant(self):
+        result = self.app.acquire_token_on_behalf_of(
+            "assertion", ["scope"], tenant="fabrikam", post=self.mock_post)
+        self.assertEqual("AT for fabrikam", result.get("access_token"))
+
+    def test_clients_of_least_recently_used_tenants_should_be_evicted(self):
+        self.app._max_tenant_clients = 2
+        for tenant in ["t1", "t2", "t1", "t3"]:
+            self.app.acquire_token_for_client(
+                ["scope"], tenant=tenant, post=self.mock_post)
+        self.assertEqual(["t1", "t3"], list(self.app._tenant_clients))
+
+    def test_malformed_tenant_should_be_rejected(self):
+        for tenant in ["evil.com/x", "fabrikam?x=y", "fabrikam#x", "a b", "../common"]:
+            with self.assertRaises(ValueError):
+                self.app.acquire_token_for_client(
+                    ["scope"], tenant=tenant, post=self.mock_post)
+        self.assertEqual([], self.urls)
+
+    def test_tenant_clients_should_use_the_region_of_this_app(self):
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(), azure_region="westus")
+        def fail(*args, **kwargs):
+            raise AssertionError("Region shall not be resolved per tenant")
+        app._get_regional_authority = fail
+        result = app.acquire_token_for_client(
+            ["scope"], tenant="fabrikam", post=self.mock_post)
+        self.assertEqual("AT for fabrikam", result.get("access_token"))
+        self.assertEqual(
+            "https://westus.login.microsoft.com/fabrikam/oauth2/v2.0/token",
+            self.urls[-1])
+
+
+class TestSilentRefreshShallReuseClients(unittest.TestCase):
+
+    def test_refreshing_under_an_alias_shall_build_client_once(self):
+        cache = msal.SerializableTokenCache()
+        cache.add({  # An RT under an alias, so that the alias path will be used
+            "client_id": "my_app",
+            "scope": ["s1"],
+            "token_endpoint": "https://login.windows.net/contoso/oauth2/v2.0/token",
+            "response": build_response(
+                access_token="an expired AT", expires_in=-99,
+                uid="uid", utid="utid", refresh_token="an RT"),
+            })
+        app = ClientApplication(
+            "my_app", authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(), token_cache=cache)
+        app._get_instance_metadata = lambda **kwargs: [{"aliases": [
+            "login.microsoftonline.com", "login.windows.net"]}]
+        account = {"home_account_id": "uid.utid"}
+        def mock_post(url, **kwargs):
+            return MinimalResponse(status_code=200, text=json.dumps(build_response(
+                access_token="a new AT", expires_in=-99,  # So it will be refreshed again
+                uid="uid", utid="utid", refresh_token="an RT")))
+        built = []
+        build_client = app._build_client
+        app._build_client = lambda *args, **kwargs: built.append(args) or build_client(
+            *args, **kwargs)
+        for _ in range(3):
+            result = app.acquire_token_silent(["s1"], account, post=mock_post)
+            self.assertEqual("a new AT", result.get("access_token"))
+        self.assertEqual(1, len(built))
+        self.assertEqual(["login.windows.net"], list(app._alias_authorities))
+
+
+class TestInstanceMetadataSharedByApps(unittest.TestCase):
+
+    def test_instance_metadata_shall_be_fetched_once_per_process(self):
+        msal.application._instance_metadata.clear()
+        class MetadataHttpClient(OidcHttpClient):
+            calls = 0
+            def get(self, url, **kwargs):
+                if "discovery/instance" not in url:
+                    return super(MetadataHttpClient, self).get(url, **kwargs)
+                MetadataHttpClient.calls += 1
+                return MinimalResponse(status_code=200, text=json.dumps({"metadata": [{
+                    "aliases": ["login.microsoftonline.com", "login.windows.net"],
+                    }]}))
+        for _ in range(2):
+            app = ClientApplication(
+                "client_id", authority="https://login.microsoftonline.com/contoso",
+                http_client=MetadataHttpClient())
+            self.assertEqual([], app.get_accounts())
+            self.assertEqual(
+                ["login.windows.net"],
+                app._get_authority_aliases("login.microsoftonline.com"))
+        self.assertEqual(1, MetadataHttpClient.calls)
+
+
+class TestRefreshInBackground(unittest.TestCase):
+    account = {"home_account_id": "uid.utid"}
+
+    def setUp(self):
+        self.app = ClientApplication(
+            "my_app", authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(), refresh_in_background=True)
+        self.app._get_instance_metadata = lambda **kwargs: []
+        self.app.token_cache.add({
+            "client_id": "my_app",
+            "scope": ["s1"],
+            "token_endpoint": "https://login.microsoftonline.com/contoso/oauth2/v2.0/token",
+            "response": build_response(
+                access_token="old AT", expires_in=3600, refresh_in=-1,
+                uid="uid", utid="utid", refresh_token="an RT"),
+            })
+        self.aad_may_respond = threading.Event()
+        self.requests = []
+
+    def mock_post(self, url, **kwargs):
+        self.requests.append(url)
+        self.aad_may_respond.wait()
+        return MinimalResponse(status_code=200, text=json.dumps(build_response(
+            access_token="new AT", uid="uid", utid="utid", refresh_token="new RT",
+            scope="s1")))
+
+    def test_aging_token_should_be_returned_while_being_refreshed(self):
+        for _ in range(3):
+            result = self.app.acquire_token_silent(
+                ["s1"], self.account, post=self.mock_post)
+            self.assertEqual("old AT", result.get("access_token"))
+        refreshes = list(self.app._background_refreshes.values())
+        self.assertEqual(1, len(refreshes), "Refreshes should be deduplicated")
+        self.aad_may_respond.set()
+        refreshes[0].result(timeout=5)
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual({}, self.app._background_refreshes)
+        result = self.app.acquire_token_silent(
+            ["s1"], self.account, post=self.mock_post)
+        self.assertEqual("new AT", result.get("access_token"))
+        self.assertEqual(1, len(self.requests))
+
+    def test_force_refresh_should_still_happen_in_foreground(self):
+        self.aad_may_respond.set()
+        result = self.app.acquire_token_silent(
+            ["s1"], self.account, post=self.mock_post, force_refresh=True)
+        self.assertEqual("new AT", result.get("access_token"))
+        self.assertEqual({}, self.app._background_refreshes)
+
+
+class TestConcurrentAcquisitionsShallBeCoalesced(unittest.TestCase):
+
+    def test_concurrent_acquire_token_for_client_should_send_one_request(self):
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient())
+        requests = []
+        def mock_post(url, **kwargs):
+            requests.append(url)
+            time.sleep(0.3)  # So that other callers arrive in the meantime
+            return MinimalResponse(status_code=200, text=json.dumps({
+                "access_token": "an AT", "expires_in": 3600}))
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                app.acquire_token_for_client(["scope"], post=mock_post)))
+            for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(1, len(requests))
+        self.assertEqual(["an AT"] * 5, [r.get("access_token") for r in results])
+
+
+class TestConcurrentSilentRefreshesShallBeCoalesced(unittest.TestCase):
+    account = {"home_account_id": "uid.utid"}
+
+    def setUp(self):
+        self.app = ClientApplication(
+            "my_app", authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient())
+        self.app._get_instance_metadata = lambda **kwargs: []
+        self.app.token_cache.add({
+            "client_id": "my_app",
+            "scope": ["s1"],
+            "token_endpoint": "https://login.microsoftonline.com/contoso/oauth2/v2.0/token",
+            "response": build_response(
+                access_token="old AT", expires_in=0,
+                uid="uid", utid="utid", refresh_token="an RT"),
+            })
+        self.requests = []
+
+    def mock_post(self, url, deadline=None, **kwargs):
+        self.requests.append(url)
+        time.sleep(0.3)  # So that other callers arrive in the meantime
+        if deadline and deadline.remaining() <= 0:
+            raise deadline.error()  # As if the request timed out
+        return MinimalResponse(status_code=200, text=json.dumps(build_response(
+            access_token="new AT", uid="uid", utid="utid", refresh_token="new RT",
+            scope="s1")))
+
+    def acquire_concurrently(self, timeouts):
+        outcomes = [None] * len(timeouts)
+        def acquire(i, timeout):
+            try:
+                outcomes[i] = self.app.acquire_token_silent(
+                    ["s1"], self.account, post=self.mock_post, timeout=timeout)
+            except Exception as e:
+                outcomes[i] = e
+        threads = [threading.Thread(target=acquire, args=(i, timeout))
+            for i, timeout in enumerate(timeouts)]
+        for t in threads:
+            t.start()
+            time.sleep(0.05)  # So that the first one leads
+        for t in threads:
+            t.join()
+        return outcomes
+
+    def test_concurrent_acquire_token_silent_should_send_one_request(self):
+        outcomes = self.acquire_concurrently([None] * 5)
+        self.assertEqual(1, len(self.requests))
+        self.assertEqual(
+            ["new AT"] * 5, [o.get("access_token") for o in outcomes])
+
+    def test_leader_running_out_of_its_own_time_should_not_fail_others(self):
+        outcomes = self.acquire_concurrently([0.2, None, None])
+        self.assertIsInstance(outcomes[0], DeadlineExceededError)
+        self.assertEqual(
+            ["new AT"] * 2, [o.get("access_token") for o in outcomes[1:]])
+        self.assertEqual(2, len(self.requests), "A follower took over only once")
@@ -0,0 +1,193 @@
+import json
+import sys
+try:
+    from urllib.parse import urlparse
+except ImportError:  # Fall back to Python 2
+    from urlparse import urlparse
+
+from msal.application import ConfidentialClientApplication
+from msal.authority import Authority
+from msal.token_cache import TokenCache
+from tests import unittest
+from tests.test_application import OidcHttpClient
+from tests.test_token_cache import build_id_token, build_response
+
+if sys.version_info >= (3, 5):  # This file itself avoids async syntax, for Python 2
+    import asyncio
+    from msal.application_async import (
+        AsyncConfidentialClientApplication, AsyncPublicClientApplication)
+    from msal.deadline import DeadlineExceededError
+
+
+def _resolve_soon(value):
+    # Returns an awaitable which, like real io, lets other coroutines run first
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+    loop.call_soon(future.set_result, value)
+    return future
+
+
+class AiohttpLikeResponse(object):
+    def __init__(self, status, payload):
+        self.status = status
+        self.headers = {}
+        self._text = json.dumps(payload)
+
+    def text(self):
+        return _resolve_soon(self._text)
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError("HTTP {}".format(self.status))
+
+
+class AsyncHttpClient(object):
+    """It serves OIDC discovery of any authority, and tokens from a callable"""
+    def __init__(self, token_endpoint=lambda url, data: {}):
+        self._token_endpoint = token_endpoint
+        self.gets = []
+        self.posts = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.gets.append(url)
+        response = OidcHttpClient().get(url)
+        return _resolve_soon(AiohttpLikeResponse(200, json.loads(response.text)))
+
+    def post(self, url, params=None, data=None, headers=None, **kwargs):
+        self.posts.append(data)
+        payload = self._token_endpoint(url, data)
+        return _resolve_soon(AiohttpLikeResponse(
+            400 if "error" in payload else 200, payload))
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "asyncio apps require Python 3.5+")
+class TestAsyncApplication(unittest.TestCase):
+    authority = "https://login.microsoftonline.com/contoso"
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        Authority._openid_configs.clear()  # So that discovery will be observable
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def _run(self, *coroutines):
+        results = self.loop.run_until_complete(asyncio.gather(*coroutines))
+        return results if len(coroutines) > 1 else results[0]
+
+    def test_http_client_is_required(self):
+        with self.assertRaises(ValueError):
+            AsyncConfidentialClientApplication(
+                "id", client_credential="secret", authority=self.authority)
+
+    def test_public_client_shall_not_possess_credential(self):
+        with self.assertRaises(ValueError):
+            AsyncPublicClientApplication(
+                "id", client_credential="secret", http_client=AsyncHttpClient())
+
+    def test_discovery_is_lazy_and_single_flight(self):
+        http_client = AsyncHttpClient(lambda url, data: build_response(
+            access_token="an AT", expires_in=3600))
+        app = AsyncConfidentialClientApplication(
+            "id", client_credential="secret", authority=self.authority,
+            http_client=http_client)
+        self.assertEqual([], http_client.gets, "Constructor shall do no io")
+        results = self._run(*[
+            app.acquire_token_for_client(["scope"]) for _ in range(3)])
+        self.assertEqual(["an AT"] * 3, [r.get("access_token") for r in results])
+        self.assertEqual(1, len(http_client.gets), "Discovery shall happen once")
+        self.assertEqual(
+            "login.microsoftonline.com", urlparse(http_client.gets[0]).hostname)
+
+    def test_token_cache_is_shared_with_sync_app(self):
+        cache = TokenCache()
+        app = AsyncConfidentialClientApplication(
+            "id", client_credential="secret", authority=self.authority,
+            token_cache=cache,
+            http_client=AsyncHttpClient(lambda url, data: build_response(
+                access_token="an AT", expires_in=3600)))
+        self._run(app.acquire_token_for_client(["scope"]))
+        sync_app = ConfidentialClientApplication(
+            "id", client_credential="secret", authority=self.authority,
+            token_cache=cache, http_client=OidcHttpClient())
+        self.assertEqual(
+            "an AT", sync_app.acquire_token_silent(["scope"], None)["access_token"])
+
+    def test_acquire_token_silent_shall_refresh_then_hit_cache(self):
+        uid, utid = "uid", "utid"
+        def token_endpoint(url, data):
+            return build_response(
+                uid=uid, utid=utid,
+                access_token="AT for " + data["scope"], refresh_token="an RT",
+                id_token=build_id_token(aud="id", preferred_username="john"))
+        http_client = AsyncHttpClient(token_endpoint)
+        app = AsyncPublicClientApplication(
+            "id", authority=self.authority, http_client=http_client)
+        self._run(app.acquire_token_by_refresh_token("an old RT", ["s1"]))
+        account = self._run(app.get_accounts(username="john"))[0]
+        refreshed = self._run(app.acquire_token_silent(["s2"], account))
+        cached = self._run(app.acquire_token_silent(["s2"], account))
+        self.assertIn("AT for ", refreshed["access_token"])
+        self.assertIn("s2", refreshed["access_token"])
+        self.assertEqual(refreshed["access_token"], cached["access_token"])
+        self.assertEqual(
+            ["an old RT", "an RT"],
+            [data["refresh_token"] for data in http_client.posts],
+            "The 2nd acquire_token_silent() shall be served by token cache")
+
+    def test_acquire_token_on_behalf_of(self):
+        http_client = AsyncHttpClient(lambda url, data: build_response(
+            access_token="an OBO AT", refresh_token="an RT"))
+        app = AsyncConfidentialClientApplication(
+            "id", client_credential="secret", authority=self.authority,
+            http_client=http_client)
+        result = self._run(app.acquire_token_on_behalf_of("assertion", ["scope"]))
+        self.assertEqual("an OBO AT", result["access_token"])
+        self.assertEqual("on_behalf_of", http_client.posts[0]["requested_token_use"])
+        self.assertEqual("assertion", http_client.posts[0]["assertion"])
+
+    def test_acquire_token_on_behalf_of_shall_reuse_its_refresh_token(self):
+        http_client = AsyncHttpClient(lambda url, data: build_response(
+            access_token="an OBO AT for " + data["scope"], refresh_token="an RT"))
+        app = AsyncConfidentialClientApplication(
+            "id", client_credential="secret", authority=self.authority,
+            http_client=http_client)
+        self._run(app.acquire_token_on_behalf_of("assertion", ["s1"]))
+        result = self._run(app.acquire_token_on_behalf_of("assertion", ["s2"]))
+        self.assertIn("s2", result["access_token"])
+        self.assertEqual(
+            ["urn:ietf:params:oauth:grant-type:jwt-bearer", "refresh_token"],
+            [data["grant_type"] for data in http_client.posts])
+        self.assertEqual("an RT", http_client.posts[1]["refresh_token"])
+
+    def test_auth_code_and_username_password_flows_are_not_offered(self):
+        app = AsyncPublicClientApplication(
+            "id", authority=self.authority, http_client=AsyncHttpClient())
+        for name in (
+                "initiate_auth_code_flow", "get_authorization_request_url",
+                "acquire_token_by_auth_code_flow",
+                "acquire_token_by_authorization_code",
+                "acquire_token_by_username_password"):
+            self.assertFalse(hasattr(app, name), name)
+            self.assertFalse(hasattr(AsyncPublicClientApplication, name), name)
+
+    def test_http_400_shall_be_throttled_as_in_sync_app(self):
+        http_client = AsyncHttpClient(lambda url, data: {"error": "invalid_grant"})
+        app = AsyncPublicClientApplication(
+            "id", authority=self.authority, http_client=http_client)
+        results = [self._run(app.acquire_token_by_refresh_token("an RT", ["s"]))
+            for _ in range(2)]
+        self.assertEqual(["invalid_grant"] * 2, [r["error"] for r in results])
+        self.assertEqual(1, len(http_client.posts))
+
+    def test_timeout_shall_cancel_a_pending_request(self):
+        class UnresponsiveHttpClient(AsyncHttpClient):
+            def post(self, url, params=None, data=None, headers=None, **kwargs):
+                return asyncio.get_event_loop().create_future()  # Never resolved
+        app = AsyncConfidentialClientApplication(
+            "id", client_credential="secret", authority=self.authority,
+            http_client=UnresponsiveHttpClient())
+        with self.assertRaises(DeadlineExceededError):
+            self._run(app.acquire_token_for_client(["scope"], timeout=0.1))
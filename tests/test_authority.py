@@ -1,4 +1,6 @@
+import json
 import os
+import time
 try:
     from unittest.mock import patch
 except:
@@ -212,3 +214,110 @@ class TestMsalBehaviorsWithoutAndWithInstanceDiscoveryBoolean(unittest.TestCase)
         app.get_accounts()  # This could make an instance metadata call for authority aliases
         instance_metadata.assert_not_called()
 
+
+
+class TestConcurrentInstanceAndTenantDiscovery(unittest.TestCase):
+
+    def setUp(self):
+        Authority._openid_configs.clear()
+
+    def _build_http_client(self, tenant_discovery_endpoint, latency):
+        test = self
+        class SlowHttpClient(object):
+            def __init__(self):
+                self.urls = []
+            def get(self, url, params=None, **kwargs):
+                self.urls.append(url)
+                time.sleep(latency)
+                if url.endswith("/discovery/instance"):
+                    return test._response({
+                        "tenant_discovery_endpoint": tenant_discovery_endpoint})
+                return test._response({
+                    "authorization_endpoint": url.replace(
+                        "v2.0/.well-known/openid-configuration",
+                        "oauth2/v2.0/authorize"),
+                    "token_endpoint": url.replace(
+                        "v2.0/.well-known/openid-configuration",
+                        "oauth2/v2.0/token"),
+                    })
+        return SlowHttpClient()
+
+    def _response(self, payload):
+        class MockResponse(object):
+            status_code = 200
+            text = json.dumps(payload)
+            def raise_for_status(self):
+                pass
+        return MockResponse()
+
+    def test_unvalidated_instance_should_receive_no_request(self):
+        endpoint = "https://private.cloud/foo/v2.0/.well-known/openid-configuration"
+        http_client = self._build_http_client(endpoint, latency=0.1)
+        def get(url, **kwargs):
+            http_client.urls.append(url)
+            return self._response({"error": "invalid_instance"})
+        http_client.get = get
+        with self.assertRaises(ValueError):
+            Authority("https://private.cloud/foo", http_client)
+        self.assertEqual(1, len(http_client.urls))
+        self.assertTrue(http_client.urls[0].endswith("/discovery/instance"))
+
+    def test_endpoint_given_by_instance_discovery_should_be_honored(self):
+        endpoint = "https://other.cloud/foo/v2.0/.well-known/openid-configuration"
+        http_client = self._build_http_client(endpoint, latency=0)
+        a = Authority("https://private.cloud/foo", http_client)
+        self.assertEqual("https://other.cloud/foo/oauth2/v2.0/token", a.token_endpoint)
+        self.assertIn(endpoint, http_client.urls)
+
+
+class TestAuthorityMetadataRegistry(unittest.TestCase):
+
+    def setUp(self):
+        Authority._openid_configs.clear()
+
+    @patch("msal.authority.tenant_discovery", return_value={
+        "authorization_endpoint": "https://contoso.com/placeholder",
+        "token_endpoint": "https://contoso.com/placeholder",
+        })
+    def test_metadata_should_be_shared_until_it_expires(self, oidc_discovery):
+        Authority("https://contoso.com/adfs", None)
+        a = Authority("https://contoso.com/adfs", None)
+        self.assertEqual("https://contoso.com/placeholder", a.token_endpoint)
+        oidc_discovery.assert_called_once()
+        Authority._openid_configs.clear()
+        with patch.object(Authority, "_openid_config_ttl", 0):
+            Authority("https://contoso.com/adfs", None)  # Registers an expired one
+            Authority("https://contoso.com/adfs", None)
+        self.assertEqual(3, oidc_discovery.call_count)
+
+    @patch("msal.authority.tenant_discovery", return_value={
+        "authorization_endpoint": "https://contoso.com/placeholder",
+        "token_endpoint": "https://contoso.com/placeholder",
+        })
+    def test_least_recently_used_metadata_should_be_evicted(self, oidc_discovery):
+        with patch.object(Authority, "_openid_configs_capacity", 2):
+            Authority("https://contoso.com/adfs", None)
+            Authority("https://fabrikam.com/adfs", None)
+            Authority("https://contoso.com/adfs", None)  # Now the most recently used
+            Authority("https://example.com/adfs", None)  # Evicts fabrikam
+            self.assertEqual(2, len(Authority._openid_configs))
+            self.assertEqual(3, oidc_discovery.call_count)
+            Authority("https://contoso.com/adfs", None)
+            self.assertEqual(3, oidc_discovery.call_count)
+            Authority("https://fabrikam.com/adfs", None)
+            self.assertEqual(4, oidc_discovery.call_count)
+
+    @patch("msal.authority.tenant_discovery", return_value={
+        "authorization_endpoint": "https://private.cloud/foo/authorize",
+        "token_endpoint": "https://private.cloud/foo/token",
+        })
+    @patch("msal.authority._instance_discovery", return_value={
+        "tenant_discovery_endpoint":
+            "https://private.cloud/foo/v2.0/.well-known/openid-configuration",
+        })
+    def test_unvalidated_metadata_should_not_skip_validation(
+            self, instance_discovery, oidc_discovery):
+        Authority("https://private.cloud/foo", None, validate_authority=False)
+        instance_discovery.assert_not_called()
+        Authority("https://private.cloud/foo", None)
+        instance_discovery.assert_called_once()
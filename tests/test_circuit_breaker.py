@@ -0,0 +1,45 @@
+import time
+from msal.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from tests import unittest
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_circuit_should_open_after_failure_rate_threshold(self):
+        breaker = CircuitBreaker(
+            failure_rate_threshold=0.5, minimum_requests=4, window_size=4)
+        for failed in (False, True, False):
+            self.assertTrue(breaker.allow("host"))
+            breaker.record("host", failed)
+        self.assertEqual(CLOSED, breaker.get_metrics()["host"]["state"])
+        breaker.record("host", True)
+        self.assertEqual(OPEN, breaker.get_metrics()["host"]["state"])
+        self.assertFalse(breaker.allow("host"))
+        self.assertTrue(breaker.allow("another host"), "Circuits are per host")
+
+    def test_slow_call_should_count_as_failure(self):
+        breaker = CircuitBreaker(minimum_requests=1, slow_call_threshold=0.1)
+        breaker.record("host", False, latency=1)
+        self.assertFalse(breaker.allow("host"))
+        self.assertEqual(1, breaker.get_metrics()["host"]["average_latency"])
+
+    def test_half_open_should_allow_one_probe_and_then_close(self):
+        breaker = CircuitBreaker(minimum_requests=1, open_duration=0.1)
+        breaker.record("host", True)
+        self.assertFalse(breaker.allow("host"))
+        time.sleep(0.2)
+        self.assertTrue(breaker.allow("host"), "A probe should be allowed")
+        self.assertEqual(HALF_OPEN, breaker.get_metrics()["host"]["state"])
+        self.assertFalse(breaker.allow("host"), "Only one probe at a time")
+        breaker.record("host", False)
+        self.assertEqual(CLOSED, breaker.get_metrics()["host"]["state"])
+        self.assertTrue(breaker.allow("host"))
+
+    def test_failed_probe_should_reopen_circuit(self):
+        breaker = CircuitBreaker(minimum_requests=1, open_duration=0.1)
+        breaker.record("host", True)
+        time.sleep(0.2)
+        self.assertTrue(breaker.allow("host"))
+        breaker.record("host", True)
+        self.assertFalse(breaker.allow("host"))
+        self.assertEqual(2, breaker.get_metrics()["host"]["times_opened"])
@@ -0,0 +1,103 @@
+import json
+
+from msal.application import ConfidentialClientApplication, PublicClientApplication
+from msal.deadline import _Deadline, DeadlineExceededError
+from msal.retry_policy import RetryPolicy
+from msal.throttled_http_client import ThrottledHttpClient
+from tests import unittest
+from tests.http_client import MinimalResponse
+from tests.test_application import OidcHttpClient
+from tests.test_retry_policy import SequentialHttpClient, _response
+from tests.test_token_cache import build_response
+
+
+class RecordingHttpClient(OidcHttpClient):
+    def __init__(self):
+        self.post_kwargs = []
+
+    def post(self, url, params=None, data=None, headers=None, **kwargs):
+        self.post_kwargs.append(kwargs)
+        return MinimalResponse(status_code=200, text=json.dumps(build_response(
+            access_token="an AT", expires_in=3600)))
+
+
+class TestDeadline(unittest.TestCase):
+
+    def test_shrink_should_cap_request_timeout_by_remaining_time(self):
+        deadline = _Deadline(10, default_request_timeout=3)
+        self.assertEqual(3, deadline.shrink())
+        self.assertEqual(1, deadline.shrink(1))
+        self.assertLessEqual(deadline.shrink(60), 10)
+        connect_timeout, read_timeout = deadline.shrink((2, None))
+        self.assertEqual(2, connect_timeout)
+        self.assertLessEqual(read_timeout, 10)
+
+    def test_shrink_should_raise_when_time_runs_out(self):
+        with self.assertRaises(DeadlineExceededError):
+            _Deadline(0).shrink(5)
+
+    def test_throttled_http_client_should_pass_timeout_rather_than_deadline(self):
+        http_client = RecordingHttpClient()
+        ThrottledHttpClient(http_client, {}).post(
+            "https://example.com/token", deadline=_Deadline(10))
+        self.assertEqual(["timeout"], list(http_client.post_kwargs[0]))
+        self.assertLessEqual(http_client.post_kwargs[0]["timeout"], 10)
+
+    def test_deadline_should_stop_retrying(self):
+        http_client = SequentialHttpClient(
+            _response(503, {"Retry-After": "1"}), _response(200))
+        throttled = ThrottledHttpClient(
+            http_client, {}, retry_policy=RetryPolicy(max_delay=5))
+        resp = throttled.post(
+            "https://example.com/token",
+            data={"client_id": "id", "grant_type": "client_credentials"},
+            deadline=_Deadline(0.5))
+        self.assertEqual(503, resp.status_code)
+        self.assertEqual(1, http_client.calls)
+
+
+class TestTimeoutOfTokenAcquisition(unittest.TestCase):
+
+    def _build_app(self, http_client):
+        return ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=http_client)
+
+    def test_timeout_should_bound_each_request(self):
+        http_client = RecordingHttpClient()
+        result = self._build_app(http_client).acquire_token_for_client(
+            ["scope"], timeout=5)
+        self.assertEqual("an AT", result.get("access_token"))
+        self.assertLessEqual(http_client.post_kwargs[0]["timeout"], 5)
+
+    def test_exhausted_timeout_should_abort_before_sending_request(self):
+        http_client = RecordingHttpClient()
+        with self.assertRaises(DeadlineExceededError):
+            self._build_app(http_client).acquire_token_for_client(
+                ["scope"], timeout=0)
+        self.assertEqual([], http_client.post_kwargs)
+
+    def test_timeout_of_username_password_should_be_an_overall_budget(self):
+        http_client = RecordingHttpClient()
+        app = PublicClientApplication(
+            "client_id", authority="https://login.microsoftonline.com/contoso",
+            http_client=http_client)
+        result = app.acquire_token_by_username_password(
+            "user@contoso.com", "password", ["scope"], timeout=5)
+        self.assertEqual("an AT", result.get("access_token"))
+        self.assertLessEqual(http_client.post_kwargs[0]["timeout"], 5)
+        with self.assertRaises(DeadlineExceededError):
+            app.acquire_token_by_username_password(
+                "user@contoso.com", "password", ["scope"], timeout=0)
+        self.assertEqual(1, len(http_client.post_kwargs))
+
+    def test_timeout_of_device_flow_should_be_an_overall_budget(self):
+        http_client = RecordingHttpClient()
+        app = PublicClientApplication(
+            "client_id", authority="https://login.microsoftonline.com/contoso",
+            http_client=http_client)
+        with self.assertRaises(DeadlineExceededError):
+            app.acquire_token_by_device_flow(
+                {"device_code": "code", "interval": 1, "expires_in": 60}, timeout=0)
+        self.assertEqual([], http_client.post_kwargs)
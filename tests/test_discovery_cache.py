@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+import tempfile
+try:
+    from unittest.mock import patch
+except:
+    from mock import patch
+
+import msal.application
+from msal.application import ConfidentialClientApplication
+from msal.authority import Authority
+from msal.discovery_cache import DiscoveryCache
+from tests import unittest
+from tests.http_client import MinimalResponse
+
+
+_OPENID_CONFIG = {
+    "authorization_endpoint": "https://login.microsoftonline.com/contoso/oauth2/v2.0/authorize",
+    "token_endpoint": "https://login.microsoftonline.com/contoso/oauth2/v2.0/token",
+    }
+
+
+@patch("msal.authority.tenant_discovery", return_value=_OPENID_CONFIG)
+class TestDiscoveryCache(unittest.TestCase):
+    authority = "https://login.microsoftonline.com/contoso"
+
+    def setUp(self):
+        Authority._openid_configs.clear()  # As if it were a new process
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "discovery.json")
+
+    def tearDown(self):
+        Authority._openid_configs.clear()
+        msal.application._instance_metadata.clear()
+        shutil.rmtree(self.folder)
+
+    def test_result_should_be_reused_by_another_process(self, oidc_discovery):
+        Authority(self.authority, None, discovery_cache=DiscoveryCache(self.path))
+        Authority._openid_configs.clear()
+        a = Authority(self.authority, None, discovery_cache=DiscoveryCache(self.path))
+        self.assertEqual(_OPENID_CONFIG["token_endpoint"], a.token_endpoint)
+        oidc_discovery.assert_called_once()
+
+    def test_expired_result_should_not_be_used(self, oidc_discovery):
+        Authority(self.authority, None, discovery_cache=DiscoveryCache(self.path))
+        Authority._openid_configs.clear()
+        Authority(self.authority, None, discovery_cache=DiscoveryCache(self.path, ttl=0))
+        self.assertEqual(2, oidc_discovery.call_count)
+
+    def test_seeded_result_should_be_used_without_discovery(self, oidc_discovery):
+        Authority(self.authority, None, discovery_cache=DiscoveryCache(self.path))
+        seed = os.path.join(self.folder, "seed.json")
+        os.rename(self.path, seed)  # As if it were produced during image build
+        Authority._openid_configs.clear()
+        a = Authority(self.authority, None, discovery_cache=DiscoveryCache(
+            ttl=0, seed=seed))
+        self.assertEqual(_OPENID_CONFIG["token_endpoint"], a.token_endpoint)
+        oidc_discovery.assert_called_once()
+
+    def test_corrupted_file_should_be_ignored(self, oidc_discovery):
+        with open(self.path, "w") as f:
+            f.write("not json")
+        Authority(self.authority, None, discovery_cache=DiscoveryCache(self.path))
+        oidc_discovery.assert_called_once()
+        with open(self.path) as f:
+            self.assertEqual(1, len(json.load(f)["openid_configs"]))
+
+    def test_malformed_seed_entries_should_be_cache_misses(self, oidc_discovery):
+        Authority(self.authority, None, discovery_cache=DiscoveryCache(self.path))
+        with open(self.path) as f:
+            key = list(json.load(f)["openid_configs"])[0]
+        seed = os.path.join(self.folder, "seed.json")
+        for entry in ({}, {"openid_config": {}}, {"openid_config": "corrupted"}, None):
+            with open(seed, "w") as f:
+                json.dump({"openid_configs": {key: entry}}, f)
+            Authority._openid_configs.clear()
+            a = Authority(self.authority, None, discovery_cache=DiscoveryCache(
+                seed=seed))
+            self.assertEqual(_OPENID_CONFIG["token_endpoint"], a.token_endpoint)
+        self.assertEqual(5, oidc_discovery.call_count)
+
+    def test_malformed_file_entries_should_be_cache_misses(self, oidc_discovery):
+        Authority(self.authority, None, discovery_cache=DiscoveryCache(self.path))
+        with open(self.path) as f:
+            key = list(json.load(f)["openid_configs"])[0]
+        with open(self.path, "w") as f:
+            json.dump({"openid_configs": {key: {
+                "openid_config": _OPENID_CONFIG, "discovered_at": "corrupted"}}}, f)
+        Authority._openid_configs.clear()
+        Authority(self.authority, None, discovery_cache=DiscoveryCache(self.path))
+        self.assertEqual(2, oidc_discovery.call_count)
+
+    def test_instance_metadata_should_be_reused_by_another_process(
+            self, oidc_discovery):
+        metadata = [{"preferred_network": "login.microsoftonline.com",
+            "aliases": ["login.microsoftonline.com", "login.windows.net"]}]
+        class HttpClient(object):
+            gets = 0
+            def get(self, url, **kwargs):
+                HttpClient.gets += 1
+                return MinimalResponse(
+                    status_code=200, text=json.dumps({"metadata": metadata}))
+        for _ in range(2):  # As if they were two processes
+            msal.application._instance_metadata.clear()
+            Authority._openid_configs.clear()
+            app = ConfidentialClientApplication(
+                "id", client_credential="secret", authority=self.authority,
+                http_client=HttpClient(),
+                discovery_cache=DiscoveryCache(self.path))
+            self.assertEqual(
+                ["login.windows.net"],
+                app._get_authority_aliases("login.microsoftonline.com"))
+        self.assertEqual(1, HttpClient.gets, "Instance discovery shall happen once")
@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+try:
+    from urllib.parse import urlparse
+except ImportError:  # Fall back to Python 2
+    from urlparse import urlparse
+
+from msal.application import ConfidentialClientApplication
+from msal.hedging import HedgingPolicy
+from msal.token_cache import TokenCache
+from tests import unittest
+from tests.http_client import MinimalResponse
+from tests.test_application import OidcHttpClient
+
+
+class TestHedgingPolicy(unittest.TestCase):
+
+    def test_delay_should_follow_percentile_of_recent_latencies(self):
+        policy = HedgingPolicy(
+            percentile=90, initial_delay=1, min_delay=0, minimum_requests=10)
+        self.assertEqual(1, policy.get_delay())
+        for latency in range(1, 11):
+            policy.record(latency / 10.0)
+        self.assertEqual(0.9, policy.get_delay())
+
+    def test_fast_primary_should_not_be_hedged(self):
+        policy = HedgingPolicy(initial_delay=1)
+        result = policy.run(
+            lambda: {"error": "invalid_client"},
+            lambda: self.fail("Secondary shall not be called"))
+        self.assertEqual("invalid_client", result["error"])
+        self.assertEqual(0, policy.get_metrics()["hedged"])
+
+    def test_slow_primary_should_lose_to_secondary(self):
+        policy = HedgingPolicy(initial_delay=0.1)
+        def slow():
+            time.sleep(1)
+            return {"access_token": "slow"}
+        self.assertEqual(
+            "fast", policy.run(slow, lambda: {"access_token": "fast"})["access_token"])
+        metrics = policy.get_metrics()
+        self.assertEqual(1, metrics["hedged"])
+        self.assertEqual(1, metrics["secondary_wins"])
+
+    def test_broken_primary_should_be_hedged_immediately(self):
+        policy = HedgingPolicy(initial_delay=60)
+        def broken():
+            raise IOError("Connection reset")
+        started_at = time.time()
+        self.assertEqual("central", policy.run(
+            broken, lambda: {"access_token": "central"})["access_token"])
+        self.assertLess(time.time() - started_at, 5)
+
+    def test_primary_exception_should_be_raised_when_both_fail(self):
+        policy = HedgingPolicy(initial_delay=0.1)
+        def fail(message):
+            def function():
+                raise IOError(message)
+            return function
+        with self.assertRaises(IOError) as context:
+            policy.run(fail("regional"), fail("central"))
+        self.assertEqual("regional", str(context.exception))
+
+
+class TestClientCredentialGrantWithHedging(unittest.TestCase):
+
+    def test_only_the_winner_should_reach_token_cache(self):
+        regional_completed = threading.Event()
+        def mock_post(url, **kwargs):
+            host = urlparse(url).hostname
+            if host == "westus.login.microsoft.com":
+                time.sleep(0.5)  # Slower than the hedging delay
+                regional_completed.set()
+            return MinimalResponse(status_code=200, text=json.dumps({
+                "access_token": "AT from " + host, "expires_in": 3600}))
+        cache = TokenCache()
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(), token_cache=cache,
+            azure_region="westus",
+            hedging_policy=HedgingPolicy(initial_delay=0.1))
+        result = app.acquire_token_for_client(["scope"], post=mock_post)
+        self.assertEqual(
+            "AT from login.microsoftonline.com", result.get("access_token"))
+        self.assertTrue(regional_completed.wait(5))
+        time.sleep(0.1)  # So that the regional thread would have finished
+        self.assertEqual(
+            ["AT from login.microsoftonline.com"],
+            [at["secret"] for at in cache.find(cache.CredentialType.ACCESS_TOKEN)])
+
@@ -0,0 +1,49 @@
+"""Guard the start-up time of "import msal", which matters to CLI tools."""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from tests import unittest
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MODULES_TO_BE_LOADED_ON_FIRST_USE = [
+    "requests", "urllib3", "jwt", "cryptography",
+    "xml.etree.ElementTree", "http.server", "BaseHTTPServer", "uuid",
+    "msal.mex", "msal.wstrust_request", "msal.wstrust_response",
+    "msal.cloudshell", "msal.region", "msal.throttled_http_client",
+    "msal.oauth2cli.authcode",
+    ]
+
+
+def _run(code):
+    started_at = time.time()
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=_ROOT)
+    return time.time() - started_at, output
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_import_msal_should_not_load_modules_needed_only_by_some_flows(self):
+        _, output = _run("import json, sys, msal; print(json.dumps(list(sys.modules)))")
+        loaded = set(json.loads(output.decode("utf-8").strip().splitlines()[-1]))
+        baseline = set(json.loads(_run(
+            "import json, sys; print(json.dumps(list(sys.modules)))"
+            )[1].decode("utf-8").strip().splitlines()[-1]))
+        self.assertEqual(
+            [],
+            [m for m in _MODULES_TO_BE_LOADED_ON_FIRST_USE
+                if m in loaded and m not in baseline],  # E.g. loaded by site
+            "These modules shall be imported lazily")
+
+    def test_import_msal_should_be_fast(self):
+        _run("import msal")  # So that bytecode caches are warmed up
+        overhead = min(_run("pass")[0] for _ in range(3))
+        elapsed = min(_run("import msal")[0] for _ in range(3)) - overhead
+        self.assertLess(
+            elapsed, 0.5,  # A generous ceiling, which still catches a regression
+                # such as eagerly importing requests (and its dependencies)
+            "import msal took {:.3f} seconds".format(elapsed))
+
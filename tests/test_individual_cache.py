@@ -74,6 +74,20 @@ class TestExpiringMapping(unittest.TestCase):
         self.assertEqual(2, len(self.m), "It contains 2 items")
         self.assertNotIn("thing one", self.m)
 
+    def test_oversized_input_in_bytes_should_purge_most_aging_item(self):
+        m = ExpiringMapping(capacity_in_bytes=10, expires_in=1, size_of=len)
+        m["thing one"] = "12345"
+        m.set("thing two", "12345", 2)
+        self.assertEqual(2, len(m), "It contains 2 items, 10 bytes in total")
+        m.set("thing three", "1", 3)
+        self.assertEqual(2, len(m), "It contains 2 items")
+        self.assertNotIn("thing one", m)
+
+    def test_merge_should_see_the_current_value(self):
+        self.m.merge("thing", lambda current: ([current], 2))
+        self.m.merge("thing", lambda current: (current + ["two"], 2))
+        self.assertEqual([None, "two"], self.m["thing"])
+
 
 class TestIndividualCache(unittest.TestCase):
     mapping = {}
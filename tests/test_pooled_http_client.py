@@ -0,0 +1,99 @@
+import threading
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:  # Fall back to Python 2
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+from msal.pooled_http_client import PooledHttpClient
+from tests import unittest
+
+try:
+    from unittest.mock import patch
+except:
+    from mock import patch
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # So that connections will be kept alive
+
+    def _reply(self):
+        body = b'{"foo": "bar"}'
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply()
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True  # Idle keep-alive connections shall not block each other
+
+
+class TestPooledHttpClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _ThreadingHTTPServer(("localhost", 0), _Handler)
+        cls.url = "http://localhost:{}/".format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connections_should_be_reused_and_reported(self):
+        http_client = PooledHttpClient(
+            pool_maxsize=2, keep_alive_idle_seconds=60, timeout=5)
+        for _ in range(3):
+            self.assertEqual(200, http_client.get(self.url).status_code)
+        self.assertEqual(
+            200, http_client.post(self.url, data={"a": "b"}).status_code)
+        metrics = http_client.get_metrics()
+        http_client.close()
+        self.assertEqual(1, len(metrics))
+        host_metrics = list(metrics.values())[0]
+        self.assertEqual(1, host_metrics["connections_created"])
+        self.assertEqual(4, host_metrics["requests"])
+        self.assertEqual(2, host_metrics["maxsize"])
+
+    def test_warm_up_should_leave_idle_connections_for_later_requests(self):
+        http_client = PooledHttpClient(pool_maxsize=2, timeout=5)
+        http_client.warm_up(self.url, connections=2)
+        host_metrics = list(http_client.get_metrics().values())[0]
+        self.assertEqual(2, host_metrics["connections_created"])
+        self.assertEqual(2, host_metrics["idle_connections"])
+        self.assertEqual(200, http_client.get(self.url).status_code)
+        host_metrics = list(http_client.get_metrics().values())[0]
+        http_client.close()
+        self.assertEqual(2, host_metrics["connections_created"])
+
+    def test_warm_up_should_be_a_no_op_without_urllib3_private_api(self):
+        from urllib3 import HTTPConnectionPool
+        http_client = PooledHttpClient(timeout=5)
+        with patch.object(HTTPConnectionPool, "_get_conn", None):
+            http_client.warm_up(self.url, connections=2)
+        host_metrics = list(http_client.get_metrics().values())[0]
+        self.assertEqual(0, host_metrics["connections_created"])
+        self.assertEqual(200, http_client.get(self.url).status_code)
+        http_client.close()
+
+    def test_warm_up_should_be_skipped_when_a_proxy_would_be_used(self):
+        http_client = PooledHttpClient(
+            proxies={"http": "http://localhost:1"}, timeout=5)  # Unreachable
+        http_client.warm_up(self.url, connections=2)
+        self.assertEqual({}, http_client.get_metrics())
+        http_client.close()
@@ -0,0 +1,60 @@
+import time
+from msal.rate_limiter import RateLimiter, RateLimitExceededError
+from msal.throttled_http_client import ThrottledHttpClient
+from tests import unittest
+from tests.test_throttled_http_client import DummyHttpClient
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_burst_should_be_admitted_without_waiting(self):
+        limiter = RateLimiter(rate=1, burst=3)
+        self.assertEqual([0, 0, 0], [limiter.acquire("key") for _ in range(3)])
+
+    def test_fail_fast_should_raise_when_quota_runs_out(self):
+        limiter = RateLimiter(rate=1, burst=1, blocking=False)
+        limiter.acquire("key")
+        with self.assertRaises(RateLimitExceededError):
+            limiter.acquire("key")
+        limiter.acquire("another key")  # Quota is per key
+        self.assertEqual(1, limiter.get_metrics()["key"]["rejected"])
+
+    def test_blocking_should_wait_for_quota(self):
+        limiter = RateLimiter(rate=10, burst=1)
+        limiter.acquire("key")
+        start = time.time()
+        waited = limiter.acquire("key")
+        self.assertGreater(waited, 0)
+        self.assertGreaterEqual(time.time() - start, 0.09)
+        metrics = limiter.get_metrics()["key"]
+        self.assertEqual(2, metrics["requests"])
+        self.assertEqual(0, metrics["waiting"])
+        self.assertGreater(metrics["total_wait"], 0)
+
+    def test_max_wait_should_reject_a_long_wait(self):
+        limiter = RateLimiter(rate=0.1, burst=1, max_wait=1)
+        limiter.acquire("key")
+        with self.assertRaises(RateLimitExceededError):
+            limiter.acquire("key")
+
+    def test_max_wait_of_one_request_should_reject_a_long_wait(self):
+        limiter = RateLimiter(rate=0.1, burst=1)
+        limiter.acquire("key")
+        with self.assertRaises(RateLimitExceededError):
+            limiter.acquire("key", max_wait=1)
+
+    def test_throttled_http_client_should_limit_token_requests_only(self):
+        limiter = RateLimiter(rate=0.1, burst=1, blocking=False)
+        http_client = ThrottledHttpClient(
+            DummyHttpClient(status_code=200), {}, rate_limiter=limiter)
+        token_request = {"client_id": "foo", "grant_type": "client_credentials"}
+        http_client.post("https://example.com/token", data=token_request)
+        with self.assertRaises(RateLimitExceededError):
+            http_client.post("https://example.com/token", data=token_request)
+        http_client.post("https://example.com/token", data=dict(
+            token_request, client_id="bar"))
+        http_client.post("https://example.com/wstrust", data="<xml/>")
+        self.assertEqual(
+            set([("https://example.com/token", "foo"),
+                ("https://example.com/token", "bar")]),
+            set(limiter.get_metrics()))
@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import msal.region
+from msal.application import ConfidentialClientApplication
+from msal.region import RegionDetector
+from tests import unittest
+from tests.http_client import MinimalResponse
+from tests.test_application import OidcHttpClient
+
+
+class ImdsHttpClient(object):
+    def __init__(self, region=None, latency=0):
+        self.region = region
+        self.latency = latency
+        self.calls = 0
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if self.region is None:
+            raise IOError("Connection timed out")
+        return MinimalResponse(status_code=200, text=self.region)
+
+
+@unittest.skipIf(os.getenv("REGION_NAME"), "Region would not be detected via IMDS")
+class TestRegionDetector(unittest.TestCase):
+
+    def setUp(self):
+        msal.region._cache.clear()
+        msal.region._probe = None
+        self.folder = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.folder, "region.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_negative_outcome_should_be_cached_process_wide(self):
+        http_client = ImdsHttpClient(region=None)
+        self.assertIsNone(RegionDetector(http_client=http_client).detect())
+        self.assertIsNone(RegionDetector(http_client=http_client).detect())
+        self.assertEqual(1, http_client.calls)
+
+    def test_default_detector_should_not_remember_a_lack_of_region(self):
+        http_client = ImdsHttpClient(region=None)
+        self.assertIsNone(msal.region._detect_region(http_client))
+        self.assertIsNone(msal.region._detect_region(http_client))
+        self.assertEqual(2, http_client.calls)
+
+    def test_outcome_should_be_persisted_and_expire(self):
+        RegionDetector(
+            http_client=ImdsHttpClient(region="westus"),
+            cache_file=self.cache_file).detect()
+        msal.region._cache.clear()  # As if it were another process
+        http_client = ImdsHttpClient(region="eastus")
+        self.assertEqual("westus", RegionDetector(
+            http_client=http_client, cache_file=self.cache_file).detect())
+        self.assertEqual(0, http_client.calls)
+        msal.region._cache.clear()
+        self.assertEqual("eastus", RegionDetector(
+            http_client=http_client, cache_file=self.cache_file, ttl=0).detect())
+        with open(self.cache_file) as f:
+            self.assertEqual("eastus", json.load(f)["region"])
+
+    def test_background_detection_should_not_block(self):
+        http_client = ImdsHttpClient(region="westus", latency=0.5)
+        detector = RegionDetector(http_client=http_client, background=True)
+        started_at = time.time()
+        self.assertIsNone(detector.detect())
+        self.assertLess(time.time() - started_at, 0.3)
+        self.assertEqual("westus", detector.detect(wait=True))
+
+    def test_app_should_switch_to_region_detected_in_background(self):
+        detector = RegionDetector(
+            http_client=ImdsHttpClient(region="westus", latency=0.3),
+            background=True)
+        hosts = []
+        def mock_post(url, **kwargs):
+            hosts.append(url.split("/")[2])
+            return MinimalResponse(status_code=200, text=json.dumps({
+                "access_token": "an AT", "expires_in": 3600}))
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(),
+            azure_region=ConfidentialClientApplication.ATTEMPT_REGION_DISCOVERY,
+            region_detector=detector)
+        app.acquire_token_for_client(["scope"], post=mock_post)
+        self.assertEqual(["login.microsoftonline.com"], hosts)
+        self.assertEqual("westus", detector.detect(wait=True))
+        app.acquire_token_for_client(["scope"], post=mock_post, force_refresh=True)
+        self.assertEqual("westus.login.microsoft.com", hosts[-1])
+
+    def test_app_should_stop_checking_once_detection_settled_without_region(self):
+        http_client = ImdsHttpClient(region=None, latency=0.3)
+        detector = RegionDetector(
+            http_client=http_client, background=True, negative_ttl=0)
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(),
+            azure_region=ConfidentialClientApplication.ATTEMPT_REGION_DISCOVERY,
+            region_detector=detector)
+        post = lambda url, **kwargs: MinimalResponse(status_code=200, text=json.dumps(
+            {"access_token": "an AT", "expires_in": 3600}))
+        app.acquire_token_for_client(["scope"], post=post)
+        self.assertTrue(app._region_pending, "Detection is still ongoing")
+        self.assertIsNone(detector.detect(wait=True))
+        for _ in range(3):
+            app.acquire_token_for_client(["scope"], post=post, force_refresh=True)
+        self.assertFalse(app._region_pending)
+        self.assertIsNone(app._regional_client)
+        self.assertEqual(1, http_client.calls, "No probe after detection settled")
+
+    def test_tenant_clients_should_switch_to_region_detected_in_background(self):
+        detector = RegionDetector(
+            http_client=ImdsHttpClient(region="westus", latency=0.3),
+            background=True)
+        hosts = []
+        def mock_post(url, **kwargs):
+            hosts.append(url.split("/")[2])
+            return MinimalResponse(status_code=200, text=json.dumps({
+                "access_token": "an AT", "expires_in": 3600}))
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=OidcHttpClient(),
+            azure_region=ConfidentialClientApplication.ATTEMPT_REGION_DISCOVERY,
+            region_detector=detector)
+        app.acquire_token_for_client(["scope"], tenant="fabrikam", post=mock_post)
+        self.assertEqual(["login.microsoftonline.com"], hosts)
+        self.assertEqual("westus", detector.detect(wait=True))
+        app.acquire_token_for_client(
+            ["scope"], tenant="fabrikam", post=mock_post, force_refresh=True)
+        self.assertEqual("westus.login.microsoft.com", hosts[-1])
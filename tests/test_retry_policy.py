@@ -0,0 +1,97 @@
+from msal.retry_policy import RetryPolicy
+from msal.throttled_http_client import ThrottledHttpClient
+from tests import unittest
+from tests.test_throttled_http_client import DummyHttpResponse
+
+
+class SequentialHttpClient(object):
+    def __init__(self, *responses):
+        self._responses = list(responses)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        response = self._responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def post(self, url, params=None, data=None, headers=None, **kwargs):
+        return self._next()
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        return self._next()
+
+
+def _response(status_code, headers=None):
+    return DummyHttpResponse(
+        status_code=status_code, headers=headers or {}, text=str(status_code))
+
+
+class TestRetryPolicy(unittest.TestCase):
+    token_request = {"client_id": "id", "grant_type": "client_credentials"}
+
+    def test_transient_5xx_should_be_retried(self):
+        http_client = SequentialHttpClient(_response(503), _response(200))
+        throttled = ThrottledHttpClient(
+            http_client, {}, retry_policy=RetryPolicy(backoff_factor=0.01))
+        resp = throttled.post("https://example.com", data=self.token_request)
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual(2, http_client.calls)
+
+    def test_connection_error_should_be_retried(self):
+        http_client = SequentialHttpClient(IOError("reset"), _response(200))
+        policy = RetryPolicy(backoff_factor=0.01)
+        self.assertEqual(200, policy.send(http_client.get, "https://example.com").status_code)
+
+    def test_max_attempts_should_be_honored(self):
+        http_client = SequentialHttpClient(_response(500), _response(500), _response(200))
+        policy = RetryPolicy(max_attempts=2, backoff_factor=0.01)
+        self.assertEqual(500, policy.send(http_client.get, "https://example.com").status_code)
+        self.assertEqual(2, http_client.calls)
+
+    def test_long_retry_after_should_stop_retrying_and_be_cached(self):
+        http_client = SequentialHttpClient(
+            _response(429, {"Retry-After": "60"}), _response(200))
+        throttled = ThrottledHttpClient(
+            http_client, {}, retry_policy=RetryPolicy(max_delay=1))
+        resp1 = throttled.post("https://example.com", data=self.token_request)
+        resp2 = throttled.post("https://example.com", data=self.token_request)
+        self.assertEqual(429, resp1.status_code)
+        self.assertEqual(429, resp2.status_code, "The throttle cache should still work")
+        self.assertEqual(1, http_client.calls)
+
+    def test_deadline_should_stop_retrying(self):
+        http_client = SequentialHttpClient(
+            _response(503, {"Retry-After": "1"}), _response(200))
+        policy = RetryPolicy(deadline=0.5)
+        self.assertEqual(503, policy.send(http_client.get, "https://example.com").status_code)
+
+    def test_4xx_and_non_token_requests_should_not_be_retried(self):
+        http_client = SequentialHttpClient(_response(400), _response(503), _response(200))
+        throttled = ThrottledHttpClient(
+            http_client, {}, retry_policy=RetryPolicy(backoff_factor=0.01))
+        self.assertEqual(400, throttled.post(
+            "https://example.com", data=self.token_request).status_code)
+        self.assertEqual(503, throttled.post(
+            "https://example.com/wstrust", data="<xml/>").status_code)
+        self.assertEqual(2, http_client.calls)
+
+    def test_non_idempotent_token_requests_should_not_be_retried(self):
+        http_client = SequentialHttpClient(_response(503), _response(200))
+        throttled = ThrottledHttpClient(
+            http_client, {}, retry_policy=RetryPolicy(backoff_factor=0.01))
+        self.assertEqual(503, throttled.post("https://example.com", data={
+            "client_id": "id", "grant_type": "authorization_code", "code": "once",
+            }).status_code, "An auth code shall not be redeemed twice")
+        self.assertEqual(1, http_client.calls)
+
+    def test_idempotent_grants_should_be_retried(self):
+        for grant_type in (
+                "refresh_token", "urn:ietf:params:oauth:grant-type:jwt-bearer"):
+            http_client = SequentialHttpClient(_response(503), _response(200))
+            throttled = ThrottledHttpClient(
+                http_client, {}, retry_policy=RetryPolicy(backoff_factor=0.01))
+            self.assertEqual(200, throttled.post("https://example.com", data={
+                "client_id": "id", "grant_type": grant_type}).status_code)
+            self.assertEqual(2, http_client.calls)
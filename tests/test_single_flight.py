@@ -0,0 +1,84 @@
+import threading
+import time
+
+from msal.deadline import _Deadline, DeadlineExceededError
+from msal.single_flight import _SingleFlight
+from tests import unittest
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = _SingleFlight()
+        self.calls = 0
+
+    def slow_call(self, outcome=None):
+        self.calls += 1
+        time.sleep(0.3)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {"outcome": outcome}
+
+    def run_concurrently(self, function, count=5):
+        outcomes = []
+        def run():
+            try:
+                outcomes.append(self.flight.run("key", function))
+            except Exception as e:
+                outcomes.append(e)
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return outcomes
+
+    def test_concurrent_callers_should_share_one_call(self):
+        outcomes = self.run_concurrently(lambda: self.slow_call("ok"))
+        self.assertEqual(1, self.calls)
+        self.assertEqual([{"outcome": "ok"}] * 5, outcomes)
+        outcomes[0]["outcome"] = "modified"
+        self.assertEqual({"outcome": "ok"}, outcomes[1], "Each caller gets a copy")
+
+    def test_concurrent_callers_should_share_one_error(self):
+        outcomes = self.run_concurrently(lambda: self.slow_call(IOError("outage")))
+        self.assertEqual(1, self.calls)
+        self.assertTrue(all(isinstance(o, IOError) for o in outcomes))
+
+    def test_sequential_callers_should_not_share(self):
+        self.flight.run("key", lambda: self.slow_call("first"))
+        self.assertEqual(
+            {"outcome": "second"},
+            self.flight.run("key", lambda: self.slow_call("second")))
+        self.assertEqual(2, self.calls)
+
+    def test_follower_should_wait_no_longer_than_its_deadline(self):
+        leader = threading.Thread(
+            target=self.flight.run, args=("key", lambda: self.slow_call("ok")))
+        leader.start()
+        time.sleep(0.1)  # So that the leader starts first
+        with self.assertRaises(DeadlineExceededError):
+            self.flight.run("key", lambda: self.slow_call("ok"),
+                deadline=_Deadline(0.05))
+        leader.join()
+        self.assertEqual(1, self.calls)
+
+    def test_leader_running_out_of_its_own_time_should_not_fail_followers(self):
+        deadline = _Deadline(0.1)
+        def leader_call():
+            self.slow_call("ok")
+            raise deadline.error()  # As if its request timed out
+        errors = []
+        def lead():
+            try:
+                self.flight.run("key", leader_call, deadline=deadline)
+            except DeadlineExceededError as e:
+                errors.append(e)
+        leader = threading.Thread(target=lead)
+        leader.start()
+        time.sleep(0.1)  # So that the leader starts first
+        self.assertEqual(  # This follower has no deadline, so it takes over
+            {"outcome": "ok"}, self.flight.run("key", lambda: self.slow_call("ok")))
+        leader.join()
+        self.assertEqual(1, len(errors))
+        self.assertEqual(2, self.calls)
@@ -0,0 +1,135 @@
+import json
+import threading
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:  # Fall back to Python 2
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+from msal.stdlib_http_client import StdlibHttpClient, HttpError
+from tests import unittest
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # So that connections will be kept alive
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(404 if "missing" in self.path else 200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply({"path": self.path})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply({
+            "path": self.path,
+            "body": body.decode("utf-8"),
+            "content_type": self.headers.get("Content-Type"),
+            })
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True  # Idle keep-alive connections shall not block each other
+
+
+class TestStdlibHttpClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = _ThreadingHTTPServer(("localhost", 0), _EchoHandler)
+        cls.url = "http://localhost:{}/".format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.http_client = StdlibHttpClient(proxies={}, timeout=5)
+
+    def tearDown(self):
+        self.http_client.close()
+
+    def test_get_and_post_should_reuse_one_connection(self):
+        resp = self.http_client.get(self.url + "path?a=1", params={"b": "2"})
+        self.assertEqual(200, resp.status_code)
+        self.assertEqual("/path?a=1&b=2", json.loads(resp.text)["path"])
+        resp = self.http_client.post(self.url, data={"grant_type": "x y"})
+        self.assertEqual("grant_type=x+y", json.loads(resp.text)["body"])
+        self.assertEqual(
+            "application/x-www-form-urlencoded",
+            json.loads(resp.text)["content_type"])
+        self.assertEqual("{}", json.loads(
+            self.http_client.post(self.url, data="{}").text)["body"])
+        metrics = list(self.http_client.get_metrics().values())[0]
+        self.assertEqual(1, metrics["connections_created"])
+        self.assertEqual(3, metrics["requests"])
+        self.assertEqual(1, metrics["idle_connections"])
+
+    def test_a_dropped_idle_connection_should_be_replaced_transparently(self):
+        self.http_client.get(self.url)
+        for pool in self.http_client._pools.values():
+            pool.idle[0].sock.close()  # Simulate the server dropping it
+        self.assertEqual(200, self.http_client.get(self.url).status_code)
+        metrics = list(self.http_client.get_metrics().values())[0]
+        self.assertEqual(2, metrics["connections_created"])
+
+    def test_raise_for_status(self):
+        resp = self.http_client.get(self.url + "missing")
+        self.assertEqual(404, resp.status_code)
+        with self.assertRaises(HttpError):
+            resp.raise_for_status()
+        self.assertIsNone(self.http_client.get(self.url).raise_for_status())
+
+    def test_http_proxy_should_receive_absolute_url(self):
+        http_client = StdlibHttpClient(proxies={"http": self.url}, timeout=5)
+        resp = http_client.get("http://example.com/foo")
+        http_client.close()
+        self.assertEqual(
+            "http://example.com:80/foo", json.loads(resp.text)["path"])
+
+    def test_warm_up_should_leave_idle_connections_for_later_requests(self):
+        self.http_client.warm_up(self.url, connections=2)
+        metrics = list(self.http_client.get_metrics().values())[0]
+        self.assertEqual(2, metrics["connections_created"])
+        self.assertEqual(2, metrics["idle_connections"])
+        self.assertEqual(200, self.http_client.get(self.url).status_code)
+        metrics = list(self.http_client.get_metrics().values())[0]
+        self.assertEqual(2, metrics["connections_created"])
+
+    def test_a_connection_released_after_close_should_be_closed(self):
+        self.http_client.get(self.url)
+        key = list(self.http_client._pools)[0]
+        connection, _ = self.http_client._acquire(key, timeout=5)
+        self.http_client.close()  # As if it ran concurrently with a request
+        self.http_client._release(key, connection)
+        self.assertIsNone(connection.sock)
+        self.assertEqual({}, self.http_client.get_metrics())
+
+    def test_environment_proxies_should_be_looked_up_once_per_client(self):
+        with patch("msal.stdlib_http_client.getproxies", return_value={}) as get, \
+                patch("msal.stdlib_http_client.proxy_bypass", return_value=False
+                ) as bypass:
+            http_client = StdlibHttpClient(timeout=5)
+            for _ in range(3):
+                http_client.get(self.url)
+            http_client.close()
+        get.assert_called_once()
+        bypass.assert_called_once()
@@ -177,3 +177,139 @@ class TestHttpDecoration(unittest.TestCase):
         with self.assertRaises(CloseMethodCalled):
             http_client.close()
 
+
+    def test_http_200_should_not_be_cached(self):
+        http_cache = {}
+        http_client = ThrottledHttpClient(DummyHttpClient(status_code=200), http_cache)
+        resp1 = http_client.post("https://example.com", data={"scope": "one"})
+        resp2 = http_client.post("https://example.com", data={"scope": "one"})
+        self.assertNotEqual(resp1.text, resp2.text, "Should return a new response")
+        self.assertEqual({}, http_cache, "Nothing should be written")
+
+    def test_invalid_grant_and_RetryAfter_of_same_account_should_coexist(self):
+        http_cache = {}
+        dummy = DummyHttpClient(status_code=400)
+        http_client = ThrottledHttpClient(dummy, http_cache)
+        resp_400 = http_client.post("https://example.com", data={"claims": "foo"})
+        dummy._status_code, dummy._response_headers = 429, {"Retry-After": 2}
+        resp_429 = http_client.post("https://example.com", data={"claims": "bar"})
+        self.assertNotEqual(resp_400.text, resp_429.text, "Should be a new response")
+        self.assertEqual(resp_400.text, http_client.post(
+            "https://example.com", data={"claims": "foo"}).text,
+            "The exact request should still hit its own cached 400")
+        self.assertEqual(resp_429.text, http_client.post(
+            "https://example.com", data={"claims": "baz"}).text,
+            "A similar request should be blocked by the 429")
+
+    def test_RetryAfter_should_not_block_a_different_account(self):
+        http_cache = {}
+        http_client = ThrottledHttpClient(DummyHttpClient(
+            status_code=429, response_headers={"Retry-After": 2}), http_cache)
+        resp1 = http_client.post("https://example.com", data={"code": "one"})
+        resp2 = http_client.post("https://example.com", data={"code": "two"})
+        self.assertNotEqual(resp1.text, resp2.text, "Should return a new response")
+
+    def test_http_cache_should_contain_compact_and_picklable_snapshots(self):
+        import pickle
+        http_cache = {}
+        http_client = ThrottledHttpClient(DummyHttpClient(
+            status_code=429, response_headers={"Retry-After": 2, "X-Foo": "bar"}),
+            http_cache)
+        resp1 = http_client.post("https://example.com")
+        resp2 = http_client.post("https://example.com")
+        self.assertEqual(resp1.text, resp2.text, "Should return a cached response")
+        self.assertEqual({"Retry-After": 2}, resp2.headers, "Only keep needed headers")
+        self.assertEqual(http_cache, pickle.loads(pickle.dumps(http_cache)))
+
+    def test_cached_snapshot_of_5xx_should_still_raise_for_status(self):
+        class HttpError(Exception):
+            pass
+        class ErrorResponse(DummyHttpResponse):
+            def raise_for_status(self):
+                raise HttpError("503 Server Error")
+        class ErrorHttpClient(DummyHttpClient):
+            def post(self, url, **kwargs):
+                return ErrorResponse(status_code=503, headers={}, text="foo")
+        http_client = ThrottledHttpClient(ErrorHttpClient(), {})
+        http_client.post("https://example.com")
+        with self.assertRaises(HttpError):
+            http_client.post("https://example.com").raise_for_status()
+
+    def test_http_cache_should_honor_capacity_in_bytes(self):
+        http_cache = {}
+        http_client = ThrottledHttpClient(
+            DummyHttpClient(status_code=200), http_cache, capacity_in_bytes=300)
+        for i in range(10):
+            http_client.get("https://example.com/{}".format(i))
+        self.assertLess(len(http_client._expiring_mapping), 10)
+
+    def test_warm_up_should_send_no_request_without_underlying_support(self):
+        urls = []
+        class RecordingHttpClient(DummyHttpClient):
+            def get(self, url, **kwargs):
+                urls.append(url)
+                return super(RecordingHttpClient, self).get(url, **kwargs)
+        http_cache = {}
+        http_client = ThrottledHttpClient(
+            RecordingHttpClient(status_code=200), http_cache)
+        http_client.warm_up("https://example.com/token")
+        self.assertEqual([], urls)
+        self.assertEqual({}, http_cache)
+
+    def test_cached_snapshot_should_raise_an_error_of_the_original_kind(self):
+        try:
+            from urllib.error import HTTPError
+        except ImportError:  # Fall back to Python 2
+            from urllib2 import HTTPError
+        class ErrorResponse(DummyHttpResponse):
+            def raise_for_status(self):
+                raise HTTPError("https://example.com", 503, "Unavailable", {}, None)
+        class ErrorHttpClient(DummyHttpClient):
+            def post(self, url, **kwargs):
+                return ErrorResponse(status_code=503, headers={}, text="foo")
+        http_client = ThrottledHttpClient(ErrorHttpClient(), {})
+        http_client.post("https://example.com")
+        with self.assertRaises(IOError) as context:  # HTTPError is an IOError
+            http_client.post("https://example.com").raise_for_status()
+        self.assertIn("Unavailable", str(context.exception))
+
+    def test_cached_snapshot_should_not_keep_the_original_response(self):
+        import pickle
+        from msal.stdlib_http_client import HttpError
+        class ErrorResponse(DummyHttpResponse):
+            def raise_for_status(self):
+                raise HttpError("429 Client Error", response=self)
+        class ErrorHttpClient(DummyHttpClient):
+            def post(self, url, **kwargs):
+                return ErrorResponse(
+                    status_code=429, headers={"X-Foo": "a large header"}, text="foo")
+        http_cache = {}
+        http_client = ThrottledHttpClient(ErrorHttpClient(), http_cache)
+        http_client.post("https://example.com")
+        self.assertNotIn(b"a large header", pickle.dumps(http_cache))
+        snapshot = http_client.post("https://example.com")
+        with self.assertRaises(HttpError) as context:
+            snapshot.raise_for_status()
+        self.assertIs(snapshot, context.exception.response)
+
+    def test_uncached_get_should_return_the_original_response(self):
+        http_client = ThrottledHttpClient(DummyHttpClient(
+            status_code=404, response_headers={"X-Foo": "bar"}), {})
+        response = http_client.get("https://example.com")
+        self.assertEqual({"X-Foo": "bar"}, response.headers)
+        self.assertIsInstance(response, DummyHttpResponse)
+
+    def test_concurrently_stored_conditions_should_not_overwrite_each_other(self):
+        http_client = ThrottledHttpClient(DummyHttpClient(), {})
+        kwargs = {"data": {"refresh_token": "rt"}}
+        first_probe = http_client._probe(("https://example.com",), kwargs)
+        second_probe = http_client._probe(("https://example.com",), kwargs)
+        key, body_hash, _ = first_probe
+        http_client._store(key, body_hash, DummyHttpResponse(
+            status_code=429, headers={"Retry-After": 60}, text="throttled"), kwargs)
+        key, body_hash, _ = second_probe  # It was taken before the 429 was stored
+        http_client._store(key, body_hash, DummyHttpResponse(
+            status_code=400, text="invalid_grant"), kwargs)
+        self.assertEqual("throttled", http_client.post(
+            "https://example.com", data={"refresh_token": "rt", "other": 1}).text,
+            "The 429 condition should survive")
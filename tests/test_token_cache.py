@@ -252,6 +252,23 @@ class TokenCacheTestCase(unittest.TestCase):
                 'uid.utid-login.example.com-refreshtoken-my_client_id--s2 s1 s3')
             )
 
+    def test_find_should_match_any_value_in_a_set(self):
+        for environment in ["login.example.com", "login.example.net", "other.com"]:
+            self.cache.add({
+                "client_id": "my_client_id",
+                "scope": ["s1"],
+                "token_endpoint": "https://{}/contoso/oauth2/v2.0/token".format(
+                    environment),
+                "response": build_response(
+                    uid="uid", utid="utid", refresh_token="an RT"),
+                })
+        self.assertEqual(
+            set(["login.example.com", "login.example.net"]),
+            set(rt["environment"] for rt in self.cache.find(
+                self.cache.CredentialType.REFRESH_TOKEN,
+                query={"environment": set(["login.example.com", "login.example.net"]),
+                    "client_id": "my_client_id"})))
+
 
 class SerializableTokenCacheTestCase(TokenCacheTestCase):
     # Run all inherited test methods, and have extra check in tearDown()
@@ -0,0 +1,137 @@
+import json
+from threading import Condition
+import time
+try:
+    from unittest.mock import patch
+except:
+    from mock import patch
+
+from msal.application import ConfidentialClientApplication
+from msal.token_keeper import TokenKeeper
+from tests import unittest
+from tests.http_client import MinimalResponse
+from tests.test_application import OidcHttpClient
+
+
+class TokenHttpClient(OidcHttpClient):
+    def __init__(self, responses):
+        self.responses = responses
+        self.tenants = []
+
+    def post(self, url, params=None, data=None, headers=None, **kwargs):
+        self.tenants.append(url.split("/")[3])
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return MinimalResponse(status_code=200, text=json.dumps(response))
+
+
+class ObservableTokenKeeper(TokenKeeper):
+    """It notifies whoever waits for its acquisitions, so tests need no sleep"""
+    def __init__(self, *args, **kwargs):
+        super(ObservableTokenKeeper, self).__init__(*args, **kwargs)
+        self.acquisitions = 0
+        self.acquired = Condition()
+
+    def _acquire(self, *args, **kwargs):
+        super(ObservableTokenKeeper, self)._acquire(*args, **kwargs)
+        with self.acquired:
+            self.acquisitions += 1
+            self.acquired.notify_all()
+
+    def wait_for_acquisitions(self, count, timeout=5):
+        deadline = time.time() + timeout
+        with self.acquired:
+            while self.acquisitions < count and time.time() < deadline:
+                self.acquired.wait(deadline - time.time())
+            return self.acquisitions >= count
+
+
+class TestTokenKeeper(unittest.TestCase):
+
+    def build_keeper(self, responses, targets=None, **kwargs):
+        self.http_client = TokenHttpClient(responses)
+        app = ConfidentialClientApplication(
+            "client_id", client_credential="secret",
+            authority="https://login.microsoftonline.com/contoso",
+            http_client=self.http_client)
+        keeper = ObservableTokenKeeper(
+            app, targets or [(None, ["scope"])], **kwargs)
+        self.addCleanup(keeper.stop)
+        return keeper
+
+    def wait_for_acquisitions(self, keeper, count):
+        self.assertTrue(keeper.wait_for_acquisitions(count), "Keeper is stalled")
+
+    def test_tokens_should_be_available_after_start(self):
+        keeper = self.build_keeper(
+            [{"access_token": "an AT", "expires_in": 3600}],
+            targets=[(None, ["scope"]), ("fabrikam", ["scope"])])
+        self.assertIsNone(keeper.get(["scope"]), "Not started yet")
+        keeper.start()
+        self.assertEqual(["contoso", "fabrikam"], self.http_client.tenants)
+        self.assertEqual("an AT", keeper.get(["scope"])["access_token"])
+        self.assertEqual(
+            "an AT", keeper.get(["scope"], tenant="fabrikam")["access_token"])
+        self.assertIsNone(keeper.get(["another scope"]))
+        self.assertEqual(2, len(self.http_client.tenants), "Reads are memory reads")
+
+    def test_token_should_be_refreshed_as_suggested_by_refresh_in(self):
+        keeper = self.build_keeper([
+            {"access_token": "old AT", "expires_in": 3600, "refresh_in": 1},
+            {"access_token": "new AT", "expires_in": 3600},
+            ], jitter=0)
+        keeper.start()
+        self.assertEqual("old AT", keeper.get(["scope"])["access_token"])
+        self.wait_for_acquisitions(keeper, 2)
+        self.assertEqual("new AT", keeper.get(["scope"])["access_token"])
+
+    def test_failed_refresh_should_keep_old_token_and_retry(self):
+        keeper = self.build_keeper([
+            {"access_token": "old AT", "expires_in": 3600, "refresh_in": 1},
+            IOError("Network outage"),
+            {"access_token": "new AT", "expires_in": 3600},
+            ], jitter=0, min_backoff=0.5)
+        keeper.start()
+        self.wait_for_acquisitions(keeper, 2)
+        self.assertEqual("old AT", keeper.get(["scope"])["access_token"])
+        self.wait_for_acquisitions(keeper, 3)
+        self.assertEqual("new AT", keeper.get(["scope"])["access_token"])
+
+    def test_expired_token_should_not_be_returned(self):
+        keeper = self.build_keeper(
+            [{"access_token": "an AT", "expires_in": 0}], min_backoff=60)
+        keeper.start()
+        self.assertIsNone(keeper.get(["scope"]))
+
+    def test_token_about_to_expire_should_not_be_returned(self):
+        keeper = self.build_keeper([{"access_token": "an AT", "expires_in": 3600}])
+        keeper.start()
+        expires_on = keeper.get(["scope"])["expires_on"]
+        with patch("msal.token_keeper.time") as clock:
+            clock.time.return_value = expires_on - 5*60
+            self.assertEqual("an AT", keeper.get(["scope"])["access_token"])
+            clock.time.return_value = expires_on - 5*60 + 1
+            self.assertIsNone(
+                keeper.get(["scope"]), "The same buffer as acquire_token_silent()")
+
+    def test_starting_twice_should_not_start_another_thread(self):
+        keeper = self.build_keeper([{"access_token": "an AT", "expires_in": 3600}])
+        keeper.start()
+        thread = keeper._thread
+        keeper.start()
+        self.assertIs(thread, keeper._thread)
+        self.assertEqual(1, keeper.acquisitions, "Tokens are acquired once")
+
+    def test_short_lived_or_expired_tokens_should_not_cause_a_tight_loop(self):
+        for expires_in in (0, 1):
+            keeper = self.build_keeper(
+                [{"access_token": "an AT", "expires_in": expires_in}],
+                jitter=0, min_backoff=60)
+            started_at = time.time()
+            keeper.start()
+            with keeper._condition:
+                due = keeper._timers[0][0]
+            keeper.stop()
+            self.assertGreaterEqual(
+                due - started_at, 60, "Next request should wait for min_backoff")